@@ -1,42 +1,63 @@
 # gui.py
 import sys
 import threading
-import json
 import os
 import logging
 from PyQt5.QtWidgets import (
     QApplication, QSystemTrayIcon, QMenu, QAction, QTextEdit, QLineEdit,
-    QWidget, QVBoxLayout, QPushButton, QMessageBox, QLabel
+    QWidget, QVBoxLayout, QPushButton, QMessageBox, QLabel, QShortcut
 )
-from PyQt5.QtGui import QIcon
-from PyQt5.QtCore import Qt, QTimer
-import keyboard
+from PyQt5.QtGui import QIcon, QKeySequence
+from PyQt5.QtCore import Qt, QTimer, QObject, QEvent, QMetaObject
 from agent.tools.background_setup import ensure_startup_task
-from agent.tools.llm import call_chat_llm
-from agent.tools.intent_router import route as route_intent
 from agent.tools.evaluate_patch import (
     list_pending_patches,
-    apply_patch_by_id,
-    print_pending_patch_summaries
+    apply_patches,
 )
 from agent.tools.chat_memory import append_chat
-from agent.tools.root_registry import update_registry
-from agent.tools.dependency_graph import DependencyGraph
-import io
-import contextlib
+from agent.tools.memory_store import read_json
+from agent.tools.startup_profile import PROFILER
+from agent.tools.log_setup import setup_logging
+from agent.tools.ui_watchdog import StallWatchdog
+from agent.tools.job_scheduler import note_user_activity, start_job_scheduler, stop_job_scheduler, trigger_job
+
+# Heavy modules (intent_router → planner/llm → requests, keyboard, the
+# dependency graph) are imported lazily on first use so the window paints fast.
 
 CONFIG_PATH = os.path.join(os.path.dirname(__file__), "memory", "config.json")
 
-logging.basicConfig(
-    filename='saiasgui_log.log',
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+setup_logging("gui")  # no-op when run.py already set up logging
 logging.info("GUI initialized.")
 
+def format_hud(watchdog_stats, pending_patches):
+    """One-line performance summary for the HUD panel."""
+    parts = []
+    llm = sys.modules.get("agent.tools.llm")  # only report once chat has loaded it; never import it here
+    if llm is not None:
+        metrics = llm.llm_metrics()
+        latency = metrics.get("latency_seconds", {})
+        if latency:
+            parts.append("LLM " + ", ".join(
+                f"{model} {m['avg']:.1f}s avg/{m['last']:.1f}s last" for model, m in latency.items()
+            ))
+        depth = metrics.get("queue_depth", {})
+        parts.append(f"queue {metrics.get('waiting', 0)} ({', '.join(f'{k[:5]} {v}' for k, v in depth.items() if v) or 'idle'})")
+    parts.append(f"patches {pending_patches}")
+    if watchdog_stats is not None:
+        loop = watchdog_stats["loop_latency_ms"]
+        parts.append(
+            f"UI {watchdog_stats['stalls']} stalls (max {watchdog_stats['stall_ms_max']:.0f} ms), "
+            f"loop p99 {loop['p99']:.0f} ms"
+        )
+    return "  |  ".join(parts)
+
+
 class AssistantGUI(QWidget):
-    def __init__(self):
+    def __init__(self, config=None):
         super().__init__()
+        if config is None:
+            config = read_json(CONFIG_PATH, default={}) or {}
+        gui_config = config.get("gui", {})
         self.setWindowTitle("SAIAS Assistant")
         self.setWindowFlags(Qt.WindowStaysOnTopHint | Qt.Tool)
         self.resize(800, 600)
@@ -67,8 +88,32 @@ class AssistantGUI(QWidget):
         self.refresh_button.clicked.connect(self.show_pending_patches)
         layout.addWidget(self.refresh_button)
 
+        # Performance HUD (gui.hud in config; Ctrl+Shift+H toggles)
+        self.hud_label = QLabel()
+        self.hud_label.setStyleSheet("color: gray; font-family: monospace; font-size: 10px;")
+        self.hud_label.setWordWrap(True)
+        self.hud_label.setVisible(bool(gui_config.get("hud", False)))
+        layout.addWidget(self.hud_label)
+        self.hud_shortcut = QShortcut(QKeySequence("Ctrl+Shift+H"), self)
+        self.hud_shortcut.activated.connect(self.toggle_hud)
+
         self.setLayout(layout)
 
+        # UI stall watchdog: a fast timer measures event-loop drift, a monitor
+        # thread samples what the UI thread is stuck in
+        self.pending_patch_count = 0
+        self.watchdog = None
+        if gui_config.get("watchdog", {}).get("enabled", True):
+            self.watchdog = StallWatchdog.from_config(config).start()
+            self.watchdog_timer = QTimer(self)
+            self.watchdog_timer.setTimerType(Qt.PreciseTimer)
+            self.watchdog_timer.timeout.connect(self.watchdog.beat)
+            self.watchdog_timer.start(int(self.watchdog.interval * 1000))
+
+        self.hud_timer = QTimer(self)
+        self.hud_timer.timeout.connect(self.update_hud)
+        self.hud_timer.start(1000)
+
         # Auto-refresh patch status
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_patch_status)
@@ -76,8 +121,19 @@ class AssistantGUI(QWidget):
 
         self.update_patch_status()
 
+    def toggle_hud(self):
+        self.hud_label.setVisible(not self.hud_label.isVisible())
+        self.update_hud()
+
+    def update_hud(self):
+        if not self.hud_label.isVisible():
+            return
+        stats = self.watchdog.stats() if self.watchdog else None
+        self.hud_label.setText(format_hud(stats, self.pending_patch_count))
+
     def update_patch_status(self):
         patches = list_pending_patches()
+        self.pending_patch_count = len(patches)
         if patches:
             self.status_label.setText(f"🟡 {len(patches)} Pending Patch(s)")
             self.status_label.setStyleSheet("color: orange;")
@@ -115,11 +171,12 @@ class AssistantGUI(QWidget):
         if reply != QMessageBox.Yes:
             return
 
-        applied = 0
-        for _, patch in patches:
-            if apply_patch_by_id(patch["patch_id"]):
-                applied += 1
+        results = apply_patches([patch["patch_id"] for _, patch in patches])
+        applied = sum(1 for r in results if r.applied)
 
+        if applied:
+            trigger_job("graph_rebuild", "patches applied")
+            trigger_job("tests", "patches applied")
         QMessageBox.information(self, "Success", f"Applied {applied} patch(es).")
         self.update_patch_status()
 
@@ -128,6 +185,7 @@ class AssistantGUI(QWidget):
         if not user_input:
             return
 
+        note_user_activity()  # background jobs wait for the user to go idle
         self.chat_display.append(f"<b>You:</b> {user_input}")
         self.input_field.clear()
 
@@ -139,6 +197,7 @@ class AssistantGUI(QWidget):
 
         # Route intent
         try:
+            from agent.tools.intent_router import route as route_intent
             response = route_intent(user_input)
         except Exception as e:
             logging.error(f"Intent routing error: {e}")
@@ -148,6 +207,8 @@ class AssistantGUI(QWidget):
         self.chat_display.append(f"<b>SAIAS:</b> {response}")
         try:
             append_chat("assistant", response)
+            from agent.tools.chat_summary import schedule_summary_update
+            schedule_summary_update()
         except Exception:
             pass
 
@@ -156,30 +217,44 @@ class AssistantGUI(QWidget):
             QTimer.singleShot(1000, self.show_pending_patches)
 
 
-def launch_gui():
-    app = QApplication(sys.argv)
-    window = AssistantGUI()
+class _FirstPaintWatcher(QObject):
+    """Records the first paint of the main window for --profile-startup."""
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint:
+            obj.removeEventFilter(self)
+            PROFILER.mark("first paint")
+            PROFILER.emit_report()
+        return False
+
+
+def launch_gui(config=None):
+    with PROFILER.phase("QApplication"):
+        app = QApplication(sys.argv)
+    with PROFILER.phase("AssistantGUI()"):
+        window = AssistantGUI(config)
 
     # Setup system tray
-    icon_path = os.path.join(os.path.dirname(__file__), "saias.ico")
-    tray_icon = QSystemTrayIcon(QIcon(icon_path))
-    tray_icon.setToolTip("SAIAS - Running in background")
-
-    menu = QMenu()
-    open_action = QAction("Open")
-    open_action.triggered.connect(window.showNormal)
-    menu.addAction(open_action)
-
-    exit_action = QAction("Exit")
-    def quit_app():
-        print("💀 Exiting via tray menu...")
-        tray_icon.hide()
-        app.quit()
-    exit_action.triggered.connect(quit_app)
-    menu.addAction(exit_action)
-
-    tray_icon.setContextMenu(menu)
-    tray_icon.show()
+    with PROFILER.phase("tray icon"):
+        icon_path = os.path.join(os.path.dirname(__file__), "saias.ico")
+        tray_icon = QSystemTrayIcon(QIcon(icon_path))
+        tray_icon.setToolTip("SAIAS - Running in background")
+
+        menu = QMenu()
+        open_action = QAction("Open")
+        open_action.triggered.connect(window.showNormal)
+        menu.addAction(open_action)
+
+        exit_action = QAction("Exit")
+        def quit_app():
+            print("💀 Exiting via tray menu...")
+            stop_job_scheduler()
+            tray_icon.hide()
+            app.quit()
+        exit_action.triggered.connect(quit_app)
+        menu.addAction(exit_action)
+
+        tray_icon.setContextMenu(menu)
+        tray_icon.show()
 
     # Minimize to tray
     def override_close(event):
@@ -188,11 +263,29 @@ def launch_gui():
         print("🛑 Window hidden to tray.")
     window.closeEvent = override_close
 
-    window.show()
+    if PROFILER.enabled:
+        paint_watcher = _FirstPaintWatcher(window)
+        window.installEventFilter(paint_watcher)
+
+    with PROFILER.phase("window.show()"):
+        window.show()
+
+    # Registry/graph refresh and warm-up imports run after the window is up;
+    # the background job scheduler takes over periodic maintenance after that
+    def on_startup_tasks_done():
+        if PROFILER.enabled:
+            PROFILER.emit_report("[PROFILE] Background startup tasks finished; exiting.")
+            QMetaObject.invokeMethod(app, "quit", Qt.QueuedConnection)
+            return
+        start_job_scheduler(config or {})
+    QTimer.singleShot(0, lambda: start_background_startup_tasks(config or {}, on_startup_tasks_done))
+
     app.exec_()
 
 
-def background_listener():
+def background_listener(config=None):
+    import keyboard
+
     def on_hotkey():
         app = QApplication.instance()
         if app:
@@ -202,34 +295,66 @@ def background_listener():
                     widget.raise_()
                     widget.activateWindow()
 
-    with open(CONFIG_PATH, "r") as f:
-        config = json.load(f)
+    if config is None:
+        config = read_json(CONFIG_PATH, default={})
 
-    hotkey = config["background"].get("wake_hotkey", "ctrl+shift+space")
+    hotkey = config.get("background", {}).get("wake_hotkey", "ctrl+shift+space")
     keyboard.add_hotkey(hotkey, on_hotkey)
 
 
+def refresh_project_state():
+    """Auto-update project registry and capability usage."""
+    with PROFILER.phase("bg: update_registry"):
+        try:
+            from agent.tools.root_registry import update_registry
+            update_registry()
+        except Exception as e:
+            logging.warning(f"Failed to update root registry: {e}")
+    with PROFILER.phase("bg: dependency graph + capability usage"):
+        try:
+            from agent.tools.dependency_graph import DependencyGraph
+            graph = DependencyGraph()
+            graph.build()
+            graph.update_capability_usage()
+        except Exception as e:
+            logging.warning(f"Failed to update capability usage: {e}")
+
+
+def warm_up_imports():
+    """Import the chat/routing chain in the background so the first message doesn't pay for it."""
+    with PROFILER.phase("bg: import intent_router"):
+        try:
+            import agent.tools.intent_router  # noqa: F401
+        except Exception as e:
+            logging.warning(f"Failed to pre-import intent router: {e}")
+
+
+def start_background_startup_tasks(config, on_done=None):
+    def worker():
+        try:
+            refresh_project_state()
+            warm_up_imports()
+            if config.get("background", {}).get("enabled", True):
+                with PROFILER.phase("bg: hotkey listener"):
+                    try:
+                        background_listener(config)
+                    except Exception as e:
+                        logging.warning(f"Failed to register wake hotkey: {e}")
+        finally:
+            if on_done:
+                on_done()
+
+    t = threading.Thread(target=worker, name="saias-startup", daemon=True)
+    t.start()
+    return t
+
+
 def launch():
-    with open(CONFIG_PATH, "r") as f:
-        config = json.load(f)
+    with PROFILER.phase("load config"):
+        config = read_json(CONFIG_PATH, default={})
 
     if config.get("background", {}).get("startup_enabled", False):
-        ensure_startup_task()
-
-    # Auto-update project registry and capability usage
-    try:
-        update_registry()
-    except Exception as e:
-        logging.warning(f"Failed to update root registry: {e}")
-    try:
-        graph = DependencyGraph()
-        graph.build()
-        graph.update_capability_usage()
-    except Exception as e:
-        logging.warning(f"Failed to update capability usage: {e}")
-
-    if config.get("background", {}).get("enabled", True):
-        t = threading.Thread(target=background_listener, daemon=True)
-        t.start()
-
-    launch_gui()
+        with PROFILER.phase("ensure_startup_task"):
+            ensure_startup_task()
+
+    launch_gui(config)
@@ -3,8 +3,7 @@ import os
 import json
 from pathlib import Path
 
-from agent.tools.agent_tools import tools  # dynamically discovered tools
-from agent.tools.llm import safe_code_llm
+from agent.tools.llm import safe_code_llm, llm_priority, PRIORITY_PLANNER
 from agent.tools.capabilities_registry import register_capability
 
 ROOT_DIR = Path(__file__).resolve().parents[1]
@@ -26,7 +25,8 @@ Respond ONLY in JSON with keys: tool_name, description, functions (list of {{nam
         "functions": []
     }
     try:
-        raw = safe_code_llm(prompt)
+        with llm_priority(PRIORITY_PLANNER):
+            raw = safe_code_llm(prompt)
         data = json.loads(raw)
         if isinstance(data, dict) and "tool_name" in data and "description" in data:
             suggestion.update({
@@ -53,7 +53,8 @@ Respond in JSON format:
 {{"tool_name": "...", "description": "..."}}
 """
         try:
-            response = safe_code_llm(prompt)
+            with llm_priority(PRIORITY_PLANNER):
+                response = safe_code_llm(prompt)
             data = json.loads(response)
             tool_name = tool_name or data.get("tool_name") or "new_tool"
             description = description or data.get("description") or user_request
@@ -77,7 +78,8 @@ Write a Python module for SAIAS that:
 
 Write only the code.
 """
-    code = safe_code_llm(code_prompt)
+    with llm_priority(PRIORITY_PLANNER):
+        code = safe_code_llm(code_prompt)
 
     # Save file
     with open(file_path, "w", encoding="utf-8") as f:
@@ -94,6 +96,7 @@ def run_agent_with_qwen(task: str):
     """
     # Lazy import to avoid hard dependency when not needed
     from qwen_agent.agent import QwenAgent
+    from agent.tools.agent_tools import tools  # dynamically discovered tools
     agent = QwenAgent(
         model="qwen2.5-coder:14b",  # or whichever local/remote Qwen model
         tools=tools
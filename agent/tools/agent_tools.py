@@ -4,7 +4,6 @@ import inspect
 import pkgutil
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
-import difflib
 
 # --- Qwen-Agent Tool class compatibility (optional) ---
 _QWEN_TOOL = None
@@ -110,40 +109,20 @@ def list_discovered_functions() -> List[Tuple[str, str]]:
 def can_perform(query: str) -> bool:
     """
     Determine if the current tool/capability set likely supports the query.
-    Uses the capabilities registry first; falls back to discovered functions and docstrings.
+    Looks the query up in the in-memory capability index (registry entries plus
+    tool function names/docstrings), which is rebuilt only when those files change.
     """
-    from .capabilities_registry import can_handle_request
+    from .capability_index import MATCH_THRESHOLD
+    from .capabilities_registry import find_capabilities
 
     q = (query or "").lower().strip()
     if not q:
         return False
     try:
-        if can_handle_request(q):
-            return True
+        matches = find_capabilities(q, limit=1)
     except Exception:
-        pass
-
-    # Fallback: scan discovered functions + docstrings with fuzzy matching
-    try:
-        tokens = [t for t in q.split() if len(t) > 2]
-        for qualified, doc in list_discovered_functions():
-            fname = qualified.split(":", 1)[-1].lower()
-            # direct substring hits
-            if fname and fname in q:
-                return True
-            if doc and any(tok in (doc or "").lower() for tok in tokens):
-                return True
-            # fuzzy similarity against function name and doc
-            ratios = []
-            if fname:
-                ratios.append(difflib.SequenceMatcher(None, q, fname).ratio())
-            if doc:
-                ratios.append(difflib.SequenceMatcher(None, q, doc.lower()).ratio())
-            if ratios and max(ratios) >= 0.6:
-                return True
-    except Exception:
-        pass
-    return False
+        return False
+    return bool(matches) and matches[0].score >= MATCH_THRESHOLD
 
 
 def ensure_capability(query: str) -> str:
@@ -167,5 +146,15 @@ def ensure_capability(query: str) -> str:
         return f"[ERROR] Failed to create capability: {e}"
 
 
-# Expose tools list for Qwen-Agent
-tools = discover_tools()
+# Expose tools list for Qwen-Agent. Discovery imports every tool module, so it is
+# deferred until someone actually reads `agent_tools.tools`.
+_tools_cache: Optional[List[Tool]] = None
+
+
+def __getattr__(name: str):
+    global _tools_cache
+    if name == "tools":
+        if _tools_cache is None:
+            _tools_cache = discover_tools()
+        return _tools_cache
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
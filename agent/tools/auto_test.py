@@ -1,18 +1,37 @@
 # [SAIAS PATCHED VERSION]
+import importlib.util
 import subprocess
+import sys
+from pathlib import Path
+from agent.tools.tracing import traced
 
-def run_patch_tests():
+PROJECT_DIR = Path(__file__).resolve().parents[2]
+PYTEST_NO_TESTS = 5  # pytest exit code when nothing was collected
+
+@traced("sandbox.tests")
+def run_test_suite():
+    """Run the project's pytest suite: "passed", "failed" or "no_tests"."""
+    if importlib.util.find_spec("pytest") is None:
+        print("[WARN] pytest is not installed; no tests ran.")
+        return "no_tests"
     try:
-        result = subprocess.run(['python', '-m', 'unittest', 'discover', '-s', 'tests'], capture_output=True, text=True, timeout=300)
+        result = subprocess.run([sys.executable, '-m', 'pytest', '-q', 'tests'], cwd=str(PROJECT_DIR),
+                                capture_output=True, text=True, timeout=300)
         if result.returncode == 0:
             print("Tests passed successfully.")
-            return True
-        else:
-            print("Tests failed:\n", result.stdout, result.stderr)
-            return False
+            return "passed"
+        if result.returncode == PYTEST_NO_TESTS:
+            print("No tests ran.")
+            return "no_tests"
+        print("Tests failed:\n", result.stdout, result.stderr)
+        return "failed"
     except subprocess.TimeoutExpired:
         print("Tests timed out.")
-        return False
+        return "failed"
     except Exception as e:
         print(f"Error running tests: {e}")
-        return False
\ No newline at end of file
+        return "failed"
+
+def run_patch_tests():
+    """True unless the suite failed (a tree without tests does not block a patch)."""
+    return run_test_suite() != "failed"
@@ -0,0 +1,256 @@
+# agent/tools/batch.py
+"""
+Bulk request processing (run.py --batch FILE).
+
+Streams a JSONL file of requests through the router (intent_router.aroute) with
+a bounded number in flight, and appends one result line per request to an
+output JSONL as each finishes:
+
+	{"id": "user-047", "status": "ok", "reply": "...", "started": "...", "elapsed_s": 3.2, "line": 22}
+
+Input lines are objects with the request text in "text", "prompt" or "input"
+(or "title" + "body", the layout of the repo's requests.jsonl) and an optional
+"id"/"request_id" (default: line-<n>). Re-running with the same output file
+resumes: requests that already have a result are skipped, failed ones are
+retried unless --no-retry-failed. Model calls run at background priority by
+default so an interactive session on the same scheduler stays responsive.
+
+	python run.py --batch requests.jsonl --concurrency 8
+	python -m agent.tools.batch requests.jsonl -o results.jsonl
+"""
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, TextIO
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_PRIORITY = "background"
+TEXT_FIELDS = ("text", "prompt", "input")
+ID_FIELDS = ("id", "request_id")
+
+
+@dataclass
+class BatchRequest:
+	id: str
+	text: str
+	line: int
+
+
+@dataclass
+class BatchStats:
+	total: int = 0
+	skipped: int = 0
+	ok: int = 0
+	failed: int = 0
+	invalid: int = 0
+	elapsed: List[float] = field(default_factory=list)
+
+	def summary(self, wall: float) -> str:
+		done = self.ok + self.failed
+		times = sorted(self.elapsed)
+		p50 = times[len(times) // 2] if times else 0.0
+		p95 = times[min(len(times) - 1, int(len(times) * 0.95))] if times else 0.0
+		rate = done / wall * 60 if wall > 0 else 0.0
+		return (
+			f"[BATCH] {done} processed ({self.ok} ok, {self.failed} failed), {self.skipped} already done, "
+			f"{self.invalid} invalid lines in {wall:.1f}s ({rate:.1f}/min; p50 {p50:.1f}s, p95 {p95:.1f}s)"
+		)
+
+
+def batch_config() -> Dict[str, Any]:
+	from agent.tools.memory_store import read_json
+	from agent.tools.llm import CONFIG_PATH
+	config = read_json(CONFIG_PATH, default={}, copy_result=False) or {}
+	return config.get("batch", {}) or {}
+
+
+def default_output(input_path: Path) -> Path:
+	return input_path.with_name(f"{input_path.stem}.results.jsonl")
+
+
+def parse_request(entry: Any, line: int) -> Optional[BatchRequest]:
+	"""BatchRequest for one decoded input line (None when it has no request text)."""
+	if isinstance(entry, str):
+		entry = {"text": entry}
+	if not isinstance(entry, dict):
+		return None
+	text = next((entry[k] for k in TEXT_FIELDS if isinstance(entry.get(k), str) and entry[k].strip()), "")
+	if not text:
+		text = "\n\n".join(entry[k].strip() for k in ("title", "body") if isinstance(entry.get(k), str) and entry[k].strip())
+	if not text:
+		return None
+	req_id = next((str(entry[k]) for k in ID_FIELDS if entry.get(k) not in (None, "")), f"line-{line}")
+	return BatchRequest(req_id, text, line)
+
+
+def iter_requests(path: Path, stats: BatchStats) -> Iterator[BatchRequest]:
+	"""Requests in file order, read lazily (the file can be far larger than memory)."""
+	with open(path, "r", encoding="utf-8") as f:
+		for line_no, raw in enumerate(f, 1):
+			if not raw.strip():
+				continue
+			try:
+				request = parse_request(json.loads(raw), line_no)
+			except ValueError:
+				request = None
+			if request is None:
+				stats.invalid += 1
+				print(f"[WARN] Skipping line {line_no} of {path.name}: not a JSON request with text")
+				continue
+			yield request
+
+
+def finished_ids(out_path: Path, retry_failed: bool = True) -> Set[str]:
+	"""IDs that already have a result in out_path (only successful ones when retry_failed)."""
+	done: Set[str] = set()
+	if not out_path.exists():
+		return done
+	with open(out_path, "r", encoding="utf-8") as f:
+		for raw in f:
+			try:
+				result = json.loads(raw)
+			except ValueError:
+				continue  # partial last line from an interrupted run
+			if not isinstance(result, dict) or "id" not in result:
+				continue
+			if result.get("status") == "ok" or not retry_failed:
+				done.add(str(result["id"]))
+			else:
+				done.discard(str(result["id"]))
+	return done
+
+
+def _open_output(out_path: Path) -> TextIO:
+	out_path.parent.mkdir(parents=True, exist_ok=True)
+	out = open(out_path, "a+", encoding="utf-8")
+	if out.tell():
+		out.seek(out.tell() - 1)
+		if out.read(1) != "\n":
+			out.write("\n")  # terminate a line cut off by an interruption
+	return out
+
+
+async def _process(request: BatchRequest, out: TextIO, stats: BatchStats, priority: int,
+		timeout: Optional[float]) -> None:
+	from agent.tools.intent_router import aroute
+	from agent.tools.llm import llm_priority
+
+	started = datetime.now().isoformat(timespec="seconds")
+	start = time.perf_counter()
+	try:
+		with llm_priority(priority):
+			reply = await aroute(request.text, timeout=timeout)
+		status = "error" if isinstance(reply, str) and reply.lstrip().startswith("[ERROR]") else "ok"
+	except Exception as e:
+		reply, status = f"[ERROR] {e.__class__.__name__}: {e}", "error"
+	elapsed = time.perf_counter() - start
+	stats.elapsed.append(elapsed)
+	if status == "ok":
+		stats.ok += 1
+	else:
+		stats.failed += 1
+	result = {
+		"id": request.id, "status": status, "reply": reply, "started": started,
+		"elapsed_s": round(elapsed, 3), "line": request.line,
+	}
+	out.write(json.dumps(result, ensure_ascii=False, default=str) + "\n")
+	out.flush()  # one complete line per finished request: the resume point
+
+
+async def run_batch(input_path: Path, out_path: Optional[Path] = None, concurrency: Optional[int] = None,
+		retry_failed: bool = True, limit: Optional[int] = None, priority: Optional[str] = None,
+		timeout: Optional[float] = None) -> BatchStats:
+	"""Route every request in input_path that has no result in out_path yet; returns run stats."""
+	from agent.tools.llm import PRIORITY_NAMES
+	cfg = batch_config()
+	out_path = out_path or default_output(input_path)
+	concurrency = max(1, int(concurrency or cfg.get("concurrency", DEFAULT_CONCURRENCY)))
+	priority_name = priority or cfg.get("priority", DEFAULT_PRIORITY)
+	levels = {name: level for level, name in PRIORITY_NAMES.items()}
+	if priority_name not in levels:
+		raise ValueError(f"Unknown priority '{priority_name}' (expected one of: {', '.join(levels)})")
+	if timeout is None and cfg.get("timeout_s"):
+		timeout = float(cfg["timeout_s"])
+
+	stats = BatchStats()
+	done = finished_ids(out_path, retry_failed)
+	if done:
+		print(f"[BATCH] Resuming: {len(done)} requests in {out_path.name} already done")
+	slots = asyncio.Semaphore(concurrency)
+	running: Set[asyncio.Task] = set()
+	start = time.perf_counter()
+
+	async def worker(request: BatchRequest) -> None:
+		try:
+			await _process(request, out, stats, levels[priority_name], timeout)
+		finally:
+			slots.release()
+
+	with _open_output(out_path) as out:
+		try:
+			for request in iter_requests(input_path, stats):
+				stats.total += 1
+				if request.id in done:
+					stats.skipped += 1
+					continue
+				if limit is not None and stats.total - stats.skipped > limit:
+					break
+				await slots.acquire()  # at most `concurrency` requests read ahead and in flight
+				task = asyncio.ensure_future(worker(request))
+				running.add(task)
+				task.add_done_callback(running.discard)
+			if running:
+				await asyncio.gather(*running)
+		finally:
+			for task in running:
+				task.cancel()
+			print(stats.summary(time.perf_counter() - start))
+			print(f"[BATCH] Results in {out_path}")
+	return stats
+
+
+def process_file(input_file: str, out_file: Optional[str] = None, concurrency: Optional[int] = None,
+		retry_failed: bool = True, limit: Optional[int] = None, priority: Optional[str] = None) -> int:
+	"""Blocking entry point (run.py --batch); exit status 1 when any request failed."""
+	input_path = Path(input_file)
+	if not input_path.is_file():
+		print(f"[ERROR] Batch input not found: {input_path}")
+		return 1
+
+	async def run() -> BatchStats:
+		from agent.tools.llm_backends import aclose_async_client
+		try:
+			return await run_batch(input_path, Path(out_file) if out_file else None, concurrency, retry_failed, limit, priority)
+		finally:
+			await aclose_async_client()
+
+	try:
+		stats = asyncio.run(run())
+	except KeyboardInterrupt:
+		print("[BATCH] Interrupted; run the same command again to resume.")
+		return 130
+	except ValueError as e:
+		print(f"[ERROR] {e}")
+		return 1
+	return 1 if stats.failed else 0
+
+
+def main(argv=None) -> int:
+	import argparse
+	parser = argparse.ArgumentParser(prog="python -m agent.tools.batch", description="Route a JSONL file of requests")
+	parser.add_argument("input", help="JSONL requests (text/prompt/input or title+body, optional id/request_id)")
+	parser.add_argument("-o", "--out", help="results JSONL (default: <input>.results.jsonl); reused to resume")
+	parser.add_argument("-c", "--concurrency", type=int, help=f"requests in flight (default batch.concurrency, {DEFAULT_CONCURRENCY})")
+	parser.add_argument("--limit", type=int, help="process at most N new requests")
+	parser.add_argument("--priority", choices=["interactive", "planner", "background"], help="scheduler priority for model calls")
+	parser.add_argument("--no-retry-failed", action="store_true", help="on resume, skip requests that failed before")
+	args = parser.parse_args(argv)
+	return process_file(args.input, args.out, args.concurrency, not args.no_retry_failed, args.limit, args.priority)
+
+
+if __name__ == "__main__":
+	import sys
+	sys.exit(main(sys.argv[1:]))
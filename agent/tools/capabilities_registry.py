@@ -1,6 +1,7 @@
-import json
 from pathlib import Path
 
+from .memory_store import read_json, write_json
+
 # Align with other modules that use agent/memory
 ROOT_DIR = Path(__file__).resolve().parents[1]  # points to 'agent'
 CAPABILITIES_PATH = ROOT_DIR / "memory" / "capabilities.json"
@@ -15,29 +16,28 @@ def load_capabilities():
         }
         save_capabilities(caps)
         return caps
-    try:
-        with open(CAPABILITIES_PATH, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return {}
+    return read_json(CAPABILITIES_PATH, default={})
 
 def save_capabilities(data):
-    with open(CAPABILITIES_PATH, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+    write_json(CAPABILITIES_PATH, data)
+
+def find_capabilities(query: str, limit: int = 5):
+    """
+    Rank registered capabilities and tool functions against the query.
+    Returns a list of CapabilityMatch (name, source, description, score), best first.
+    """
+    from .capability_index import search_capabilities
+    return search_capabilities(query, limit)
 
 def can_handle_request(query: str) -> bool:
     """
     Check if SAIAS can already handle this request
     """
-    caps = load_capabilities()
-    query_lower = query.lower()
-    for module, funcs in caps.items():
-        for name, data in funcs.items():
-            if name.lower() in query_lower:
-                return True
-            if data["description"].lower() in query_lower:
-                return True
-    return False
+    from .capability_index import MATCH_THRESHOLD
+    return any(
+        m.source == "registry" and m.score >= MATCH_THRESHOLD
+        for m in find_capabilities(query, limit=10)
+    )
 
 def register_capability(name: str, description: str, file_path: str):
     caps = load_capabilities()
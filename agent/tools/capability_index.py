@@ -0,0 +1,251 @@
+# agent/tools/capability_index.py
+import ast
+import json
+import math
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+TOOLS_DIR = Path(__file__).parent
+CAPABILITIES_PATH = TOOLS_DIR.parent / "memory" / "capabilities.json"
+
+# Infrastructure the agent runs on, not capabilities it offers the user
+INFRASTRUCTURE_MODULES = {
+	"agent_tools", "job_scheduler", "daemon", "batch", "log_setup", "tracing",
+	"sandbox_pool", "startup_profile", "ui_watchdog",
+}
+
+# Normalized BM25 score (0..1) at which a match counts as "SAIAS can do this"
+MATCH_THRESHOLD = 0.35
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {
+	"a", "an", "and", "are", "as", "at", "be", "by", "can", "could", "do", "for", "from",
+	"i", "if", "in", "into", "is", "it", "me", "my", "of", "on", "or", "please", "so",
+	"that", "the", "this", "to", "want", "with", "would", "you", "your", "not", "yet",
+	"module", "functionality", "documented", "function", "run",
+}
+
+
+def _stem(token: str) -> str:
+	"""Very small suffix stripper so 'patches'/'patching'/'patch' share a term."""
+	for suffix in ("ing", "ies", "es", "ed", "s"):
+		if len(token) > len(suffix) + 2 and token.endswith(suffix):
+			if suffix == "ies":
+				return token[:-3] + "y"
+			if suffix == "s" and token.endswith(("ss", "us", "is")):  # class, status, analysis
+				return token
+			return token[: -len(suffix)]
+	return token
+
+
+def tokenize(text: str) -> List[str]:
+	"""Lowercase, split snake_case/camelCase/punctuation, drop stopwords, light stemming."""
+	if not text:
+		return []
+	text = re.sub(r"([a-z])([A-Z])", r"\1 \2", text).replace("_", " ").lower()
+	return [_stem(t) for t in _TOKEN_RE.findall(text) if t not in _STOPWORDS and len(t) > 1]
+
+
+@dataclass
+class CapabilityMatch:
+	"""A ranked capability hit"""
+	name: str  # "tools.module:function" for tool functions, "module.name" for registry entries
+	source: str  # 'registry' or 'tool'
+	description: str
+	score: float  # normalized 0..1
+
+
+@dataclass
+class _Doc:
+	name: str
+	source: str
+	description: str
+	phrases: Tuple[str, ...]  # lowercase names matched verbatim against the query
+	terms: Counter
+	length: int
+	patterns: Tuple[re.Pattern, ...] = ()
+
+
+class CapabilityIndex:
+	"""
+	BM25 index over capability names/descriptions (capabilities.json) and tool
+	function names/docstrings (parsed from agent/tools/*.py with ast, no imports).
+	Kept in memory; rebuilt only when the registry or a tool file changes.
+	"""
+
+	def __init__(self, tools_dir: Path = TOOLS_DIR, capabilities_path: Path = CAPABILITIES_PATH, k1: float = 1.5, b: float = 0.75):
+		self.tools_dir = Path(tools_dir)
+		self.capabilities_path = Path(capabilities_path)
+		self.k1 = k1
+		self.b = b
+		self._lock = threading.Lock()
+		self._fingerprint: Optional[Tuple] = None
+		self._file_docs: Dict[str, Tuple[Tuple[int, int], List[_Doc]]] = {}  # path → (stat key, docs)
+		self._docs: List[_Doc] = []
+		self._postings: Dict[str, List[Tuple[int, int]]] = {}  # term → [(doc_idx, tf)]
+		self._idf: Dict[str, float] = {}
+		self._unseen_idf = 0.0
+		self._avg_len = 1.0
+
+	# --- change detection ---
+	def _tool_files(self) -> List[Path]:
+		return sorted(
+			p for p in self.tools_dir.glob("*.py")
+			if not p.name.startswith("_") and p.stem not in INFRASTRUCTURE_MODULES
+		)
+
+	@staticmethod
+	def _stat_key(path: Path) -> Tuple[int, int]:
+		try:
+			st = path.stat()
+			return (st.st_mtime_ns, st.st_size)
+		except OSError:
+			return (0, 0)
+
+	def _current_fingerprint(self, files: List[Path]) -> Tuple:
+		return (self._stat_key(self.capabilities_path),) + tuple((p.name,) + self._stat_key(p) for p in files)
+
+	# --- document collection ---
+	@staticmethod
+	def _make_doc(name: str, source: str, description: str, phrases: Tuple[str, ...], text: str) -> _Doc:
+		terms = Counter(tokenize(text))
+		patterns = tuple(re.compile(rf"(?<![a-z0-9_]){re.escape(p)}(?![a-z0-9_])") for p in phrases if p)
+		return _Doc(name, source, description, phrases, terms, sum(terms.values()), patterns)
+
+	def _docs_for_tool_file(self, path: Path) -> List[_Doc]:
+		try:
+			tree = ast.parse(path.read_text(encoding="utf-8"))
+		except Exception:
+			return []
+		docs = []
+		for node in tree.body:
+			if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and not node.name.startswith("_"):
+				doc = (ast.get_docstring(node) or "").strip()
+				# Function names weigh double: they are the most specific signal
+				text = f"{node.name} {node.name} {path.stem} {doc}"
+				docs.append(self._make_doc(f"tools.{path.stem}:{node.name}", "tool", doc, (node.name.lower(),), text))
+		return docs
+
+	def _docs_for_registry(self) -> List[_Doc]:
+		try:
+			with open(self.capabilities_path, "r", encoding="utf-8") as f:
+				caps = json.load(f)
+		except Exception:
+			return []
+		docs = []
+		if not isinstance(caps, dict):
+			return docs
+		for module, entry in caps.items():
+			if not isinstance(entry, dict):
+				continue
+			# Flat shape: {module: {"description": ..., "enabled": ...}}
+			if isinstance(entry.get("description"), str):
+				desc = entry["description"]
+				docs.append(self._make_doc(module, "registry", desc, (module.lower(),), f"{module} {module} {desc}"))
+				continue
+			# Nested shape written by register_capability: {module: {name: {"description": ...}}}
+			for name, data in entry.items():
+				desc = data.get("description", "") if isinstance(data, dict) else ""
+				phrases = (name.lower(), desc.lower()) if desc else (name.lower(),)
+				docs.append(self._make_doc(f"{module}.{name}", "registry", desc, phrases, f"{name} {name} {desc}"))
+		return docs
+
+	def refresh(self, force: bool = False) -> bool:
+		"""Rebuild the index if the registry or any tool file changed. Returns True if rebuilt."""
+		files = self._tool_files()
+		fingerprint = self._current_fingerprint(files)
+		with self._lock:
+			if not force and fingerprint == self._fingerprint:
+				return False
+
+			docs: List[_Doc] = self._docs_for_registry()
+			file_docs = {}
+			for path in files:
+				key = self._stat_key(path)
+				cached = self._file_docs.get(str(path))
+				if cached is None or cached[0] != key or force:
+					cached = (key, self._docs_for_tool_file(path))
+				file_docs[str(path)] = cached
+				docs.extend(cached[1])
+			self._file_docs = file_docs
+
+			postings: Dict[str, List[Tuple[int, int]]] = {}
+			for i, doc in enumerate(docs):
+				for term, tf in doc.terms.items():
+					postings.setdefault(term, []).append((i, tf))
+			n = len(docs) or 1
+			self._idf = {t: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5)) for t, p in postings.items()}
+			self._unseen_idf = math.log(1 + (n + 0.5) / 0.5)
+			self._postings = postings
+			self._docs = docs
+			self._avg_len = (sum(d.length for d in docs) / len(docs)) if docs else 1.0
+			self._fingerprint = fingerprint
+			return True
+
+	@property
+	def version(self) -> Optional[Tuple]:
+		"""Changes whenever the index is rebuilt from changed sources."""
+		return self._fingerprint
+
+	def documents(self) -> List[CapabilityMatch]:
+		"""Every indexed capability/tool (score 0), for indexes built on the same sources."""
+		self.refresh()
+		with self._lock:
+			return [CapabilityMatch(d.name, d.source, d.description, 0.0) for d in self._docs]
+
+	# --- querying ---
+	def search(self, query: str, limit: int = 5) -> List[CapabilityMatch]:
+		"""Return up to `limit` capabilities ranked by normalized BM25 score (best first)."""
+		self.refresh()
+		q = (query or "").lower().strip()
+		q_terms = list(dict.fromkeys(tokenize(q)))
+		if not q or not self._docs:
+			return []
+
+		k1, b = self.k1, self.b
+		scores: Dict[int, float] = {}
+		for term in q_terms:
+			idf = self._idf.get(term)
+			if idf is None:
+				continue
+			for doc_idx, tf in self._postings[term]:
+				norm = k1 * (1 - b + b * self._docs[doc_idx].length / self._avg_len)
+				scores[doc_idx] = scores.get(doc_idx, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+
+		# Upper bound of the BM25 sum for this query → comparable 0..1 scores across queries.
+		# Terms no capability mentions count as maximally rare, so they dilute the score.
+		max_possible = sum(self._idf.get(t, self._unseen_idf) * (k1 + 1) for t in q_terms) or 1.0
+		results: Dict[int, float] = {i: min(1.0, s / max_possible) for i, s in scores.items()}
+
+		# A capability named verbatim in the query is a certain hit
+		for i, doc in enumerate(self._docs):
+			if any(p.search(q) for p in doc.patterns):
+				results[i] = 1.0
+
+		ranked = sorted(results.items(), key=lambda kv: kv[1], reverse=True)[:max(0, limit)]
+		return [
+			CapabilityMatch(self._docs[i].name, self._docs[i].source, self._docs[i].description, round(s, 4))
+			for i, s in ranked if s > 0
+		]
+
+
+_INDEX: Optional[CapabilityIndex] = None
+_INDEX_LOCK = threading.Lock()
+
+
+def get_capability_index() -> CapabilityIndex:
+	"""Process-wide shared index (built lazily on first use)."""
+	global _INDEX
+	if _INDEX is None:
+		with _INDEX_LOCK:
+			if _INDEX is None:
+				_INDEX = CapabilityIndex()
+	return _INDEX
+
+
+def search_capabilities(query: str, limit: int = 5) -> List[CapabilityMatch]:
+	return get_capability_index().search(query, limit)
@@ -1,43 +1,58 @@
 import json
+import threading
 from pathlib import Path
-from typing import List, Dict
+from typing import Any, List, Dict
+
+from agent.tools.memory_store import read_text, write_text
 
 MEMORY_DIR = Path(__file__).resolve().parents[1] / "memory"
 CHAT_LOG = MEMORY_DIR / "chat_log.jsonl"
+_append_lock = threading.Lock()  # seq is read-then-written: concurrent appends (daemon threads) must not interleave
 
 
 def append_chat(role: str, content: str, max_messages: int = 100) -> None:
 	"""Append a chat message and prune to the last max_messages entries."""
 	CHAT_LOG.parent.mkdir(parents=True, exist_ok=True)
-	entry = {"role": role, "content": content}
-	with CHAT_LOG.open("a", encoding="utf-8") as f:
-		f.write(json.dumps(entry, ensure_ascii=False) + "\n")
-	# Prune if longer than max_messages
-	try:
-		lines = CHAT_LOG.read_text(encoding="utf-8").splitlines()
-		if len(lines) > max_messages:
-			trimmed = lines[-max_messages:]
-			CHAT_LOG.write_text("\n".join(trimmed) + "\n", encoding="utf-8")
-	except Exception:
-		pass
+	with _append_lock:
+		entries = load_entries()
+		# seq survives pruning, so the rolling summary can tell which messages it has folded in
+		seq = (entries[-1]["seq"] + 1) if entries else 1
+		entry = {"role": role, "content": content, "seq": seq}
+		with CHAT_LOG.open("a", encoding="utf-8") as f:
+			f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+		# Prune if longer than max_messages
+		try:
+			lines = read_text(CHAT_LOG).splitlines()
+			if len(lines) > max_messages:
+				trimmed = lines[-max_messages:]
+				write_text(CHAT_LOG, "\n".join(trimmed) + "\n")
+		except Exception:
+			pass
+
+
+def load_entries() -> List[Dict[str, Any]]:
+	"""All logged messages as {role, content, seq}; entries written before seq existed are numbered in order."""
+	out: List[Dict[str, Any]] = []
+	previous = 0
+	for line in read_text(CHAT_LOG).splitlines():
+		try:
+			obj = json.loads(line)
+		except Exception:
+			continue
+		if isinstance(obj, dict) and "role" in obj and "content" in obj:
+			seq = obj.get("seq")
+			seq = seq if isinstance(seq, int) and seq > previous else previous + 1
+			previous = seq
+			out.append({"role": obj["role"], "content": obj["content"], "seq": seq})
+	return out
 
 
 def load_recent(n: int = 100) -> List[Dict[str, str]]:
 	"""Load up to the last n chat entries as a list of {role, content}."""
-	try:
-		lines = CHAT_LOG.read_text(encoding="utf-8").splitlines()
-		tail = lines[-n:]
-		out: List[Dict[str, str]] = []
-		for line in tail:
-			try:
-				obj = json.loads(line)
-				if isinstance(obj, dict) and "role" in obj and "content" in obj:
-					out.append({"role": obj["role"], "content": obj["content"]})
-			except Exception:
-				continue
-		return out
-	except FileNotFoundError:
+	if n <= 0:
 		return []
+	try:
+		return [{"role": e["role"], "content": e["content"]} for e in load_entries()[-n:]]
 	except Exception:
 		return []
 
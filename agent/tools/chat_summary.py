@@ -0,0 +1,159 @@
+# agent/tools/chat_summary.py
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from agent.tools.chat_memory import load_entries
+from agent.tools.memory_store import read_json, write_json
+
+MEMORY_DIR = Path(__file__).resolve().parents[1] / "memory"
+SUMMARY_PATH = MEMORY_DIR / "chat_summary.json"
+
+# Defaults for the "chat" section of config.json
+DEFAULT_RECENT_MESSAGES = 4  # the last two exchanges stay verbatim in the prompt
+DEFAULT_SUMMARY_BATCH = 2  # fold once this many messages (one exchange) have aged out of the window
+DEFAULT_SUMMARY_MAX_CHARS = 1200
+FOLD_LIMIT = 20  # messages per summarizer call
+MESSAGE_CLIP = 1000
+
+SUMMARY_SYSTEM_PROMPT = (
+	"You maintain a running summary of a conversation between the user and SAIAS, a local coding assistant. "
+	"Merge the new messages into the existing summary. Keep facts about the user and project, decisions, "
+	"requests, open tasks and preferences; drop greetings and filler. Write compact plain sentences, "
+	"at most {max_chars} characters. Output only the updated summary."
+)
+
+
+def summary_config() -> Dict[str, int]:
+	try:
+		from agent.tools.llm import _config_view
+		chat = _config_view().get("chat", {}) or {}
+	except Exception:
+		chat = {}
+	return {
+		"recent_messages": int(chat.get("recent_messages", DEFAULT_RECENT_MESSAGES)),
+		"summary_batch": max(1, int(chat.get("summary_batch", DEFAULT_SUMMARY_BATCH))),
+		"summary_max_chars": int(chat.get("summary_max_chars", DEFAULT_SUMMARY_MAX_CHARS)),
+	}
+
+
+def load_summary() -> Dict[str, Any]:
+	"""{"summary": str, "through_seq": last folded message seq, "updated": iso time}"""
+	data = read_json(SUMMARY_PATH, default=None)
+	if not isinstance(data, dict):
+		data = {}
+	return {
+		"summary": str(data.get("summary", "")),
+		"through_seq": int(data.get("through_seq", 0) or 0),
+		"updated": data.get("updated"),
+	}
+
+
+def _current_state(entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+	"""load_summary(), reset when the chat log was cleared or restarted (its seqs are below through_seq)."""
+	state = load_summary()
+	last_seq = entries[-1]["seq"] if entries else 0
+	if state["through_seq"] > last_seq:
+		state = {"summary": "", "through_seq": 0, "updated": datetime.now().isoformat(timespec="seconds")}
+		write_json(SUMMARY_PATH, state)
+	return state
+
+
+def pending_messages(recent_messages: int) -> List[Dict[str, Any]]:
+	"""Logged messages that fell out of the verbatim window but are not in the summary yet."""
+	entries = load_entries()
+	older = entries[:-recent_messages] if recent_messages > 0 else entries
+	through = _current_state(entries)["through_seq"]
+	return [e for e in older if e["seq"] > through]
+
+
+def _fold_prompt(summary: str, messages: List[Dict[str, Any]]) -> str:
+	lines = []
+	for m in messages:
+		speaker = "User" if m["role"] == "user" else "SAIAS"
+		text = m["content"].strip()
+		if len(text) > MESSAGE_CLIP:
+			text = text[:MESSAGE_CLIP] + "…"
+		lines.append(f"{speaker}: {text}")
+	current = summary.strip() or "(empty)"
+	return f"Current summary:\n{current}\n\nNew messages:\n" + "\n".join(lines)
+
+
+def update_summary(force: bool = False) -> bool:
+	"""
+	Fold aged-out messages into the running summary, FOLD_LIMIT messages per
+	LLM call at background priority. Returns True if the summary changed.
+	"""
+	from agent.tools.llm import PRIORITY_BACKGROUND, _config_view, chat_completion
+
+	cfg = summary_config()
+	pending = pending_messages(cfg["recent_messages"])
+	if not pending or (len(pending) < cfg["summary_batch"] and not force):
+		return False
+	model = _config_view()["llm"]["chat_model"]
+	max_chars = cfg["summary_max_chars"]
+	system = SUMMARY_SYSTEM_PROMPT.format(max_chars=max_chars)
+	state = load_summary()
+	changed = False
+	for i in range(0, len(pending), FOLD_LIMIT):
+		batch = pending[i:i + FOLD_LIMIT]
+		messages = [
+			{"role": "system", "content": system},
+			{"role": "user", "content": _fold_prompt(state["summary"], batch)},
+		]
+		options = {"num_predict": max(64, int(max_chars / 3)), "temperature": 0.2}
+		try:
+			result = chat_completion(model, messages, options, priority=PRIORITY_BACKGROUND)
+		except Exception as e:
+			print(f"[WARN] Chat summary update failed: {e}")
+			break
+		text = (result.content or "").strip()
+		if not text:
+			break
+		state["summary"] = text[:max_chars]
+		state["through_seq"] = batch[-1]["seq"]
+		state["updated"] = datetime.now().isoformat(timespec="seconds")
+		write_json(SUMMARY_PATH, state)
+		changed = True
+	return changed
+
+
+_worker: Optional[threading.Thread] = None
+_worker_lock = threading.Lock()
+
+
+def schedule_summary_update() -> bool:
+	"""Start a background fold if enough messages aged out and none is running. Returns True if started."""
+	global _worker
+	cfg = summary_config()
+	try:
+		if len(pending_messages(cfg["recent_messages"])) < cfg["summary_batch"]:
+			return False
+	except Exception:
+		return False
+	with _worker_lock:
+		if _worker is not None and _worker.is_alive():
+			return False
+		_worker = threading.Thread(target=update_summary, name="saias-chat-summary", daemon=True)
+		_worker.start()
+		return True
+
+
+def verbatim_window() -> Tuple[str, List[Dict[str, Any]]]:
+	"""(running summary, the last recent_messages entries with their seq) as sent in the chat prompt."""
+	recent_messages = max(summary_config()["recent_messages"], 0)
+	entries = load_entries()
+	state = _current_state(entries)
+	return state["summary"], entries[-recent_messages:] if recent_messages else []
+
+
+def chat_history() -> Tuple[str, List[Dict[str, str]]]:
+	"""
+	(running summary, verbatim messages) for the chat prompt: only the latest
+	recent_messages (2 exchanges by default) go in verbatim. Older messages are
+	in the summary, or about to be folded into it (summary_batch), and remain
+	reachable through retrieval until then.
+	"""
+	summary, window = verbatim_window()
+	return summary, [{"role": e["role"], "content": e["content"]} for e in window]
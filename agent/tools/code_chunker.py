@@ -2,11 +2,20 @@ import ast
 import json
 import os
 import inspect
+import contextvars
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Tuple, Set, Optional
 from pathlib import Path
 from dataclasses import dataclass
-from agent.tools.llm import safe_code_llm, score_code_patch
+from agent.tools.llm import get_model_config, get_scheduler, load_config, score_code_patch
+from agent.tools.llm_budget import DEFAULT_OUTPUT_RATIO, budget_config, estimate_tokens, max_context
+from agent.tools.model_cascade import run_cascade
 from agent.tools.dependency_graph import DependencyGraph
+from agent.tools.patch_journal import chunk_key
+from agent.tools.tracing import current_span, span, traced
+
+log = logging.getLogger(__name__)
 
 ROOT_PATH = Path(__file__).resolve().parents[1]
 
@@ -33,8 +42,9 @@ class ChunkContext:
 
 class CodeChunker:
 	def __init__(self):
-		self.token_limit = 6000  # Conservative limit for 8k context
+		self.token_limit = max_context()  # largest num_ctx a call may request (llm.budget.max_ctx)
 		
+	@traced("chunk.file")
 	def chunk_file(self, file_path: str) -> List[CodeChunk]:
 		"""Break a Python file into context-aware chunks"""
 		with open(file_path, 'r', encoding='utf-8') as f:
@@ -245,24 +255,35 @@ class CodeChunker:
 		prompt_parts.append(chunk.content)
 		return '\n'.join(prompt_parts)
 	
+	@traced("chunk.refactor")
 	def refactor_chunk(self, chunk: CodeChunk, context: ChunkContext) -> Optional[str]:
 		"""Refactor a single chunk with context awareness"""
+		current_span().set(chunk=chunk.name, kind=chunk.chunk_type, lines=chunk.end_line - chunk.start_line + 1)
 		contextual_prompt = self.create_contextual_prompt(chunk, context)
 		
-		# Check token count (rough estimate: 4 chars per token)
-		if len(contextual_prompt) > self.token_limit * 4:
-			print(f"[WARN] Chunk {chunk.name} too large ({len(contextual_prompt)} chars), skipping")
+		# Prompt plus the output budget (~output_ratio x the chunk) must fit the largest context
+		ratio = float(budget_config().get("output_ratio", DEFAULT_OUTPUT_RATIO))
+		needed = estimate_tokens(contextual_prompt) + int(estimate_tokens(chunk.content) * ratio)
+		if needed > self.token_limit:
+			print(f"[WARN] Chunk {chunk.name} too large (≈{needed} tokens with output > {self.token_limit}), skipping")
 			return None
 		
-		print(f"[DEBUG] Refactoring {chunk.chunk_type} '{chunk.name}' with context")
-		refactored = safe_code_llm(contextual_prompt)
+		log.debug("Refactoring %s '%s' with context", chunk.chunk_type, chunk.name)
+		# Small/fast code model first; escalate to the configured code model on invalid or low-scoring output
+		refactored = run_cascade(
+			contextual_prompt,
+			validate=lambda code: self._validate_chunk_integrity(chunk, code, context),
+			score=lambda code: score_code_patch(code, chunk.content),
+			source=chunk.content,
+		)
 		
-		if refactored and self._validate_chunk_integrity(chunk, refactored, context):
+		if refactored:
 			return refactored
 		
 		print(f"[WARN] Refactored chunk {chunk.name} failed validation")
 		return None
 	
+	@traced("chunk.validate")
 	def _validate_chunk_integrity(self, original_chunk: CodeChunk, refactored: str, context: ChunkContext) -> bool:
 		try:
 			ast.parse(refactored)
@@ -314,10 +335,30 @@ class CodeChunker:
 		
 		return '\n'.join(result_lines)
 
-def chunk_and_refactor_file(file_path: str) -> Optional[str]:
-	"""Main function to chunk and refactor a file"""
+def chunk_worker_count() -> int:
+	"""self_patch.chunk_workers from config; 0/absent = as many as the scheduler allows for the code model."""
+	try:
+		configured = int(load_config().get("self_patch", {}).get("chunk_workers", 0) or 0)
+	except Exception:
+		configured = 0
+	if configured > 0:
+		return configured
+	try:
+		return get_scheduler().limit_for(get_model_config()[1])
+	except Exception:
+		return 1
+
+@traced("chunk.refactor_file")
+def chunk_and_refactor_file(file_path: str, journal=None, retries: int = 0) -> Optional[str]:
+	"""
+	Main function to chunk and refactor a file.
+	`journal` (PatchJournal): chunks it already has code for are reused, and every
+	result is checkpointed to it as soon as it arrives. Failed chunks are
+	re-requested up to `retries` more times; chunks that succeeded never are.
+	"""
 	chunker = CodeChunker()
 	chunks = chunker.chunk_file(file_path)
+	current_span().set(file=file_path, chunks=len(chunks))
 	
 	if not chunks:
 		print(f"[ERROR] No chunks extracted from {file_path}")
@@ -328,23 +369,55 @@ def chunk_and_refactor_file(file_path: str) -> Optional[str]:
 		source_code = f.read()
 		
 	try:
-		tree = ast.parse(source_code)
-		lines = source_code.splitlines()
-		context = chunker._build_context(tree, lines)
+		with span("chunk.build_context"):
+			tree = ast.parse(source_code)
+			lines = source_code.splitlines()
+			context = chunker._build_context(tree, lines)
 	except Exception as e:
 		print(f"[ERROR] Failed to build context: {e}")
 		return None, []
 	
-	# Refactor each chunk
+	# Refactor each chunk (concurrently when several endpoints/slots can serve the code model)
 	refactored_chunks = []
 	total_score = 0
 	chunk_metadata = []
 	
-	for chunk in chunks:
-		if chunk.chunk_type == 'imports':
-			continue  # Don't refactor imports
-			
-		refactored = chunker.refactor_chunk(chunk, context)
+	todo = [chunk for chunk in chunks if chunk.chunk_type != 'imports']  # Don't refactor imports
+	keys = [chunk_key(chunk) for chunk in todo]
+	results: List[Optional[str]] = [None] * len(todo)
+	attempts = [0] * len(todo)
+	if journal is not None:
+		for i, key in enumerate(keys):
+			results[i], attempts[i] = journal.chunk(file_path, key)
+		reused = sum(1 for r in results if r)
+		if reused:
+			print(f"[RESUME] Reusing {reused} checkpointed chunk(s) of {file_path}")
+
+	def attempt(i: int) -> Optional[str]:
+		refactored = chunker.refactor_chunk(todo[i], context)
+		if journal is not None:
+			journal.record_chunk(file_path, keys[i], refactored)
+		return refactored
+
+	while True:
+		pending = [i for i in range(len(todo)) if not results[i] and attempts[i] <= retries]
+		if not pending:
+			break
+		if any(attempts[i] for i in pending):
+			print(f"[RETRY] Re-requesting {len(pending)} failed chunk(s) of {file_path}")
+		workers = min(chunk_worker_count(), len(pending)) or 1
+		if workers > 1:
+			with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="saias-chunk") as pool:
+				# copy_context keeps the caller's LLM priority class in the worker threads
+				futures = [pool.submit(contextvars.copy_context().run, attempt, i) for i in pending]
+				outputs = [f.result() for f in futures]
+		else:
+			outputs = [attempt(i) for i in pending]
+		for i, refactored in zip(pending, outputs):
+			results[i] = refactored
+			attempts[i] += 1
+	
+	for chunk, refactored in zip(todo, results):
 		if refactored:
 			score = score_code_patch(refactored, chunk.content)
 			chunk_metadata.append({
@@ -0,0 +1,136 @@
+# agent/tools/code_stream.py
+import ast
+import re
+import threading
+from typing import AsyncIterator, Dict, Iterable, Optional, Tuple
+
+# Opening fence ("```" or "```python") and closing fence, each on its own line
+OPEN_FENCE = re.compile(r"^[ \t]*```[\w+-]*[ \t]*$", re.MULTILINE)
+CLOSE_FENCE = re.compile(r"^[ \t]*```[ \t]*$", re.MULTILINE)
+# Column-0 line that reads like an explanation rather than Python
+PROSE_LINE = re.compile(
+	r"^(?:(?:Note|Notes|Explanation|Changes|Summary|Improvements|Key changes)\b.*:|"
+	r"[A-Z][a-z']+(?: [A-Za-z'`,-]+){3,}[.:]?)\s*$"
+)
+
+_stats_lock = threading.Lock()
+_stats: Dict[str, int] = {"fence": 0, "module": 0, "complete": 0}
+
+
+class CodeStreamCollector:
+	"""
+	Accumulates streamed model output and decides when the code is complete:
+	- "fence": a fenced block was opened and closed
+	- "module": unfenced code that parses, followed by a column-0 prose line
+	Anything after that point is trailing chatter and need not be generated.
+	"""
+
+	def __init__(self):
+		self.text = ""
+		self.reason: Optional[str] = None
+		self._end: Optional[int] = None
+		self._open_end: Optional[int] = None
+		self._scanned = 0  # offset of the first line not yet examined
+
+	@property
+	def done(self) -> bool:
+		return self.reason is not None
+
+	def feed(self, delta: str) -> bool:
+		"""Add a streamed delta; True once the code is complete."""
+		if self.done:
+			return True
+		self.text += delta
+		last_newline = self.text.rfind("\n")
+		if last_newline < self._scanned:
+			return False
+		# Only whole lines are examined, so a fence split across deltas is not misread
+		complete = self.text[: last_newline + 1]
+		if self._open_end is None:
+			match = OPEN_FENCE.search(complete, self._scanned)
+			if match:
+				self._open_end = match.end()
+			else:
+				self._check_module(complete)
+		if self._open_end is not None and not self.done:
+			close = CLOSE_FENCE.search(complete, max(self._open_end + 1, self._scanned))
+			if close:
+				self._finish("fence", close.end())
+		self._scanned = last_newline + 1
+		return self.done
+
+	def _check_module(self, complete: str) -> None:
+		start = self._scanned
+		for line in complete[start:].splitlines(keepends=True):
+			if PROSE_LINE.match(line) and start:
+				code = complete[:start]
+				if code.strip() and _parses(code):
+					self._finish("module", start)
+					return
+			start += len(line)
+
+	def _finish(self, reason: str, end: int) -> None:
+		self.reason = reason
+		self._end = end
+		with _stats_lock:
+			_stats[reason] += 1
+
+	def result(self) -> str:
+		"""Captured output up to the detected end (an unclosed fence is closed, e.g. after a stop sequence)."""
+		if self._end is not None:
+			return self.text[: self._end].rstrip()
+		if self._open_end is not None and not CLOSE_FENCE.search(self.text, self._open_end + 1):
+			return self.text.rstrip() + "\n```"
+		return self.text
+
+
+def _parses(code: str) -> bool:
+	try:
+		return bool(ast.parse(code).body)
+	except SyntaxError:
+		return False
+
+
+def collect_code(deltas: Iterable[str]) -> Tuple[str, Optional[str]]:
+	"""
+	Consume a stream of deltas until the code is complete, then close the stream
+	(which aborts generation server-side). Returns (captured text, stop reason).
+	"""
+	collector = CodeStreamCollector()
+	iterator = iter(deltas)
+	try:
+		for delta in iterator:
+			if collector.feed(delta):
+				break
+	finally:
+		close = getattr(iterator, "close", None)
+		if close is not None:
+			close()
+	return _collected(collector)
+
+
+async def acollect_code(deltas: AsyncIterator[str]) -> Tuple[str, Optional[str]]:
+	"""collect_code() for an async stream (closed with aclose())."""
+	collector = CodeStreamCollector()
+	try:
+		async for delta in deltas:
+			if collector.feed(delta):
+				break
+	finally:
+		aclose = getattr(deltas, "aclose", None)
+		if aclose is not None:
+			await aclose()
+	return _collected(collector)
+
+
+def _collected(collector: CodeStreamCollector) -> Tuple[str, Optional[str]]:
+	if not collector.done:
+		with _stats_lock:
+			_stats["complete"] += 1
+	return collector.result(), collector.reason
+
+
+def early_stop_stats() -> Dict[str, int]:
+	"""How code streams ended: closing fence, complete module, or model finished on its own."""
+	with _stats_lock:
+		return dict(_stats)
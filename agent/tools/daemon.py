@@ -0,0 +1,563 @@
+# agent/tools/daemon.py
+"""
+Headless SAIAS daemon (run.py --serve).
+
+One long-lived asyncio process that keeps the warm state (imported pipeline,
+capability/vector indexes, dependency graph, LLM scheduler and HTTP sessions)
+and serves any number of clients over a Unix socket or localhost TCP.
+
+Protocol: newline-delimited JSON. Each request is
+	{"id": 1, "method": "route", "params": {"text": "hi"}}
+and gets {"id": 1, "result": ...} or {"id": 1, "error": "..."}. Streaming
+methods first send {"id": 1, "delta": "..."} messages, then the final result.
+Requests on one connection run concurrently; {"method": "cancel",
+"params": {"id": 1}} cancels one. A line that is not a JSON object (or looks
+like HTTP, e.g. a browser's cross-origin POST) closes the connection.
+
+TCP connections must first authenticate with the per-install token in
+memory/daemon_token (created mode 0600 on first serve; DaemonClient reads it):
+	{"id": 0, "method": "auth", "params": {"token": "..."}}
+The Unix socket (mode 0600) needs no token.
+
+Methods: ping, route, chat_stream, patches.list, patches.apply,
+self_patch.start / .stop / .status, jobs.status / .trigger, metrics, shutdown.
+The background job scheduler (job_scheduler.py) runs inside the daemon;
+route, chat_stream and patches.apply count as user activity for it.
+
+	python run.py --serve                      # 127.0.0.1:8765 (daemon.host/port)
+	python run.py --serve --socket /tmp/saias.sock
+	python -m agent.tools.daemon route "show patches"
+"""
+import asyncio
+import hmac
+import inspect
+import json
+import logging
+import os
+import secrets
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, Optional
+
+from agent.tools.job_scheduler import (
+	get_job_scheduler, note_user_activity, start_job_scheduler, stop_job_scheduler, trigger_job,
+)
+
+log = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 8  # threads for the blocking pipeline calls
+MAX_LINE = 16 * 1024 * 1024  # longest accepted request line (bytes)
+ACTIVE_METHODS = {"route", "chat_stream", "patches.apply"}  # user activity: background jobs wait / pause
+TOKEN_PATH = Path(__file__).resolve().parents[1] / "memory" / "daemon_token"
+HTTP_PREFIXES = (b"GET ", b"POST ", b"PUT ", b"HEAD ", b"OPTIONS ", b"DELETE ", b"PATCH ", b"CONNECT ", b"HOST:")
+
+
+class RequestError(Exception):
+	"""Reported to the client as {"error": ...}."""
+
+
+def daemon_config() -> Dict[str, Any]:
+	from agent.tools.memory_store import read_json
+	from agent.tools.llm import CONFIG_PATH
+	config = read_json(CONFIG_PATH, default={}, copy_result=False) or {}
+	return config.get("daemon", {}) or {}
+
+
+def load_token(create: bool = False) -> Optional[str]:
+	"""The per-install TCP auth token (created, mode 0600, when `create` and missing)."""
+	try:
+		return TOKEN_PATH.read_text(encoding="utf-8").strip() or None
+	except FileNotFoundError:
+		if not create:
+			return None
+	TOKEN_PATH.parent.mkdir(parents=True, exist_ok=True)
+	token = secrets.token_urlsafe(32)
+	try:
+		fd = os.open(TOKEN_PATH, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+	except FileExistsError:
+		return load_token()  # another process created it first
+	with os.fdopen(fd, "w", encoding="utf-8") as f:
+		f.write(token)
+	return token
+
+
+def _looks_like_http(line: bytes) -> bool:
+	return line.lstrip().upper().startswith(HTTP_PREFIXES)
+
+
+class SelfPatchJob:
+	"""The daemon's (single) background self-patch run."""
+
+	def __init__(self):
+		self.stop_event = threading.Event()
+		self.thread: Optional[threading.Thread] = None
+		self.started: Optional[float] = None
+		self.finished: Optional[float] = None
+		self.patches: Optional[int] = None
+		self.error: Optional[str] = None
+
+	@property
+	def running(self) -> bool:
+		return self.thread is not None and self.thread.is_alive()
+
+	def start(self, on_done: Callable[[], None]) -> bool:
+		if self.running:
+			return False
+		self.stop_event = threading.Event()
+		self.started, self.finished, self.patches, self.error = time.time(), None, None, None
+
+		def run():
+			try:
+				from agent.tools.self_patch import run_self_patch
+				self.patches = run_self_patch(stop_event=self.stop_event)
+			except Exception as e:
+				self.error = str(e)
+				log.error("Daemon self-patch run failed: %s", e)
+			finally:
+				self.finished = time.time()
+				on_done()
+
+		self.thread = threading.Thread(target=run, name="saias-self-patch", daemon=True)
+		self.thread.start()
+		return True
+
+	def stop(self) -> bool:
+		if not self.running:
+			return False
+		self.stop_event.set()
+		return True
+
+	def status(self) -> Dict[str, Any]:
+		return {
+			"running": self.running,
+			"stopping": self.running and self.stop_event.is_set(),
+			"started": self.started,
+			"finished": self.finished,
+			"patches": self.patches,
+			"error": self.error,
+		}
+
+
+class SaiasDaemon:
+	def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, socket_path: Optional[str] = None,
+			workers: int = DEFAULT_WORKERS):
+		self.host = host
+		self.port = port
+		self.socket_path = socket_path
+		self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="saias-daemon")
+		self.started = time.time()
+		self.clients = 0
+		self.requests = 0
+		self.self_patch = SelfPatchJob()
+		self._graph = None
+		self._graph_lock = threading.Lock()
+		self._server: Optional[asyncio.AbstractServer] = None
+		self._stopped: Optional[asyncio.Event] = None
+		self._loop: Optional[asyncio.AbstractEventLoop] = None
+		self._token: Optional[str] = None  # required on TCP connections
+		self.methods: Dict[str, Callable[..., Awaitable[Any]]] = {
+			"ping": self.ping,
+			"route": self.route,
+			"patches.list": self.list_patches,
+			"patches.apply": self.apply_patches,
+			"self_patch.start": self.start_self_patch,
+			"self_patch.stop": self.stop_self_patch,
+			"self_patch.status": self.self_patch_status,
+			"jobs.status": self.jobs_status,
+			"jobs.trigger": self.queue_job,
+			"metrics": self.metrics,
+			"shutdown": self.shutdown,
+		}
+		self.streams: Dict[str, Callable[..., AsyncIterator[str]]] = {"chat_stream": self.chat_stream}
+
+	@classmethod
+	def from_config(cls, host: Optional[str] = None, port: Optional[int] = None,
+			socket_path: Optional[str] = None) -> "SaiasDaemon":
+		cfg = daemon_config()
+		return cls(
+			host=host or cfg.get("host", DEFAULT_HOST),
+			port=int(port if port is not None else cfg.get("port", DEFAULT_PORT)),
+			socket_path=socket_path or cfg.get("socket") or None,
+			workers=int(cfg.get("workers", DEFAULT_WORKERS)),
+		)
+
+	@property
+	def address(self) -> str:
+		return self.socket_path or f"{self.host}:{self.port}"
+
+	# --- shared warm state ---
+	def warm_up(self) -> None:
+		"""Import the pipeline and build the shared indexes once, before accepting clients."""
+		start = time.perf_counter()
+		import agent.tools.intent_router  # noqa: F401  (pulls in llm, planner, capability tools)
+		from agent.tools.capability_index import get_capability_index
+		get_capability_index()
+		from agent.tools.vector_memory import get_vector_index, retrieval_available
+		if retrieval_available():
+			get_vector_index()
+		self.graph()
+		print(f"[OK] Daemon warm-up finished in {time.perf_counter() - start:.1f}s")
+
+	def graph(self, rebuild: bool = False):
+		"""Dependency graph shared by all clients (rebuilt after patches are applied)."""
+		with self._graph_lock:
+			if self._graph is None or rebuild:
+				from agent.tools.dependency_graph import DependencyGraph
+				graph = DependencyGraph()
+				graph.build()
+				self._graph = graph
+			return self._graph
+
+	async def _blocking(self, fn: Callable, *args) -> Any:
+		return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+	# --- methods ---
+	async def ping(self) -> Dict[str, Any]:
+		return {"pid": os.getpid(), "uptime": round(time.time() - self.started, 1), "clients": self.clients, "requests": self.requests}
+
+	async def route(self, text: str) -> str:
+		from agent.tools.intent_router import aroute
+		return await aroute(text)
+
+	async def chat_stream(self, prompt: str, remember: bool = True) -> AsyncIterator[str]:
+		"""Chat reply deltas; with `remember` the turn is logged to chat memory like the GUI does."""
+		from agent.tools.chat_memory import append_chat
+		from agent.tools.llm import astream_chat_llm
+
+		if remember:
+			await self._blocking(append_chat, "user", prompt)
+		parts = []
+		stream = astream_chat_llm(prompt)
+		try:
+			async for delta in stream:
+				parts.append(delta)
+				yield delta
+		finally:
+			await stream.aclose()
+		if remember:
+			from agent.tools.chat_summary import schedule_summary_update
+			await self._blocking(append_chat, "assistant", "".join(parts))
+			schedule_summary_update()
+
+	async def list_patches(self) -> list:
+		from agent.tools.evaluate_patch import get_pending_patch_summaries
+		summaries = await self._blocking(lambda: get_pending_patch_summaries(self.graph()))
+		return [asdict(s) for s in summaries]
+
+	async def apply_patches(self, ids) -> list:
+		from agent.tools.evaluate_patch import apply_patches, parse_patch_ids
+		ids = parse_patch_ids([ids] if isinstance(ids, str) else ids)
+		if not ids:
+			raise RequestError("No patch IDs given")
+		results = await self._blocking(apply_patches, ids)
+		if any(r.applied for r in results):
+			await self._blocking(lambda: self.graph(rebuild=True))
+			trigger_job("tests", "patches applied")
+		return [asdict(r) for r in results]
+
+	async def start_self_patch(self) -> Dict[str, Any]:
+		started = self.self_patch.start(on_done=lambda: self.graph(rebuild=True))
+		return dict(self.self_patch.status(), started_now=started)
+
+	async def stop_self_patch(self) -> Dict[str, Any]:
+		stopping = self.self_patch.stop()
+		return dict(self.self_patch.status(), stop_requested=stopping)
+
+	async def self_patch_status(self) -> Dict[str, Any]:
+		return self.self_patch.status()
+
+	async def jobs_status(self) -> Dict[str, Any]:
+		scheduler = get_job_scheduler()
+		if scheduler is None:
+			raise RequestError("Job scheduler is disabled (jobs.enabled)")
+		return scheduler.status()
+
+	async def queue_job(self, name: str, reason: str = "requested by client") -> Dict[str, Any]:
+		scheduler = get_job_scheduler()
+		if scheduler is None:
+			raise RequestError("Job scheduler is disabled (jobs.enabled)")
+		try:
+			queued = scheduler.trigger(name, reason)
+		except ValueError as e:
+			raise RequestError(str(e))
+		return dict(scheduler.status(), queued_now=queued)
+
+	def _job_done(self, name: str, status: str) -> None:
+		if name in ("self_patch", "graph_rebuild"):
+			self.graph(rebuild=True)
+
+	async def metrics(self) -> Dict[str, Any]:
+		from agent.tools.llm import llm_metrics
+		from agent.tools.tracing import trace_stats
+		return {"llm": llm_metrics(), "spans": trace_stats(), "daemon": await self.ping()}
+
+	async def shutdown(self) -> str:
+		self.self_patch.stop()
+		stop_job_scheduler()
+		if self._stopped is not None:
+			self._loop.call_soon(self._stopped.set)
+		return "shutting down"
+
+	# --- connections ---
+	async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+		self.clients += 1
+		write_lock = asyncio.Lock()
+		tasks: Dict[Any, asyncio.Task] = {}
+		authenticated = self.socket_path is not None  # Unix socket: file permissions are the access check
+
+		async def send(message: Dict[str, Any]) -> None:
+			data = json.dumps(message, ensure_ascii=False, default=str).encode("utf-8") + b"\n"
+			async with write_lock:
+				writer.write(data)
+				await writer.drain()
+
+		try:
+			while True:
+				try:
+					line = await reader.readline()
+				except (asyncio.LimitOverrunError, ValueError):
+					await send({"id": None, "error": "Request line too long"})
+					break
+				if not line:
+					break
+				if not line.strip():
+					continue
+				if _looks_like_http(line):
+					break  # a browser or other HTTP client: never answer, never read the body
+				try:
+					request = json.loads(line)
+					if not isinstance(request, dict):
+						raise ValueError("request must be an object")
+				except ValueError as e:
+					await send({"id": None, "error": f"Bad request: {e}"})
+					break  # not our protocol: stop reading rather than resync on a later line
+				req_id = request.get("id")
+				if not authenticated or request.get("method") == "auth":
+					if not authenticated:
+						token = (request.get("params") or {}).get("token") if request.get("method") == "auth" else None
+						if not isinstance(token, str) or not hmac.compare_digest(token, self._token or ""):
+							await send({"id": req_id, "error": "Authentication required"})
+							break
+						authenticated = True
+					await send({"id": req_id, "result": True})
+					continue
+				if request.get("method") == "cancel":
+					target_id = (request.get("params") or {}).get("id")
+					target = tasks.pop(target_id, None)
+					if target is not None:
+						target.cancel()  # may not have started yet, so reply for it here
+						await send({"id": target_id, "error": "cancelled"})
+					await send({"id": req_id, "result": target is not None})
+					continue
+				task = asyncio.ensure_future(self._dispatch(request, send))
+				tasks[req_id] = task
+
+				def forget(done: asyncio.Task, key=req_id) -> None:
+					if tasks.get(key) is done:
+						del tasks[key]
+				task.add_done_callback(forget)
+		except (ConnectionResetError, BrokenPipeError):
+			pass
+		except asyncio.CancelledError:
+			pass  # server shutting down; the connection is closed below
+		finally:
+			for task in list(tasks.values()):
+				task.cancel()
+			self.clients -= 1
+			try:
+				writer.close()
+				await writer.wait_closed()
+			except (ConnectionResetError, BrokenPipeError, asyncio.CancelledError):
+				pass
+
+	async def _dispatch(self, request: Dict[str, Any], send: Callable[[Dict[str, Any]], Awaitable[None]]) -> None:
+		req_id = request.get("id")
+		method = request.get("method")
+		params = request.get("params") or {}
+		self.requests += 1
+		if isinstance(method, str) and method in ACTIVE_METHODS:
+			note_user_activity()
+		try:
+			if not isinstance(params, dict):
+				raise RequestError("params must be an object")
+			fn = (self.streams.get(method) or self.methods.get(method)) if isinstance(method, str) else None
+			if fn is None:
+				raise RequestError(f"Unknown method '{method}'")
+			# Only a signature mismatch is the client's fault: a TypeError raised inside the method is a bug
+			try:
+				inspect.signature(fn).bind(**params)
+			except TypeError as e:
+				raise RequestError(f"Bad params for '{method}': {e}")
+			if method in self.streams:
+				parts = []
+				async for delta in fn(**params):
+					parts.append(delta)
+					await send({"id": req_id, "delta": delta})
+				await send({"id": req_id, "result": "".join(parts), "done": True})
+			else:
+				await send({"id": req_id, "result": await fn(**params)})
+		except RequestError as e:
+			await send({"id": req_id, "error": str(e)})
+		except Exception as e:
+			log.error("Daemon method '%s' failed: %s", method, e)
+			await send({"id": req_id, "error": f"{e.__class__.__name__}: {e}"})
+
+	# --- lifecycle ---
+	async def serve(self, ready: Optional[Callable[[], None]] = None) -> None:
+		self._loop = asyncio.get_running_loop()
+		self._stopped = asyncio.Event()
+		await self._blocking(self.warm_up)
+		from agent.tools.llm import load_config
+		start_job_scheduler(load_config(), on_done=self._job_done)
+		if self.socket_path:
+			if os.path.exists(self.socket_path):
+				os.unlink(self.socket_path)  # stale socket from a previous run
+			self._server = await asyncio.start_unix_server(self.handle_client, path=self.socket_path, limit=MAX_LINE)
+			os.chmod(self.socket_path, 0o600)
+		else:
+			self._token = load_token(create=True)
+			if self.host not in ("127.0.0.1", "localhost", "::1"):
+				print(f"[WARN] Daemon listening on non-loopback host {self.host}; traffic (including the token) is unencrypted.")
+			self._server = await asyncio.start_server(self.handle_client, self.host, self.port, limit=MAX_LINE)
+			self.port = self._server.sockets[0].getsockname()[1]
+		print(f"[OK] SAIAS daemon listening on {self.address}")
+		if ready:
+			ready()
+		try:
+			await self._stopped.wait()
+		finally:
+			self._server.close()
+			await self._server.wait_closed()
+			if self.socket_path and os.path.exists(self.socket_path):
+				os.unlink(self.socket_path)
+			stop_job_scheduler()
+			self.executor.shutdown(wait=False)
+			from agent.tools.llm_backends import aclose_async_client
+			await aclose_async_client()
+			print("[OK] SAIAS daemon stopped.")
+
+	def stop(self) -> None:
+		"""Thread-safe stop (e.g. from a signal handler or another thread)."""
+		if self._loop is not None and self._stopped is not None:
+			self._loop.call_soon_threadsafe(self._stopped.set)
+
+
+def serve(host: Optional[str] = None, port: Optional[int] = None, socket_path: Optional[str] = None) -> None:
+	daemon = SaiasDaemon.from_config(host, port, socket_path)
+	try:
+		asyncio.run(daemon.serve())
+	except KeyboardInterrupt:
+		print("[OK] SAIAS daemon interrupted.")
+
+
+# --- client ---
+class DaemonClient:
+	"""Minimal blocking client: one request at a time over one connection."""
+
+	def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, socket_path: Optional[str] = None,
+			timeout: Optional[float] = None, token: Optional[str] = None):
+		if socket_path:
+			self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+			self.sock.settimeout(timeout)
+			self.sock.connect(socket_path)
+		else:
+			self.sock = socket.create_connection((host, port), timeout=timeout)
+		self.file = self.sock.makefile("rwb")
+		self._ids = 0
+		if not socket_path:
+			token = token or load_token()
+			if not token:
+				self.close()
+				raise RequestError(f"No daemon token at {TOKEN_PATH} (start the daemon once to create it)")
+			self.call("auth", token=token)
+
+	def close(self) -> None:
+		self.file.close()
+		self.sock.close()
+
+	def __enter__(self) -> "DaemonClient":
+		return self
+
+	def __exit__(self, *exc) -> None:
+		self.close()
+
+	def _send(self, method: str, params: Dict[str, Any]) -> int:
+		self._ids += 1
+		self.file.write(json.dumps({"id": self._ids, "method": method, "params": params}).encode("utf-8") + b"\n")
+		self.file.flush()
+		return self._ids
+
+	def _read(self) -> Dict[str, Any]:
+		line = self.file.readline()
+		if not line:
+			raise ConnectionError("daemon closed the connection")
+		return json.loads(line)
+
+	def call(self, method: str, **params) -> Any:
+		self._send(method, params)
+		message = self._read()
+		while "delta" in message:
+			message = self._read()
+		if "error" in message:
+			raise RequestError(message["error"])
+		return message.get("result")
+
+	def stream(self, method: str, **params) -> Iterator[str]:
+		"""Yield deltas of a streaming method (chat_stream)."""
+		self._send(method, params)
+		while True:
+			message = self._read()
+			if "error" in message:
+				raise RequestError(message["error"])
+			if "delta" in message:
+				yield message["delta"]
+			else:
+				return
+
+
+def main(argv=None) -> int:
+	import argparse
+	parser = argparse.ArgumentParser(prog="python -m agent.tools.daemon", description="Talk to a running SAIAS daemon")
+	parser.add_argument("method", help="e.g. ping, route, chat_stream, patches.list, patches.apply, self_patch.start, jobs.status")
+	parser.add_argument("text", nargs="*", help="text for route/chat_stream, patch IDs for patches.apply, job name for jobs.trigger")
+	parser.add_argument("--host", default=None)
+	parser.add_argument("--port", type=int, default=None)
+	parser.add_argument("--socket", default=None)
+	args = parser.parse_args(argv)
+
+	cfg = daemon_config()
+	text = " ".join(args.text)
+	params: Dict[str, Any] = {}
+	if args.method == "route":
+		params = {"text": text}
+	elif args.method == "chat_stream":
+		params = {"prompt": text}
+	elif args.method == "patches.apply":
+		params = {"ids": args.text}
+	elif args.method == "jobs.trigger":
+		params = {"name": text}
+	try:
+		with DaemonClient(args.host or cfg.get("host", DEFAULT_HOST), args.port or int(cfg.get("port", DEFAULT_PORT)),
+				args.socket or cfg.get("socket") or None) as client:
+			if args.method == "chat_stream":
+				for delta in client.stream(args.method, **params):
+					print(delta, end="", flush=True)
+				print()
+			else:
+				result = client.call(args.method, **params)
+				print(result if isinstance(result, str) else json.dumps(result, indent=2, default=str))
+	except (OSError, RequestError) as e:
+		print(f"[ERROR] {e}")
+		return 1
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main(sys.argv[1:]))
@@ -4,11 +4,13 @@ import os
 from pathlib import Path
 from typing import Dict, Set, List
 from collections import defaultdict
+from agent.tools.tracing import TRACER, current_span, traced
 
 ROOT_PATH = Path(__file__).parent.parent
 
 class DependencyGraph:
-    def __init__(self):
+    def __init__(self, root=None):
+        self.root = Path(root) if root is not None else ROOT_PATH  # tree to scan; paths are relative to it
         self.defines: Dict[str, str] = {}  # name → file
         self.uses: Dict[str, Set[str]] = defaultdict(set)  # file → {names used}
         self.graph: Dict[str, Set[str]] = defaultdict(set)  # file → depends_on_file
@@ -22,7 +24,7 @@ class DependencyGraph:
         except Exception:
             return
 
-        rel_path = os.path.relpath(file_path, ROOT_PATH)
+        rel_path = os.path.relpath(file_path, self.root)
 
         # Extract defined names
         for node in ast.walk(tree):
@@ -38,6 +40,7 @@ class DependencyGraph:
                 used_names.add(node.id)
         self.uses[rel_path] = used_names
 
+    @traced("graph.build")
     def build(self):
         """Scan all Python files and build full graph"""
         self.defines.clear()
@@ -45,7 +48,7 @@ class DependencyGraph:
         self.graph.clear()
         self.reverse_graph.clear()
 
-        for root, _, files in os.walk(ROOT_PATH):
+        for root, _, files in os.walk(self.root):
             for file in files:
                 if file.endswith(".py") and "venv" not in root and "__pycache__" not in root:
                     self.parse_file(os.path.join(root, file))
@@ -58,15 +61,17 @@ class DependencyGraph:
                     if def_file != file:
                         self.graph[file].add(def_file)
                         self.reverse_graph[def_file].add(file)
+        if TRACER.enabled:
+            current_span().set(files=len(self.uses), edges=sum(len(deps) for deps in self.graph.values()))
 
     def get_dependents(self, file_path: str) -> Set[str]:
         """Get all files that depend on this file"""
-        rel_path = os.path.relpath(file_path, ROOT_PATH)
+        rel_path = os.path.relpath(file_path, self.root)
         return self.reverse_graph.get(rel_path, set())
 
     def get_dependencies(self, file_path: str) -> Set[str]:
         """Get all files this file depends on"""
-        rel_path = os.path.relpath(file_path, ROOT_PATH)
+        rel_path = os.path.relpath(file_path, self.root)
         return self.graph.get(rel_path, set())
 
     def will_break_others(self, function_name: str) -> List[str]:
@@ -75,7 +80,7 @@ class DependencyGraph:
         for caller_file, used_names in self.uses.items():
             if function_name in used_names:
                 def_file = self.defines.get(function_name)
-                if def_file and os.path.relpath(caller_file, ROOT_PATH) != def_file:
+                if def_file and os.path.relpath(caller_file, self.root) != def_file:
                     broken.append(caller_file)
         return broken
 
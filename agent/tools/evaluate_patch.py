@@ -1,13 +1,16 @@
 import os
 import sys
-import json
 from pathlib import Path
 import shutil
 import datetime
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional
 from agent.tools.dependency_graph import DependencyGraph
 from agent.tools.rewards import log_reward
 from agent.tools.auto_test import run_patch_tests
 from agent.tools.root_registry import update_registry
+from agent.tools.memory_store import read_json, write_json
+from agent.tools.tracing import current_span, traced
 
 ROOT_DIR = Path(__file__).resolve().parents[1]
 PATCH_DIR = ROOT_DIR / "memory" / "patch_notes"
@@ -15,24 +18,100 @@ PATCH_DIR.mkdir(parents=True, exist_ok=True)
 
 
 def list_pending_patches():
+	"""
+	(file name, patch dict) for every unapplied patch. Patch files are cached by
+	the memory store, so the GUI's periodic polling only stats them; treat the
+	returned dicts as read-only.
+	"""
 	patches = []
 	for patch_file in sorted(PATCH_DIR.glob("PATCH_*.json")):
-		with open(patch_file, "r", encoding="utf-8") as f:
-			data = json.load(f)
-			if not data.get("applied", False):
-				patches.append((patch_file.name, data))
+		data = read_json(patch_file, copy_result=False)
+		if isinstance(data, dict) and not data.get("applied", False):
+			patches.append((patch_file.name, data))
 	return patches
 
 
-def apply_patch_by_id(patch_id):
+@dataclass
+class PatchSummary:
+	"""A pending patch plus its impact on the rest of the project"""
+	patch_id: str
+	target_file: str
+	score: float
+	description: str
+	dependents: List[str] = field(default_factory=list)
+
+
+@dataclass
+class PatchApplyResult:
+	"""Outcome of applying one patch. reason is empty on success."""
+	patch_id: str
+	applied: bool
+	file: str = ""
+	reason: str = ""  # not_found | unreadable | empty_refactor | backup_create_failed | tests_failed | apply_failed
+
+
+def get_pending_patch_summaries(graph: Optional[DependencyGraph] = None) -> List[PatchSummary]:
+	"""Summarize pending patches; the dependency graph is built once for all of them."""
+	patches = list_pending_patches()
+	if not patches:
+		return []
+	if graph is None:
+		graph = DependencyGraph()
+		graph.build()
+	summaries = []
+	for fname, patch in patches:
+		target_file = patch.get("target_file", "")
+		summaries.append(PatchSummary(
+			patch_id=patch.get("patch_id", fname.rsplit(".", 1)[0]),
+			target_file=target_file,
+			score=float(patch.get("refactor_score", 0) or 0),
+			description=patch.get("description", ""),
+			dependents=sorted(graph.get_dependents(target_file)) if target_file else [],
+		))
+	return summaries
+
+
+def refresh_project_state():
+	"""Refresh registry and capability usage (after a successful apply)."""
+	try:
+		update_registry()
+	except Exception as e:
+		print(f"[WARN] Could not update root registry: {e}")
+	try:
+		graph = DependencyGraph()
+		graph.build()
+		graph.update_capability_usage()
+	except Exception as e:
+		print(f"[WARN] Could not update capability usage: {e}")
+
+
+def resolve_patch_id(patch_id: str) -> str:
+	"""The ID of the patch file matching `patch_id`: exactly, else case-insensitively (typed IDs)."""
+	if (PATCH_DIR / f"{patch_id}.json").exists():
+		return patch_id
+	wanted = patch_id.lower()
+	for patch_file in PATCH_DIR.glob("PATCH_*.json"):
+		if patch_file.stem.lower() == wanted:
+			return patch_file.stem
+	return patch_id
+
+
+@traced("patch.apply")
+def apply_patch(patch_id: str, refresh: bool = True) -> PatchApplyResult:
+	"""Apply one patch by ID: back up, write the refactor, run tests, revert on failure."""
+	patch_id = resolve_patch_id(patch_id)
+	current_span().set(patch_id=patch_id)
 	patch_path = PATCH_DIR / f"{patch_id}.json"
 	if not patch_path.exists():
 		print(f"[ERROR] Patch {patch_id} not found.")
 		log_reward("rejected", patch_id=patch_id, reason="not_found")
-		return False
+		return PatchApplyResult(patch_id, False, reason="not_found")
 
-	with open(patch_path, "r", encoding="utf-8") as f:
-		data = json.load(f)
+	data = read_json(patch_path)
+	if not isinstance(data, dict):
+		print(f"[ERROR] Patch {patch_id} is unreadable.")
+		log_reward("rejected", patch_id=patch_id, reason="unreadable")
+		return PatchApplyResult(patch_id, False, reason="unreadable")
 
 	file_path = data.get("target_file")
 	refactored_code = data.get("refactored_code", "")
@@ -52,13 +131,13 @@ def apply_patch_by_id(patch_id):
 		except Exception as e:
 			print(f"[ERROR] Could not create backup for {file_path}: {e}")
 			log_reward("rejected", patch_id=patch_id, file=str(file_path), reason=f"backup_create_failed:{e.__class__.__name__}")
-			return False
+			return PatchApplyResult(patch_id, False, str(file_path), "backup_create_failed")
 
 	try:
 		if not isinstance(refactored_code, str) or not refactored_code.strip():
 			print(f"[ERROR] Patch {patch_id} has no refactored_code content.")
 			log_reward("rejected", patch_id=patch_id, file=str(file_path), reason="empty_refactor")
-			return False
+			return PatchApplyResult(patch_id, False, str(file_path), "empty_refactor")
 
 		# Apply the refactored code
 		with open(file_path, "w", encoding="utf-8") as f:
@@ -74,75 +153,88 @@ def apply_patch_by_id(patch_id):
 		if tests_ok:
 			data["applied"] = True
 			data["approved"] = True
-			with open(patch_path, "w", encoding="utf-8") as f:
-				json.dump(data, f, indent=2)
+			write_json(patch_path, data)
 			log_reward("approved", patch_id=patch_id, file=str(file_path), score=float(data.get("refactor_score", 0)))
 			log_reward("tests_passed", patch_id=patch_id, file=str(file_path))
 			# Refresh registry and capability usage after a successful apply
-			try:
-				update_registry()
-			except Exception as e:
-				print(f"[WARN] Could not update root registry: {e}")
-			try:
-				graph = DependencyGraph()
-				graph.build()
-				graph.update_capability_usage()
-			except Exception as e:
-				print(f"[WARN] Could not update capability usage: {e}")
+			if refresh:
+				refresh_project_state()
 		else:
 			# Revert if tests fail
 			shutil.copyfile(backup_path, file_path)
 			log_reward("tests_failed", patch_id=patch_id, file=str(file_path))
 			print(f"[ERROR] Tests failed after applying {patch_id}. Reverted changes.")
-			return False
+			return PatchApplyResult(patch_id, False, str(file_path), "tests_failed")
 	except Exception as e:
 		log_reward("rejected", patch_id=patch_id, file=str(file_path), reason=f"apply_failed:{e.__class__.__name__}")
 		print(f"[ERROR] Failed to apply patch {patch_id}: {e}")
-		return False
+		return PatchApplyResult(patch_id, False, str(file_path), "apply_failed")
 
 	print(f"[?] Patch {patch_id} applied.")
-	return True
+	return PatchApplyResult(patch_id, True, str(file_path))
 
 
-def print_pending_patch_summaries():
-	patches = list_pending_patches()
-	if not patches:
-		print("? No pending patches.")
-		return
+def apply_patch_by_id(patch_id) -> bool:
+	return apply_patch(patch_id).applied
 
-	print("\n?? Pending Patch Summaries:\n")
-	for fname, patch in patches:
-		print(f"\a Patch ID: {patch['patch_id']}")
-		print(f"  • File: {patch['target_file']}")
-		print(f"  • Score: {patch['refactor_score']}/10")
-		print(f"  • Summary: {patch['description']}")
-		# Show impact
-		target_file = patch['target_file']
-		graph = DependencyGraph()
-		graph.build()
-		dependents = graph.get_dependents(target_file)
-		if dependents:
-			print(f"  • Impacts: {len(dependents)} dependent file(s)")
+
+def apply_patches(patch_ids: Iterable[str]) -> List[PatchApplyResult]:
+	"""Apply several patches; the registry/graph refresh runs once at the end."""
+	results = [apply_patch(pid, refresh=False) for pid in patch_ids]
+	if any(r.applied for r in results):
+		refresh_project_state()
+	return results
+
+
+def parse_patch_ids(args: Iterable[str]) -> List[str]:
+	"""Support space- or comma-separated IDs; case is kept (apply_patch resolves it against the patch files)."""
+	ids = []
+	for a in args:
+		ids.extend(x.strip() for x in a.replace(",", " ").split() if x.strip())
+	return ids
+
+
+def format_patch_summaries(summaries: List[PatchSummary]) -> str:
+	if not summaries:
+		return "No pending patches."
+	lines = ["Pending Patch Summaries:", ""]
+	for p in summaries:
+		lines.append(f"• Patch ID: {p.patch_id}")
+		lines.append(f"  • File: {p.target_file}")
+		lines.append(f"  • Score: {p.score:g}/10")
+		lines.append(f"  • Summary: {p.description}")
+		if p.dependents:
+			lines.append(f"  • Impacts: {len(p.dependents)} dependent file(s)")
 		else:
-			print(f"  • Safe: No other files depend on this")
-		print("")
+			lines.append("  • Safe: No other files depend on this")
+		lines.append("")
+	return "\n".join(lines)
+
+
+def format_apply_results(results: List[PatchApplyResult]) -> str:
+	if not results:
+		return "No patch IDs given."
+	lines = []
+	for r in results:
+		if r.applied:
+			lines.append(f"✓ {r.patch_id} applied.")
+		else:
+			lines.append(f"✗ {r.patch_id} not applied ({r.reason}).")
+	applied = sum(1 for r in results if r.applied)
+	lines.append(f"Applied {applied}/{len(results)} patch(es).")
+	return "\n".join(lines)
+
+
+def print_pending_patch_summaries():
+	print(format_patch_summaries(get_pending_patch_summaries()))
 
 
 if __name__ == "__main__":
 	# CLI behavior:
 	#   python -m agent.tools.evaluate_patch               -> list pending patches
 	#   python -m agent.tools.evaluate_patch PATCH_ID ...  -> apply patches by ID
-	args = [a.strip() for a in sys.argv[1:] if a.strip()]
-	if not args:
+	ids = parse_patch_ids(sys.argv[1:])
+	if not ids:
 		print_pending_patch_summaries()
 	else:
-		# Support space- or comma-separated IDs
-		raw_ids = []
-		for a in args:
-			raw_ids.extend([x for x in a.split(",") if x])
-		ids = [x.strip().upper() for x in raw_ids]
-		applied = 0
-		for pid in ids:
-			if apply_patch_by_id(pid):
-				applied += 1
-		print(f"Applied {applied}/{len(ids)} patch(es).")
+		print(format_apply_results(apply_patches(ids)))
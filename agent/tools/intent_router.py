@@ -1,14 +1,21 @@
 # agent/tools/intent_router.py
+import asyncio
 import json
 from pathlib import Path
-import subprocess
-import sys
 import re
 from agent.tools.agent_tools import can_perform, ensure_capability
-from agent.tools.llm import call_chat_llm
+from agent.tools.llm import acall_chat_llm, call_chat_llm
 from agent.planner import propose_capability, create_new_capability
 from agent.tools.pending_intent import save_proposal, load_proposal, clear_proposal
 from agent.tools.llm import load_config
+from agent.tools.tracing import current_span, traced
+from agent.tools.evaluate_patch import (
+    apply_patches,
+    format_apply_results,
+    format_patch_summaries,
+    get_pending_patch_summaries,
+    parse_patch_ids,
+)
 
 ROOT_DIR = Path(__file__).resolve().parents[2]
 
@@ -39,14 +46,46 @@ def is_patch_command(text: str) -> str:
     return ""
 
 
+@traced("route")
 def route(user_input: str) -> str:
     """
     Main entry point: decide if input is chat, code refactor, or new capability
     """
     user_input = user_input.strip()
+    reply = _route_command(user_input)
+    if reply is not None:
+        return reply
 
+    # Default: treat as chat
+    try:
+        return call_chat_llm(user_input)
+    except Exception as e:
+        return f"[ERROR] Chat failed: {e}"
+
+
+@traced("route")
+async def aroute(user_input: str, timeout=None) -> str:
+    """
+    Async route(): chat awaits the LLM on the event loop; commands (patches,
+    capability proposals/creation) keep their blocking implementations and run
+    on a worker thread.
+    """
+    user_input = user_input.strip()
+    reply = await asyncio.to_thread(_route_command, user_input)
+    if reply is not None:
+        return reply
+
+    try:
+        return await acall_chat_llm(user_input, timeout=timeout)
+    except Exception as e:
+        return f"[ERROR] Chat failed: {e}"
+
+
+def _route_command(user_input: str):
+    """Reply for anything that is not plain chat (None: treat as chat)."""
     # Patch management shortcuts
     cmd = is_patch_command(user_input)
+    current_span().set(chars=len(user_input), command=cmd or None)
     if cmd == "show":
         return run_evaluate_patch()
     if cmd == "approve":
@@ -91,34 +130,17 @@ def route(user_input: str) -> str:
     if t in {"no", "cancel", "stop"}:
         clear_proposal()
         return "Okay, cancelled."
-
-    # Default: treat as chat
-    try:
-        return call_chat_llm(user_input)
-    except Exception as e:
-        return f"[ERROR] Chat failed: {e}"
+    return None
 
 def run_evaluate_patch() -> str:
     try:
-        result = subprocess.run(
-            [sys.executable, "-m", "agent.tools.evaluate_patch"],
-            cwd=ROOT_DIR,
-            capture_output=True,
-            text=True
-        )
-        return result.stdout or "No output"
+        return format_patch_summaries(get_pending_patch_summaries())
     except Exception as e:
         return f"Error: {str(e)}"
 
 def run_apply_patch(user_input: str) -> str:
-    patch_id = user_input.replace("approve patch", "").strip().upper()
+    text = re.sub(r"^\s*(approve|apply)\s+patch(es)?\b", "", user_input, flags=re.IGNORECASE)
     try:
-        result = subprocess.run(
-            [sys.executable, "-m", "agent.tools.evaluate_patch", patch_id],
-            cwd=ROOT_DIR,
-            capture_output=True,
-            text=True
-        )
-        return result.stdout or "Applied."
+        return format_apply_results(apply_patches(parse_patch_ids([text])))
     except Exception as e:
         return f"Error: {str(e)}"
@@ -0,0 +1,374 @@
+# agent/tools/job_scheduler.py
+"""
+Background job scheduler with a resource governor.
+
+Queues periodic and triggered maintenance jobs (self-patch run, registry
+refresh, dependency-graph rebuild, test run) and starts them one at a time,
+only while the machine and the user leave room for them:
+
+	- the user is idle: no GUI/daemon request and no interactive LLM call for jobs.idle_s
+	- the 1-minute load average per CPU is under jobs.max_load_per_cpu (where the OS reports it)
+	- available memory is at least jobs.min_free_memory_mb (where it can be read)
+
+A running preemptible job (self-patch) is paused as soon as an interactive LLM
+call is queued or the user comes back: it stops before its next file and goes
+back to the head of the queue, and its next start resumes from the self-patch
+journal. Other jobs are short and run to completion; their model calls are
+already scheduled behind interactive ones (background priority).
+
+The queue and per-job history persist in memory/job_queue.json, so pending
+work, and a job cut off by exit, survive restarts. Periods come from
+jobs.schedule (seconds; 0 = only when triggered):
+
+	trigger_job("tests", "patches applied")
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from agent.tools.memory_store import read_json, write_json
+from agent.tools.tracing import span
+
+log = logging.getLogger(__name__)
+
+JOBS_PATH = Path(__file__).resolve().parents[1] / "memory" / "job_queue.json"
+DEFAULT_POLL_S = 15
+DEFAULT_IDLE_S = 300
+DEFAULT_MAX_LOAD_PER_CPU = 0.75
+DEFAULT_MIN_FREE_MEMORY_MB = 2048
+# Unattended self-patch runs are opt-in: set jobs.schedule.self_patch to a period (e.g. 21600) to enable them
+DEFAULT_SCHEDULE = {"self_patch": 0, "registry_refresh": 3600, "graph_rebuild": 3600, "tests": 0}
+
+_last_activity = time.time()  # startup counts as activity
+
+
+def note_user_activity() -> None:
+	"""Called for each user request (GUI input, daemon route/chat); jobs wait until idle_s after the last."""
+	global _last_activity
+	_last_activity = time.time()
+
+
+def interactive_calls() -> Tuple[int, float]:
+	"""(interactive LLM calls queued or running, time.time() of the last one) from the LLM scheduler."""
+	llm = sys.modules.get("agent.tools.llm")  # never import it here: no chat yet means nothing interactive
+	if llm is None:
+		return 0, 0.0
+	return llm.get_scheduler().interactive_load()
+
+
+def load_per_cpu() -> Optional[float]:
+	try:
+		return os.getloadavg()[0] / (os.cpu_count() or 1)
+	except (AttributeError, OSError):
+		return None  # not available on Windows
+
+
+def available_memory_mb() -> Optional[float]:
+	try:
+		with open("/proc/meminfo", "r", encoding="utf-8") as f:
+			for line in f:
+				if line.startswith("MemAvailable:"):
+					return int(line.split()[1]) / 1024
+	except (OSError, ValueError):
+		pass
+	try:
+		import psutil
+	except ImportError:
+		return None
+	return psutil.virtual_memory().available / (1024 * 1024)
+
+
+@dataclass
+class Governor:
+	idle_s: float = DEFAULT_IDLE_S
+	max_load_per_cpu: float = DEFAULT_MAX_LOAD_PER_CPU
+	min_free_memory_mb: float = DEFAULT_MIN_FREE_MEMORY_MB
+
+	def blocked(self) -> Optional[str]:
+		"""Why no job may start now (None when one may)."""
+		busy, last_call = interactive_calls()
+		if busy:
+			return f"{busy} interactive LLM call(s) in flight"
+		idle = time.time() - max(_last_activity, last_call)
+		if idle < self.idle_s:
+			return f"user active {idle:.0f}s ago (waiting for {self.idle_s:.0f}s idle)"
+		load = load_per_cpu()
+		if load is not None and self.max_load_per_cpu and load > self.max_load_per_cpu:
+			return f"load average {load:.2f}/CPU > {self.max_load_per_cpu}"
+		free = available_memory_mb()
+		if free is not None and free < self.min_free_memory_mb:
+			return f"{free:.0f} MB memory available < {self.min_free_memory_mb:.0f} MB"
+		return None
+
+	def interrupted(self, since: float) -> Optional[str]:
+		"""Why a preemptible job started at `since` should pause. Load and memory are not
+		rechecked here: the job itself is usually what raised them."""
+		busy, last_call = interactive_calls()
+		if busy:
+			return f"{busy} interactive LLM call(s)"
+		if max(_last_activity, last_call) > since:
+			return "user activity"
+		return None
+
+
+@dataclass
+class Job:
+	name: str
+	run: Callable[[threading.Event], Any]  # gets a stop event; returns a JSON-able result (False = failed)
+	interval_s: float = 0.0  # 0: only when triggered
+	preemptible: bool = False  # honours the stop event and resumes its work on the next run
+
+
+# --- built-in jobs ---
+def _self_patch_job(stop: threading.Event) -> Any:
+	from agent.tools.self_patch import run_self_patch
+	return run_self_patch(stop_event=stop)
+
+
+def _registry_refresh_job(stop: threading.Event) -> Any:
+	from agent.tools.root_registry import update_registry
+	update_registry()
+
+
+def _graph_rebuild_job(stop: threading.Event) -> Any:
+	from agent.tools.dependency_graph import DependencyGraph
+	graph = DependencyGraph()
+	graph.build()
+	graph.update_capability_usage()
+
+
+def _tests_job(stop: threading.Event) -> Any:
+	from agent.tools.auto_test import run_test_suite
+	outcome = run_test_suite()
+	return False if outcome == "failed" else outcome  # "passed" or "no_tests" in the job history
+
+
+JOB_HANDLERS: Dict[str, Tuple[Callable[[threading.Event], Any], bool]] = {
+	"self_patch": (_self_patch_job, True),
+	"registry_refresh": (_registry_refresh_job, False),
+	"graph_rebuild": (_graph_rebuild_job, False),
+	"tests": (_tests_job, False),
+}
+
+
+class JobScheduler:
+	def __init__(self, jobs: List[Job], governor: Optional[Governor] = None, poll_s: float = DEFAULT_POLL_S,
+			path: Path = JOBS_PATH, on_done: Optional[Callable[[str, str], None]] = None):
+		self.jobs = {job.name: job for job in jobs}
+		self.governor = governor or Governor()
+		self.poll_s = max(0.1, float(poll_s))
+		self.path = Path(path)
+		self.on_done = on_done  # (job name, status) after each finished run
+		self.queue: List[Dict[str, Any]] = []  # {"name", "reason", "queued"}, head runs next
+		self.history: Dict[str, Dict[str, Any]] = {}  # job → runs, last_started/last_finished, status, result, error
+		self.running: Optional[str] = None
+		self.blocked_reason: Optional[str] = None
+		self._job_stop = threading.Event()
+		self._job_started = 0.0
+		self._pause_reason: Optional[str] = None
+		self._lock = threading.Lock()
+		self._wake = threading.Event()
+		self._stop = threading.Event()
+		self._thread: Optional[threading.Thread] = None
+
+	@classmethod
+	def from_config(cls, config: Dict[str, Any], on_done: Optional[Callable[[str, str], None]] = None) -> "JobScheduler":
+		cfg = config.get("jobs", {}) or {}
+		schedule = dict(DEFAULT_SCHEDULE, **(cfg.get("schedule") or {}))
+		jobs = [
+			Job(name, run, float(schedule.get(name) or 0), preemptible)
+			for name, (run, preemptible) in JOB_HANDLERS.items()
+		]
+		governor = Governor(
+			float(cfg.get("idle_s", DEFAULT_IDLE_S)),
+			float(cfg.get("max_load_per_cpu", DEFAULT_MAX_LOAD_PER_CPU)),
+			float(cfg.get("min_free_memory_mb", DEFAULT_MIN_FREE_MEMORY_MB)),
+		)
+		return cls(jobs, governor, float(cfg.get("poll_s", DEFAULT_POLL_S)), on_done=on_done)
+
+	# --- persistence ---
+	def _load(self) -> None:
+		state = read_json(self.path, default={}) or {}
+		history = state.get("history") or {}
+		self.history = {name: dict(h) for name, h in history.items() if name in self.jobs and isinstance(h, dict)}
+		self.queue = [e for e in state.get("queue") or [] if isinstance(e, dict) and e.get("name") in self.jobs]
+		cut_off = state.get("running")
+		if cut_off in self.jobs and not self._queued(cut_off):
+			self.queue.insert(0, {"name": cut_off, "reason": "interrupted by exit", "queued": time.time()})
+		now = time.time()
+		for name in self.jobs:
+			# periodic clock starts when a job is first seen: its first run is one interval later
+			self.history.setdefault(name, {"runs": 0, "since": now})
+		if self.queue:
+			print(f"[JOBS] Restored queue: {', '.join(e['name'] for e in self.queue)}")
+
+	def _save(self) -> None:
+		"""Caller holds the lock."""
+		try:
+			write_json(self.path, {"queue": self.queue, "running": self.running, "history": self.history})
+		except OSError as e:
+			log.warning("Could not save job queue to %s: %s", self.path, e)
+
+	def _queued(self, name: str) -> bool:
+		return any(e["name"] == name for e in self.queue)
+
+	# --- lifecycle ---
+	def start(self) -> "JobScheduler":
+		with self._lock:
+			self._load()
+			self._save()
+		self._thread = threading.Thread(target=self._loop, name="saias-jobs", daemon=True)
+		self._thread.start()
+		return self
+
+	def stop(self) -> None:
+		"""Stop scheduling; a running preemptible job is paused and resumes at the next start."""
+		self._stop.set()
+		with self._lock:
+			if self.running is not None:
+				self._pause_reason = "shutdown"
+				self._job_stop.set()
+		self._wake.set()
+
+	def _loop(self) -> None:
+		while not self._stop.is_set():
+			try:
+				self._tick()
+			except Exception as e:
+				log.error("Job scheduler tick failed: %s", e)
+			self._wake.wait(self.poll_s)
+			self._wake.clear()
+
+	def _tick(self) -> None:
+		now = time.time()
+		with self._lock:
+			self._enqueue_due(now)
+			if self.running is not None:
+				job = self.jobs[self.running]
+				if job.preemptible and not self._job_stop.is_set():
+					reason = self.governor.interrupted(self._job_started)
+					if reason:
+						print(f"[JOBS] Pausing {job.name}: {reason}")
+						self._pause_reason = reason
+						self._job_stop.set()
+				return
+			if not self.queue:
+				self.blocked_reason = None
+				return
+			self.blocked_reason = self.governor.blocked()
+			if self.blocked_reason:
+				return
+			entry = self.queue.pop(0)
+			self._start_job(self.jobs[entry["name"]], entry.get("reason", ""))
+
+	def _enqueue_due(self, now: float) -> None:
+		for job in self.jobs.values():
+			if not job.interval_s or job.name == self.running or self._queued(job.name):
+				continue
+			h = self.history[job.name]
+			if now - (h.get("last_finished") or h.get("since") or now) >= job.interval_s:
+				self.queue.append({"name": job.name, "reason": "scheduled", "queued": now})
+				self._save()
+
+	# --- running ---
+	def _start_job(self, job: Job, reason: str) -> None:
+		"""Caller holds the lock."""
+		self.running = job.name
+		self._job_started = time.time()
+		self._job_stop = threading.Event()
+		self._pause_reason = None
+		self.history[job.name]["last_started"] = self._job_started
+		self._save()
+		print(f"[JOBS] Starting {job.name} ({reason})")
+		threading.Thread(target=self._run_job, args=(job, self._job_stop), name=f"saias-job-{job.name}", daemon=True).start()
+
+	def _run_job(self, job: Job, stop: threading.Event) -> None:
+		start = time.perf_counter()
+		result, error = None, None
+		try:
+			with span("jobs.run", job=job.name):
+				result = job.run(stop)
+		except Exception as e:
+			error = f"{e.__class__.__name__}: {e}"
+			log.error("Background job %s failed: %s", job.name, e)
+		elapsed = time.perf_counter() - start
+		with self._lock:
+			h = self.history[job.name]
+			if error is None and stop.is_set() and self._pause_reason:
+				status = "paused"
+				self.queue.insert(0, {"name": job.name, "reason": f"resuming after pause ({self._pause_reason})", "queued": time.time()})
+			else:
+				status = "error" if error else "failed" if result is False else "ok"
+				h["last_finished"] = time.time()
+				h["runs"] = h.get("runs", 0) + 1
+			h.update(status=status, result=result, error=error, elapsed_s=round(elapsed, 1))
+			self.running = None
+			self._save()
+		print(f"[JOBS] {job.name} {status} after {elapsed:.1f}s")
+		if self.on_done is not None and status != "paused":
+			try:
+				self.on_done(job.name, status)
+			except Exception as e:
+				log.warning("Job %s completion hook failed: %s", job.name, e)
+		self._wake.set()
+
+	# --- API ---
+	def trigger(self, name: str, reason: str = "triggered") -> bool:
+		"""Queue a job; False when it is already queued (triggers coalesce)."""
+		if name not in self.jobs:
+			raise ValueError(f"Unknown job '{name}' (expected one of: {', '.join(self.jobs)})")
+		with self._lock:
+			if self._queued(name):
+				return False
+			self.queue.append({"name": name, "reason": reason, "queued": time.time()})
+			self._save()
+		self._wake.set()
+		return True
+
+	def status(self) -> Dict[str, Any]:
+		with self._lock:
+			return {
+				"running": self.running,
+				"pausing": self.running is not None and self._job_stop.is_set(),
+				"queue": [dict(e) for e in self.queue],
+				"blocked": self.blocked_reason,
+				"history": {name: dict(h) for name, h in self.history.items()},
+			}
+
+
+_scheduler: Optional[JobScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def start_job_scheduler(config: Dict[str, Any], on_done: Optional[Callable[[str, str], None]] = None) -> Optional[JobScheduler]:
+	"""Start the process-wide scheduler (None when jobs.enabled is false)."""
+	global _scheduler
+	if not (config.get("jobs", {}) or {}).get("enabled", True):
+		return None
+	with _scheduler_lock:
+		if _scheduler is None:
+			_scheduler = JobScheduler.from_config(config, on_done).start()
+	return _scheduler
+
+
+def get_job_scheduler() -> Optional[JobScheduler]:
+	return _scheduler
+
+
+def stop_job_scheduler() -> None:
+	global _scheduler
+	with _scheduler_lock:
+		scheduler, _scheduler = _scheduler, None
+	if scheduler is not None:
+		scheduler.stop()
+
+
+def trigger_job(name: str, reason: str = "triggered") -> bool:
+	"""Queue a job on the running scheduler (no-op when none is running)."""
+	scheduler = _scheduler
+	return scheduler.trigger(name, reason) if scheduler is not None else False
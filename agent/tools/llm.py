@@ -1,99 +1,759 @@
 import json
-import requests
 import os
 import re
 import ast
+import asyncio
 import difflib
 import time
 import logging
-import ollama
+import contextlib
+import contextvars
+import hashlib
+import itertools
+import threading
+from collections import deque
+from concurrent.futures import Future
 from datetime import datetime
 from pathlib import Path
-from agent.tools.chat_memory import load_recent
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+from agent.tools.memory_store import read_json, read_text, store, write_json
+from agent.tools.llm_backends import ChatResult
+from agent.tools.llm_budget import apply_budget
+from agent.tools.prompt_layout import PREFIX_MONITOR, layout_messages, prefix_stats
+from agent.tools.llm_endpoints import get_endpoint_pool
+from agent.tools.log_setup import lazy_json, record_payload
+from agent.tools.tracing import TRACER, current_span, span, traced
 
 # Path to config
 MEMORY_DIR = Path(__file__).resolve().parents[1] / "memory"
 CONFIG_PATH = str(MEMORY_DIR / "config.json")
 root_registry_data = str(MEMORY_DIR / "root_registry.json")
 capabilities_data = str(MEMORY_DIR / "capabilities.json")
+REWARDS_LOG_PATH = MEMORY_DIR / "rewards_log.json"  # log_patch_score
+_saias_context_cache = None  # (source stat keys, rendered context)
+log = logging.getLogger(__name__)
 
 
 def load_config():
-	with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-		return json.load(f)
+	config = read_json(CONFIG_PATH)
+	if config is None:
+		raise FileNotFoundError(f"Missing or invalid config: {CONFIG_PATH}")
+	return config
+
+def _config_view():
+	"""Shared (uncopied) config for read-only lookups on hot paths."""
+	config = read_json(CONFIG_PATH, copy_result=False)
+	if config is None:
+		raise FileNotFoundError(f"Missing or invalid config: {CONFIG_PATH}")
+	return config
 
 # Load model names from config
 def get_model_config():
-    with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-        data = json.load(f)
-        return data["llm"]["chat_model"], data["llm"]["code_model"]
+    data = _config_view()
+    return data["llm"]["chat_model"], data["llm"]["code_model"]
+
+# --- Request scheduling ---
+# Every model call goes through one scheduler so interactive chat is never stuck
+# behind background self-patching: waiters are served by priority class, each
+# model has its own concurrency limit, a slice of the global budget is reserved
+# for interactive calls, and identical in-flight requests share one result.
+# Non-interactive calls are also grouped by model: a local server that can only
+# keep `max_resident_models` weights loaded would otherwise evict and reload
+# multi-GB models whenever chat and code calls interleave.
+PRIORITY_INTERACTIVE = 0
+PRIORITY_PLANNER = 1
+PRIORITY_BACKGROUND = 2
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_PLANNER: "planner", PRIORITY_BACKGROUND: "background"}
+
+_current_priority: contextvars.ContextVar = contextvars.ContextVar("llm_priority", default=PRIORITY_INTERACTIVE)
+
+
+@contextlib.contextmanager
+def llm_priority(priority: int):
+	"""Run the enclosed model calls (in this thread/context) at the given priority class."""
+	token = _current_priority.set(priority)
+	try:
+		yield
+	finally:
+		_current_priority.reset(token)
+
+
+def current_priority() -> int:
+	return _current_priority.get()
+
+
+class _Ticket:
+	__slots__ = ("priority", "seq", "model", "enqueued", "granted", "event", "notify")
+
+	def __init__(self, priority: int, seq: int, model: str, notify: Optional[Callable[[], None]] = None):
+		self.priority = priority
+		self.seq = seq
+		self.model = model
+		self.enqueued = time.perf_counter()
+		self.granted = False
+		self.event = threading.Event()
+		self.notify = notify  # async waiters: wakes the event loop instead of a blocked thread
+
+
+class _Flight(Future):
+	"""One in-flight request that identical concurrent requests (threads or coroutines) wait on."""
+
+	def wait(self):
+		return self.result()
+
+	async def await_result(self):
+		# shield: a cancelled waiter must not cancel the shared request
+		return await asyncio.shield(asyncio.wrap_future(self))
+
+
+def _wake(future: "asyncio.Future") -> None:
+	if not future.done():
+		future.set_result(None)
+
+
+class LLMScheduler:
+	def __init__(self, model_limits: Optional[Dict[str, int]] = None, default_limit: int = 1,
+			global_limit: Optional[int] = None, interactive_reserve: int = 0, history: int = 200,
+			swap_aware: bool = True, max_resident_models: int = 1, max_batch: int = 8, max_swap_delay: float = 30.0,
+			pool: Optional[Any] = None):
+		self.model_limits = dict(model_limits or {})
+		self.default_limit = max(1, int(default_limit))
+		self.global_limit = global_limit
+		# Endpoint pool (optional): unconfigured model limits and the global limit scale with it
+		self.pool = pool
+		self.interactive_reserve = max(0, int(interactive_reserve))
+		# swap-aware batching: fairness bound = max_batch consecutive grants or max_swap_delay seconds
+		self.swap_aware = swap_aware
+		self.max_resident_models = max(1, int(max_resident_models))
+		self.max_batch = max(1, int(max_batch))
+		self.max_swap_delay = float(max_swap_delay)
+		self._resident: List[str] = []  # most recently used last
+		self._batch_count = 0
+		self._lock = threading.Lock()
+		self._seq = itertools.count()
+		self._waiting: List[_Ticket] = []
+		self._active: Dict[str, int] = {}
+		self._total_active = 0
+		self._inflight: Dict[str, _Flight] = {}
+		# metrics
+		self._waits: Dict[int, deque] = {p: deque(maxlen=history) for p in PRIORITY_NAMES}
+		self._latencies: Dict[str, deque] = {}
+		self._counts: Dict[str, int] = {"submitted": 0, "completed": 0, "failed": 0, "cancelled": 0, "deduplicated": 0}
+		self._history = history
+		self._swaps = 0
+		self._timings: Dict[str, Dict[str, float]] = {}  # model → load/generate seconds from server stats
+		self._interactive_active = 0
+		self._last_interactive = 0.0  # time.time() an interactive call last started or finished
+
+	@classmethod
+	def from_config(cls, config: Dict[str, Any]) -> "LLMScheduler":
+		cfg = (config.get("llm", {}) or {}).get("scheduler", {}) or {}
+		limits = dict(cfg.get("max_concurrency", {}) or {})
+		default = limits.pop("default", 1)
+		return cls(
+			limits, default, cfg.get("global_max"), cfg.get("interactive_reserve", 0),
+			swap_aware=cfg.get("swap_aware", True),
+			max_resident_models=cfg.get("max_resident_models", 1),
+			max_batch=cfg.get("max_batch", 8),
+			max_swap_delay=cfg.get("max_swap_delay_s", 30.0),
+			pool=get_endpoint_pool(config),
+		)
+
+	def limit_for(self, model: str) -> int:
+		if model in self.model_limits:
+			return max(1, int(self.model_limits[model]))
+		capacity = self.pool.capacity(model) if self.pool is not None else 1
+		return max(1, self.default_limit * capacity)
+
+	def _global_budget(self) -> Optional[int]:
+		"""global_max is per endpoint; None means unbounded."""
+		if not self.global_limit:
+			return None
+		return int(self.global_limit) * (len(self.pool.endpoints) if self.pool is not None else 1)
+
+	# --- dispatch ---
+	def _eligible(self, ticket: _Ticket) -> bool:
+		if self._active.get(ticket.model, 0) >= self.limit_for(ticket.model):
+			return False
+		budget = self._global_budget()
+		if budget:
+			if ticket.priority != PRIORITY_INTERACTIVE:
+				budget = max(1, budget - self.interactive_reserve)
+			if self._total_active >= budget:
+				return False
+		return not self._swap_blocked(ticket)
+
+	def _swap_blocked(self, ticket: _Ticket) -> bool:
+		"""Hold back a non-interactive call that would evict a model that still has work, within the fairness bound."""
+		if not self.swap_aware or ticket.priority == PRIORITY_INTERACTIVE or not self._resident:
+			return False
+		if ticket.model in self._resident or len(self._resident) < self.max_resident_models:
+			return False
+		resident_busy = any(self._active.get(m, 0) for m in self._resident) or any(
+			t.model in self._resident for t in self._waiting
+		)
+		return resident_busy and not self._fairness_due()
+
+	def _fairness_due(self) -> bool:
+		"""True once the resident model has had max_batch turns, or another model's call waited max_swap_delay."""
+		if self._batch_count >= self.max_batch:
+			return True
+		now = time.perf_counter()
+		return any(
+			t.model not in self._resident and now - t.enqueued >= self.max_swap_delay
+			for t in self._waiting
+		)
+
+	def _order(self, waiting: List[_Ticket]) -> List[_Ticket]:
+		# Within a priority class, calls for an already-loaded model go first (FIFO once fairness is due)
+		if self.swap_aware and not self._fairness_due():
+			return sorted(waiting, key=lambda t: (t.priority, t.model not in self._resident, t.seq))
+		return sorted(waiting, key=lambda t: (t.priority, t.seq))
+
+	def _note_resident(self, model: str) -> None:
+		if model in self._resident:
+			self._resident.remove(model)
+			self._resident.append(model)
+			if any(t.model != model for t in self._waiting):
+				self._batch_count += 1
+			return
+		if len(self._resident) >= self.max_resident_models:
+			evicted = self._resident.pop(0)
+			self._swaps += 1
+			logging.info("[LLM] model swap %s -> %s (swap #%d)", evicted, model, self._swaps)
+		self._resident.append(model)
+		self._batch_count = 0
+
+	def _grant(self, ticket: _Ticket) -> None:
+		self._waiting.remove(ticket)
+		self._active[ticket.model] = self._active.get(ticket.model, 0) + 1
+		self._total_active += 1
+		ticket.granted = True
+		if ticket.priority == PRIORITY_INTERACTIVE:
+			self._interactive_active += 1
+			self._last_interactive = time.time()
+		self._waits[ticket.priority].append(time.perf_counter() - ticket.enqueued)
+		self._note_resident(ticket.model)
+		ticket.event.set()
+		if ticket.notify is not None:
+			ticket.notify()
+
+	def _dispatch(self) -> None:
+		"""Grant free slots to the best eligible waiters. Caller holds the lock."""
+		progressed = True
+		while progressed and self._waiting:
+			progressed = False
+			for ticket in self._order(self._waiting):
+				if self._eligible(ticket):
+					self._grant(ticket)
+					progressed = True
+					break
+
+	def _acquire(self, model: str, priority: int) -> _Ticket:
+		with self._lock:
+			ticket = _Ticket(priority, next(self._seq), model)
+			self._waiting.append(ticket)
+			self._counts["submitted"] += 1
+			self._dispatch()
+		ticket.event.wait()
+		return ticket
+
+	async def _aacquire(self, model: str, priority: int) -> _Ticket:
+		"""_acquire() without blocking the event loop; cancelling the waiter gives up its place."""
+		loop = asyncio.get_running_loop()
+		granted = loop.create_future()
+
+		def notify():
+			try:
+				loop.call_soon_threadsafe(_wake, granted)
+			except RuntimeError:
+				pass  # loop closed; its tasks were cancelled (and their tickets abandoned) first
+
+		with self._lock:
+			ticket = _Ticket(priority, next(self._seq), model, notify)
+			self._waiting.append(ticket)
+			self._counts["submitted"] += 1
+			self._dispatch()
+		try:
+			await granted
+		except asyncio.CancelledError:
+			with self._lock:
+				if ticket.granted:  # granted while the cancellation was being delivered
+					self._active[ticket.model] -= 1
+					self._total_active -= 1
+					self._interactive_done(ticket)
+				else:
+					self._waiting.remove(ticket)
+				self._counts["cancelled"] += 1
+				self._dispatch()
+			raise
+		return ticket
+
+	def _interactive_done(self, ticket: _Ticket) -> None:
+		if ticket.priority == PRIORITY_INTERACTIVE:
+			self._interactive_active -= 1
+			self._last_interactive = time.time()
+
+	def _release(self, ticket: _Ticket, elapsed: float, ok: bool, cancelled: bool = False) -> None:
+		with self._lock:
+			self._active[ticket.model] -= 1
+			self._total_active -= 1
+			self._interactive_done(ticket)
+			self._counts["cancelled" if cancelled else "completed" if ok else "failed"] += 1
+			self._latencies.setdefault(ticket.model, deque(maxlen=self._history)).append(elapsed)
+			self._dispatch()
+
+	# --- public API ---
+	def run(self, model: str, fn: Callable[[], Any], priority: Optional[int] = None, key: Optional[str] = None) -> Any:
+		"""
+		Run fn() once a slot for `model` is granted. Identical requests (same key)
+		issued while one is in flight wait for and share its result.
+		"""
+		if priority is None:
+			priority = current_priority()
+
+		flight = None
+		if key is not None:
+			with self._lock:
+				existing = self._inflight.get(key)
+				if existing is not None:
+					self._counts["deduplicated"] += 1
+				else:
+					flight = self._inflight[key] = _Flight()
+			if existing is not None:
+				return existing.wait()
+
+		try:
+			with span("llm.queue", model=model, priority=PRIORITY_NAMES.get(priority, priority)):
+				ticket = self._acquire(model, priority)
+			start = time.perf_counter()
+			ok = False
+			try:
+				result = fn()
+				ok = True
+			finally:
+				self._release(ticket, time.perf_counter() - start, ok)
+		except BaseException as e:
+			if flight is not None:
+				flight.set_exception(e)
+			raise
+		else:
+			if flight is not None:
+				flight.set_result(result)
+			return result
+		finally:
+			if flight is not None:
+				with self._lock:
+					self._inflight.pop(key, None)
+
+	async def arun(self, model: str, fn: Callable[[], Awaitable[Any]], priority: Optional[int] = None,
+			key: Optional[str] = None) -> Any:
+		"""
+		run() for coroutines: awaits fn() once a slot is granted, sharing slots,
+		priorities and de-duplication with threaded callers. Cancelling the task
+		frees its place in the queue (or its slot).
+		"""
+		if priority is None:
+			priority = current_priority()
+
+		flight = None
+		if key is not None:
+			with self._lock:
+				existing = self._inflight.get(key)
+				if existing is not None:
+					self._counts["deduplicated"] += 1
+				else:
+					flight = self._inflight[key] = _Flight()
+			if existing is not None:
+				return await existing.await_result()
+
+		try:
+			queued = time.perf_counter_ns()
+			ticket = await self._aacquire(model, priority)
+			TRACER.add("llm.queue", queued, time.perf_counter_ns() - queued, model=model,
+				priority=PRIORITY_NAMES.get(priority, priority))
+			start = time.perf_counter()
+			ok = cancelled = False
+			try:
+				result = await fn()
+				ok = True
+			except asyncio.CancelledError:
+				cancelled = True
+				raise
+			finally:
+				self._release(ticket, time.perf_counter() - start, ok, cancelled)
+		except asyncio.CancelledError:
+			if flight is not None:
+				# Waiters (possibly threads) were not cancelled themselves
+				flight.set_exception(RuntimeError(f"Shared request for '{model}' was cancelled"))
+			raise
+		except BaseException as e:
+			if flight is not None:
+				flight.set_exception(e)
+			raise
+		else:
+			if flight is not None:
+				flight.set_result(result)
+			return result
+		finally:
+			if flight is not None:
+				with self._lock:
+					self._inflight.pop(key, None)
+
+	def stream(self, model: str, gen_fn: Callable[[], Iterator[Any]], priority: Optional[int] = None) -> Iterator[Any]:
+		"""Hold a slot for `model` while the generator from gen_fn() is consumed (no de-duplication)."""
+		if priority is None:
+			priority = current_priority()
+		queued = time.perf_counter_ns()
+		ticket = self._acquire(model, priority)
+		start = time.perf_counter()
+		start_ns = time.perf_counter_ns()
+		TRACER.add("llm.queue", queued, start_ns - queued, model=model, priority=PRIORITY_NAMES.get(priority, priority))
+		ok = False
+		try:
+			yield from gen_fn()
+			ok = True
+		except GeneratorExit:
+			ok = True  # consumer stopped early (e.g. enough output); not a failure
+			raise
+		finally:
+			self._release(ticket, time.perf_counter() - start, ok)
+			# Recorded after the fact: a span held open across yields would nest under the consumer's spans
+			TRACER.add("llm.stream", start_ns, time.perf_counter_ns() - start_ns, model=model, **({} if ok else {"error": "failed"}))
+
+	async def astream(self, model: str, gen_fn: Callable[[], AsyncIterator[Any]],
+			priority: Optional[int] = None) -> AsyncIterator[Any]:
+		"""stream() for coroutines: holds a slot while the async iterator from gen_fn() is consumed."""
+		if priority is None:
+			priority = current_priority()
+		queued = time.perf_counter_ns()
+		ticket = await self._aacquire(model, priority)
+		start = time.perf_counter()
+		start_ns = time.perf_counter_ns()
+		TRACER.add("llm.queue", queued, start_ns - queued, model=model, priority=PRIORITY_NAMES.get(priority, priority))
+		ok = cancelled = False
+		stream = gen_fn()
+		try:
+			async for item in stream:
+				yield item
+			ok = True
+		except GeneratorExit:
+			ok = True  # consumer stopped early
+			raise
+		except asyncio.CancelledError:
+			cancelled = True
+			raise
+		finally:
+			aclose = getattr(stream, "aclose", None)
+			if aclose is not None:
+				await aclose()
+			self._release(ticket, time.perf_counter() - start, ok, cancelled)
+			TRACER.add("llm.stream", start_ns, time.perf_counter_ns() - start_ns, model=model,
+				**({} if ok else {"error": "cancelled" if cancelled else "failed"}))
+
+	def record_timings(self, model: str, load_seconds: float = 0.0, generate_seconds: float = 0.0) -> None:
+		"""Attribute server-reported time to (re)loading weights vs. prompt processing + generation."""
+		with self._lock:
+			t = self._timings.setdefault(model, {"load_seconds": 0.0, "generate_seconds": 0.0, "reloads": 0})
+			t["load_seconds"] += load_seconds
+			t["generate_seconds"] += generate_seconds
+			if load_seconds >= 0.5:  # sub-second load_duration is bookkeeping, not a reload
+				t["reloads"] += 1
+				logging.info("[LLM] %s reload took %.1fs", model, load_seconds)
+
+	def interactive_load(self) -> Tuple[int, float]:
+		"""(interactive calls queued or running, time.time() of the last one's start/finish); cheap to poll."""
+		with self._lock:
+			queued = sum(1 for t in self._waiting if t.priority == PRIORITY_INTERACTIVE)
+			return queued + self._interactive_active, self._last_interactive
+
+	def metrics(self) -> Dict[str, Any]:
+		"""Snapshot: queue depth and wait times per priority class, active/latency per model."""
+		with self._lock:
+			depth = {name: 0 for name in PRIORITY_NAMES.values()}
+			for t in self._waiting:
+				depth[PRIORITY_NAMES.get(t.priority, str(t.priority))] += 1
+			waits = {}
+			for p, samples in self._waits.items():
+				s = sorted(samples)
+				waits[PRIORITY_NAMES[p]] = {
+					"count": len(s),
+					"avg": (sum(s) / len(s)) if s else 0.0,
+					"p95": s[min(len(s) - 1, int(len(s) * 0.95))] if s else 0.0,
+					"max": s[-1] if s else 0.0,
+				}
+			latency = {
+				m: {"count": len(d), "avg": sum(d) / len(d), "last": d[-1]}
+				for m, d in self._latencies.items() if d
+			}
+			return {
+				"queue_depth": depth,
+				"waiting": len(self._waiting),
+				"active": dict(self._active),
+				"inflight_keys": len(self._inflight),
+				"wait_seconds": waits,
+				"latency_seconds": latency,
+				"resident_models": list(self._resident),
+				"swaps": self._swaps,
+				"model_time": {m: dict(t) for m, t in self._timings.items()},
+				**self._counts,
+			}
+
+
+_scheduler: Optional[LLMScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> LLMScheduler:
+	global _scheduler
+	if _scheduler is None:
+		with _scheduler_lock:
+			if _scheduler is None:
+				try:
+					_scheduler = LLMScheduler.from_config(_config_view())
+				except Exception:
+					_scheduler = LLMScheduler()
+	return _scheduler
+
+
+def configure_scheduler(scheduler: Optional[LLMScheduler] = None) -> LLMScheduler:
+	"""Replace the process-wide scheduler (None → rebuild from config.json)."""
+	global _scheduler
+	with _scheduler_lock:
+		_scheduler = scheduler
+	return get_scheduler()
+
+
+def llm_metrics() -> Dict[str, Any]:
+	metrics = get_scheduler().metrics()
+	metrics["prefix"] = prefix_stats()
+	return metrics
+
+
+def _record_server_timings(model: str, result: ChatResult) -> None:
+	"""Feed server-reported load/prompt/eval time (Ollama reports these) into the swap/generation stats."""
+	generate = result.prompt_seconds + result.generate_seconds
+	if result.load_seconds or generate:
+		get_scheduler().record_timings(model, result.load_seconds, generate)
+
+
+def _request_key(model: str, messages: List[Dict[str, str]], options: Optional[Dict[str, Any]] = None) -> str:
+	blob = json.dumps([model, messages, options or {}], sort_keys=True, ensure_ascii=False)
+	return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+
+def chat_completion(model: str, messages: List[Dict[str, str]], options: Optional[Dict[str, Any]] = None,
+		timeout: Optional[float] = None, priority: Optional[int] = None, source: Optional[str] = None) -> ChatResult:
+	"""
+	Scheduled, load-balanced chat completion. The endpoint serving `model` decides
+	the backend (Ollama or OpenAI-compatible, per llm.endpoints[].api).
+	num_ctx/num_predict are sized per call (llm_budget); pass the text being
+	rewritten as `source` to cap output relative to it.
+	"""
+	options = apply_budget(model, messages, options, source)
+
+	def send():
+		return get_endpoint_pool().request(
+			model, lambda ep: ep.backend.chat(ep.url, model, messages, options, timeout)
+		)
+
+	with span("llm.request", model=model, num_ctx=options.get("num_ctx")) as s:
+		result = get_scheduler().run(model, send, priority=priority, key=_request_key(model, messages, options))
+		s.set(output_tokens=result.output_tokens)
+	_record_server_timings(model, result)
+	return result
+
+
+def stream_chat_completion(model: str, messages: List[Dict[str, str]], options: Optional[Dict[str, Any]] = None,
+		timeout: Optional[float] = None, priority: Optional[int] = None, source: Optional[str] = None) -> Iterator[str]:
+	"""Streaming counterpart of chat_completion(): yields content deltas."""
+	options = apply_budget(model, messages, options, source)
+
+	def open_stream():
+		return get_endpoint_pool().request_stream(
+			model, lambda ep: ep.backend.stream_chat(ep.url, model, messages, options, timeout)
+		)
+
+	yield from get_scheduler().stream(model, open_stream, priority=priority)
+
+
+# --- asyncio API ---
+# Same scheduler, endpoint pool and budgets as the blocking calls above, but
+# awaiting the HTTP round trip (httpx.AsyncClient, see llm_backends) instead of
+# holding a thread: hundreds of requests can wait on one event loop. Cancelling
+# the task frees its scheduler slot and aborts the HTTP request; `timeout`
+# bounds each HTTP request as in the blocking calls.
+async def achat_completion(model: str, messages: List[Dict[str, str]], options: Optional[Dict[str, Any]] = None,
+		timeout: Optional[float] = None, priority: Optional[int] = None, source: Optional[str] = None) -> ChatResult:
+	"""Async chat_completion()."""
+	options = apply_budget(model, messages, options, source)
+
+	async def send():
+		return await get_endpoint_pool().arequest(
+			model, lambda ep: ep.backend.achat(ep.url, model, messages, options, timeout)
+		)
+
+	with span("llm.request", model=model, num_ctx=options.get("num_ctx")) as s:
+		result = await get_scheduler().arun(model, send, priority=priority, key=_request_key(model, messages, options))
+		s.set(output_tokens=result.output_tokens)
+	_record_server_timings(model, result)
+	return result
+
+
+async def astream_chat_completion(model: str, messages: List[Dict[str, str]], options: Optional[Dict[str, Any]] = None,
+		timeout: Optional[float] = None, priority: Optional[int] = None, source: Optional[str] = None) -> AsyncIterator[str]:
+	"""Async stream_chat_completion(): yields content deltas."""
+	options = apply_budget(model, messages, options, source)
+
+	def open_stream():
+		return get_endpoint_pool().arequest_stream(
+			model, lambda ep: ep.backend.astream_chat(ep.url, model, messages, options, timeout)
+		)
+
+	stream = get_scheduler().astream(model, open_stream, priority=priority)
+	try:
+		async for delta in stream:
+			yield delta
+	finally:
+		await stream.aclose()
+
 
-# Core LLM call via Ollama API
-def call_ollama_model(model_name, prompt, system_prompt=None):
+def _prompt_messages(prompt: str, system_prompt: Optional[str] = None) -> List[Dict[str, str]]:
+	messages = []
+	if system_prompt:
+		messages.append({"role": "system", "content": system_prompt})
+	messages.append({"role": "user", "content": prompt})
+	return messages
+
+# Core LLM call (backend chosen by endpoint config; historically Ollama-only)
+def call_ollama_model(model_name, prompt, system_prompt=None, options=None, source=None):
     try:
-        messages = []
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-        messages.append({"role": "user", "content": prompt})
-
-        response = ollama.chat(
-            model=model_name,
-            messages=messages,
-            stream=False
-        )
-        return response['message']['content'].strip()
+        messages = _prompt_messages(prompt, system_prompt)
+        return chat_completion(model_name, messages, options, source=source).content.strip()
     except Exception as e:
         return f"[ERROR] Failed to call model '{model_name}': {e}"
 
 
+async def acall_ollama_model(model_name, prompt, system_prompt=None, options=None, source=None):
+	try:
+		messages = _prompt_messages(prompt, system_prompt)
+		return (await achat_completion(model_name, messages, options, source=source)).content.strip()
+	except Exception as e:
+		return f"[ERROR] Failed to call model '{model_name}': {e}"
+
+
+def _code_request(model_name: str, prompt: str, system_prompt: Optional[str]):
+	"""(messages, options) for a streamed code call; None when llm.streaming.code_early_stop is off."""
+	streaming = _config_view().get("llm", {}).get("streaming", {}) or {}
+	if not streaming.get("code_early_stop", True):
+		return None
+	stops = [s for s in streaming.get("code_stop", []) if s]
+	options = {"stop": stops} if stops else None
+	messages = layout_messages(system_prompt or "", user=prompt)
+	if system_prompt:
+		PREFIX_MONITOR.observe("code", model_name, system_prompt.strip(), messages)
+	return messages, options
+
+
+def _code_result(model_name: str, text: str, reason: Optional[str], start: float) -> str:
+	if reason:
+		print(f"[EARLY STOP] '{model_name}' stopped on {reason} after {len(text)} chars ({time.perf_counter() - start:.1f}s)")
+	return text.strip()
+
+
+def complete_code(model_name: str, prompt: str, system_prompt: Optional[str] = None, source: Optional[str] = None) -> str:
+	"""
+	Code generation call. With llm.streaming.code_early_stop (default on) the reply
+	is streamed and generation is stopped once the code is complete (closing fence
+	or a parseable module followed by prose); llm.streaming.code_stop sequences are
+	sent to the server as well.
+	"""
+	from agent.tools.code_stream import collect_code
+
+	request = _code_request(model_name, prompt, system_prompt)
+	if request is None:
+		return call_ollama_model(model_name, prompt, system_prompt, source=source)
+	messages, options = request
+	start = time.perf_counter()
+	try:
+		with span("llm.complete_code", model=model_name) as s:
+			text, reason = collect_code(stream_chat_completion(model_name, messages, options, source=source))
+			s.set(chars=len(text), early_stop=reason or None)
+	except Exception as e:
+		log.error("Code model '%s' failed: %s", model_name, e)
+		return f"[ERROR] Failed to call model '{model_name}': {e}"
+	return _code_result(model_name, text, reason, start)
+
+
+async def acomplete_code(model_name: str, prompt: str, system_prompt: Optional[str] = None,
+		source: Optional[str] = None) -> str:
+	"""Async complete_code()."""
+	from agent.tools.code_stream import acollect_code
+
+	request = _code_request(model_name, prompt, system_prompt)
+	if request is None:
+		return await acall_ollama_model(model_name, prompt, system_prompt, source=source)
+	messages, options = request
+	start = time.perf_counter()
+	try:
+		with span("llm.complete_code", model=model_name) as s:
+			text, reason = await acollect_code(astream_chat_completion(model_name, messages, options, source=source))
+			s.set(chars=len(text), early_stop=reason or None)
+	except Exception as e:
+		log.error("Code model '%s' failed: %s", model_name, e)
+		return f"[ERROR] Failed to call model '{model_name}': {e}"
+	return _code_result(model_name, text, reason, start)
+
+
 
-def get_saias_context():
-	"""Return a compact context for chat: context.md (truncated), capability summary, and top-level dirs."""
+def get_saias_context(include_notes: bool = True):
+	"""
+	Return a compact context for chat: context.md (truncated), capability summary, and top-level dirs.
+	include_notes=False leaves out context.md and the capability preview (chat retrieves relevant parts instead).
+	"""
 	capabilities_file = Path(capabilities_data)
 	root_registry_file = Path(root_registry_data)
 	context_md_file = MEMORY_DIR / "context.md"
 
+	# Sources are served from the memory store; rebuild only when one changes on disk
+	global _saias_context_cache
+	stamp = tuple(store.stat_key(p) for p in (context_md_file, capabilities_file, root_registry_file))
+	stamp = stamp + (include_notes,)
+	if _saias_context_cache is not None and _saias_context_cache[0] == stamp:
+		return _saias_context_cache[1]
+
 	# Context notes (truncate to avoid verbosity)
-	ctx_str = ""
-	if context_md_file.exists():
-		try:
-			text = context_md_file.read_text(encoding="utf-8").strip()
-			ctx_str = (text[:1000] + ("…" if len(text) > 1000 else ""))
-		except Exception:
-			ctx_str = ""
+	text = read_text(context_md_file).strip()
+	ctx_str = (text[:1000] + ("…" if len(text) > 1000 else ""))
 
 	# Capabilities summary (module keys only)
 	cap_summary = ""
-	try:
-		if capabilities_file.exists():
-			with capabilities_file.open(encoding="utf-8") as f:
-				caps = json.load(f)
-				mods = list(caps.keys())
-				preview = ", ".join(mods[:5])
-				cap_summary = f"modules={len(mods)}; examples: {preview}"
-	except Exception:
-		cap_summary = ""
+	caps = read_json(capabilities_file, copy_result=False)
+	if isinstance(caps, dict):
+		mods = list(caps.keys())
+		preview = ", ".join(mods[:5])
+		cap_summary = f"modules={len(mods)}; examples: {preview}"
 
 	# Root registry summary (top-level keys only)
 	reg_summary = ""
-	try:
-		if root_registry_file.exists():
-			with root_registry_file.open(encoding="utf-8") as f:
-				tree = json.load(f)
-				if isinstance(tree, dict):
-					top = list(tree.keys())
-					reg_summary = f"top-level: {', '.join(top[:10])}"
-	except Exception:
-		reg_summary = ""
-
-	return (
-		f"Context Notes:\n{ctx_str}\n\n"
-		f"Capabilities: {cap_summary}\n"
-		f"Project: {reg_summary}"
-	)
+	tree = read_json(root_registry_file, copy_result=False)
+	if isinstance(tree, dict):
+		top = list(tree.keys())
+		reg_summary = f"top-level: {', '.join(top[:10])}"
+
+	if include_notes:
+		context = (
+			f"Context Notes:\n{ctx_str}\n\n"
+			f"Capabilities: {cap_summary}\n"
+			f"Project: {reg_summary}"
+		)
+	else:
+		context = f"Project: {reg_summary}"
+	_saias_context_cache = (stamp, context)
+	return context
 
 def get_prompt(prompt_key: str) -> str:
-    config = load_config()
+    config = _config_view()
     return config.get("prompts", {}).get(prompt_key, "")
 
 def rewrite_code_prompt(user_prompt: str) -> str:
@@ -108,9 +768,23 @@ def rewrite_code_prompt(user_prompt: str) -> str:
 		return user_prompt.strip()
 
 	final_prompt = f"{system_instruction.strip()}\n{user_prompt.strip()}"
-	print(f"[DEBUG] Final rewrite prompt:\n{final_prompt[:2500]}")
+	log.debug("Final rewrite prompt:\n%.2500s", final_prompt)
 	return final_prompt
 
+def code_prompt_parts(user_prompt: str) -> Tuple[str, str]:
+	"""
+	(instruction, task) for a code call. The rewrite_code instruction becomes a
+	byte-identical system message on every call (so the server can reuse its KV
+	prefix); only the task varies. An instruction the caller already prepended is removed.
+	"""
+	instruction = get_prompt("rewrite_code").strip()
+	if not instruction:
+		raise ValueError("rewrite_code prompt not found in config.json")
+	task = user_prompt.strip()
+	if task.lower().startswith(instruction.lower()):
+		task = task[len(instruction):].strip()
+	return instruction, task
+
 def strip_prompt_echo(prompt: str, response: str) -> str:
 	"""
 	Strips the echoed prompt from the beginning of the LLM's response.
@@ -134,28 +808,56 @@ def sanitize_code_response(response: str) -> str:
 		clean_code = "\n".join(code_lines)
 	return clean_code.strip()
 
-def safe_code_llm(prompt):
-	try:
-		_, code_model = get_model_config()
-		rephrased_prompt = rewrite_code_prompt(prompt)
+def _clean_code_output(prompt: str, code_model: str, task: str, raw_output: str) -> Optional[str]:
+	"""Shared tail of safe_code_llm/asafe_code_llm: the cleaned code, or None when it is not valid Python."""
+	log.debug("Raw code output from '%s' (%d chars):\n%s", code_model, len(raw_output or ""), raw_output)
 
-		raw_output = call_ollama_model(code_model, rephrased_prompt)
-		print(f"[DEBUG] Raw LLM output (before cleaning):\n{raw_output}\n{'='*50}")
+	clean_code = raw_output
+	if "```" in clean_code:
+		clean_code = sanitize_code_response(clean_code)
+	clean_code = strip_prompt_echo(prompt, clean_code)
+	record_payload("code_output", model=code_model, task=task, raw=raw_output, clean=clean_code)
+	log.debug("Cleaned code output (%d chars):\n%s", len(clean_code), clean_code)
 
-		clean_code = strip_prompt_echo(prompt, raw_output)
-		print(f"[DEBUG] Cleaned LLM output (before syntax check):\n{clean_code}\n{'='*50}")
+	if not raw_output or not isinstance(raw_output, str) or raw_output.strip().startswith("[ERROR]"):
+		raise ValueError("Empty or invalid response from code LLM")
 
-		if not raw_output or not isinstance(raw_output, str) or raw_output.strip().startswith("[ERROR]"):
-			raise ValueError("Empty or invalid response from code LLM")
+	if not is_valid_python_code(clean_code):
+		print("[WARN] LLM returned invalid Python code")
+		return None
 
-		if not is_valid_python_code(clean_code):
-			print("[WARN] LLM returned invalid Python code")
-			return None
+	return clean_code
 
-		return clean_code
+@traced("llm.safe_code")
+def safe_code_llm(prompt, model=None, source=None):
+	"""`source`: the code being rewritten, if any; bounds the output budget."""
+	try:
+		code_model = model or get_model_config()[1]
+		current_span().set(model=code_model)
+		instruction, task = code_prompt_parts(prompt)
+		raw_output = complete_code(code_model, task, instruction, source=source)
+		return _clean_code_output(prompt, code_model, task, raw_output)
+	except Exception as e:
+		print(f"[FALLBACK] Failed to call raw LLM: {e}")
+		log.error("safe_code_llm failed: %s", e)
+		return None
 
+@traced("llm.safe_code")
+async def asafe_code_llm(prompt, model=None, source=None, timeout: Optional[float] = None):
+	"""Async safe_code_llm(); `timeout` bounds the whole call (None when it expires)."""
+	try:
+		code_model = model or get_model_config()[1]
+		current_span().set(model=code_model)
+		instruction, task = code_prompt_parts(prompt)
+		raw_output = await asyncio.wait_for(acomplete_code(code_model, task, instruction, source=source), timeout)
+		return _clean_code_output(prompt, code_model, task, raw_output)
+	except asyncio.TimeoutError:
+		print(f"[FALLBACK] Code LLM timed out after {timeout}s")
+		log.error("asafe_code_llm timed out after %ss", timeout)
+		return None
 	except Exception as e:
 		print(f"[FALLBACK] Failed to call raw LLM: {e}")
+		log.error("asafe_code_llm failed: %s", e)
 		return None
 
 def is_valid_python_code(code: str) -> bool:
@@ -187,6 +889,7 @@ def is_meaningful_change(original: str, modified: str) -> bool:
 
     return orig_norm != mod_norm
 
+@traced("patch.score")
 def score_code_patch(refactored_code: str, original_code: str = "") -> int:
     if not refactored_code.strip():
         return 0
@@ -216,7 +919,7 @@ def score_code_patch(refactored_code: str, original_code: str = "") -> int:
     return min(10, max(0, score))
 
 def log_patch_score(prompt: str, score: int, raw_code: str):
-	log_path = Path(__file__).resolve().parents[1] / "memory" / "rewards_log.json"
+	log_path = REWARDS_LOG_PATH
 	log_entry = {
 		"timestamp": datetime.now().isoformat(),
 		"score": score,
@@ -224,43 +927,44 @@ def log_patch_score(prompt: str, score: int, raw_code: str):
 		"code_preview": raw_code.strip()[:300]
 	}
 
-	if log_path.exists():
-		try:
-			with open(log_path, "r", encoding="utf-8") as f:
-				data = json.load(f)
-		except (json.JSONDecodeError, ValueError):
+	data = read_json(log_path, default=None)
+	if not isinstance(data, list):
+		if log_path.exists():
 			print("[WARN] rewards_log.json was empty or corrupted. Resetting log.")
-			data = []
-	else:
 		data = []
 
 	data.append(log_entry)
 
-	with open(log_path, "w", encoding="utf-8") as f:
-		json.dump(data, f, indent=2)
+	# Batched: consecutive scores within the flush window share one atomic write
+	write_json(log_path, data, defer=True)
 
 
-# Mistral - natural language / reasoning
-def call_chat_llm(prompt: str) -> str:
-	try:
-		config = load_config()
-		chat_model = config["llm"]["chat_model"]
-	except Exception as e:
-		print(f"[ERROR] Failed to load config: {e}")
-		return "[ERROR] Could not load chat model configuration."
+def build_chat_request(prompt: str, config: Dict[str, Any]):
+	"""(messages, options) for a chat turn: system prompt, recent history, then the user prompt."""
 	identity_prompt = config.get("chat", {}).get("system_prompt", "")
-	context_prompt = get_saias_context()
+	# Relevant context.md sections, capabilities and past turns are retrieved per turn
+	from agent.tools.vector_memory import relevant_notes, retrieval_available
+	retrieval = retrieval_available()
+	context_prompt = get_saias_context(include_notes=not retrieval)
+	notes = relevant_notes(prompt) if retrieval else ""
 	style_rules = (
 		"Guidance: Be concise (1-3 short sentences for casual chat). "
 		"Do not restate your identity, offline/local status, or implementation details unless asked. "
 		"Answer directly and naturally; avoid boilerplate and repetition."
 	)
-	system_prompt = f"{identity_prompt}\n\n{context_prompt}\n\n{style_rules}"
-	print(f"[DEBUG] Loaded system prompt (truncated): {system_prompt[:100]}...")
+	# Stable text first, project context after it, then history and the new turn:
+	# consecutive turns share the longest possible prefix for the server's KV cache
+	stable_prompt = "\n\n".join(p for p in (identity_prompt.strip(), style_rules) if p)
+	log.debug("Loaded system prompt (truncated): %.100s...", stable_prompt)
 
-	# Incorporate recent chat history (limit to avoid token bloat)
-	recent = load_recent(6)
-	messages = [{"role": "system", "content": system_prompt}]
+	# Older turns live in the rolling summary; only the last few stay verbatim
+	from agent.tools.chat_summary import chat_history
+	summary, recent = chat_history()
+	if recent and recent[-1].get("role") == "user" and recent[-1].get("content", "").strip() == prompt.strip():
+		recent = recent[:-1]  # the GUI logs the prompt before routing it
+	if summary:
+		context_prompt = f"{context_prompt}\n\nConversation so far (summary of earlier turns):\n{summary}"
+	history = []
 	for m in recent:
 		role = m.get("role")
 		content = m.get("content")
@@ -269,43 +973,97 @@ def call_chat_llm(prompt: str) -> str:
 			clip = content.strip()
 			if len(clip) > 500:
 				clip = clip[:500] + "…"
-			messages.append({"role": role, "content": clip})
-	# Current user prompt last
-	messages.append({"role": "user", "content": prompt})
+			history.append({"role": role, "content": clip})
+	# Current user prompt last (retrieved notes ride with it: they change every turn)
+	user_turn = f"Relevant notes from memory:\n{notes}\n\nUser message:\n{prompt}" if notes else prompt
+	messages = layout_messages(stable_prompt, context_prompt, history, user_turn)
+	PREFIX_MONITOR.observe("chat", config.get("llm", {}).get("chat_model", ""), stable_prompt, messages)
+	num_predict = int(config.get("llm", {}).get("budget", {}).get("chat_output_tokens", 200))
+	options = {"num_predict": num_predict, "temperature": 0.5, "repeat_penalty": 1.1}
+	return messages, options
+
+
+def _chat_payload(prompt: str, config: Dict[str, Any], chat_model: str, stream: bool = False):
+	with span("llm.build_chat_request"):
+		messages, options = build_chat_request(prompt, config)
+	record_payload("chat_request", model=chat_model, messages=messages, options=options, stream=stream)
+	log.debug("Calling chat model '%s' with payload:\n%.500s", chat_model,
+		lazy_json({"model": chat_model, "messages": messages, "stream": stream, "options": options}))
+	return messages, options
 
-	payload = {
-		"model": chat_model,
-		"messages": messages,
-		"stream": False,
-		"options": {"num_predict": 200, "temperature": 0.5, "repeat_penalty": 1.1}
-	}
 
-	print("[DEBUG] Injected capabilities:\n", capabilities_data)
-	print("[DEBUG] Injected root registry:\n", root_registry_data)
-	print(f"[DEBUG] Calling chat model '{chat_model}' with payload:")
-	print(json.dumps(payload, indent=2)[:500])
+# Mistral - natural language / reasoning
+@traced("llm.call_chat")
+def call_chat_llm(prompt: str) -> str:
 	try:
-		response = requests.post("http://localhost:11434/api/chat", json=payload)
-		response.raise_for_status()
-		result = response.json()
-		return result.get("message", {}).get("content", "[ERROR] No content in response.")
+		config = _config_view()
+		chat_model = config["llm"]["chat_model"]
+	except Exception as e:
+		print(f"[ERROR] Failed to load config: {e}")
+		return "[ERROR] Could not load chat model configuration."
+	messages, options = _chat_payload(prompt, config, chat_model)
+	try:
+		result = chat_completion(chat_model, messages, options)
+		return result.content or "[ERROR] No content in response."
+	except Exception as e:
+		log.error("Chat model '%s' failed: %s", chat_model, e)
+		return f"[ERROR] Failed to call model '{chat_model}': {e}"
+
+
+@traced("llm.call_chat")
+async def acall_chat_llm(prompt: str, timeout: Optional[float] = None) -> str:
+	"""Async call_chat_llm(); `timeout` bounds the whole call (queue wait included)."""
+	try:
+		config = _config_view()
+		chat_model = config["llm"]["chat_model"]
+	except Exception as e:
+		print(f"[ERROR] Failed to load config: {e}")
+		return "[ERROR] Could not load chat model configuration."
+	# Building the request reads memory files and may embed the prompt for retrieval: keep it off the loop
+	messages, options = await asyncio.to_thread(_chat_payload, prompt, config, chat_model)
+	try:
+		result = await asyncio.wait_for(achat_completion(chat_model, messages, options), timeout)
+		return result.content or "[ERROR] No content in response."
+	except asyncio.TimeoutError:
+		log.error("Chat model '%s' timed out after %ss", chat_model, timeout)
+		return f"[ERROR] Chat model '{chat_model}' timed out after {timeout}s"
 	except Exception as e:
+		log.error("Chat model '%s' failed: %s", chat_model, e)
 		return f"[ERROR] Failed to call model '{chat_model}': {e}"
 
 
+def stream_chat_llm(prompt: str) -> Iterator[str]:
+	"""Like call_chat_llm, but yields the reply as it is generated."""
+	config = _config_view()
+	chat_model = config["llm"]["chat_model"]
+	messages, options = _chat_payload(prompt, config, chat_model, stream=True)
+	yield from stream_chat_completion(chat_model, messages, options)
+
+
+async def astream_chat_llm(prompt: str) -> AsyncIterator[str]:
+	"""Async stream_chat_llm()."""
+	config = _config_view()
+	chat_model = config["llm"]["chat_model"]
+	messages, options = await asyncio.to_thread(_chat_payload, prompt, config, chat_model, True)
+	stream = astream_chat_completion(chat_model, messages, options)
+	try:
+		async for delta in stream:
+			yield delta
+	finally:
+		await stream.aclose()
+
+
 # Deepseek - code generation / refactoring
 def call_code_llm(prompt):
 	_, code_model = get_model_config()
-	rephrased_prompt = rewrite_code_prompt(prompt)
-	print(f"[DEBUG] Calling code model '{code_model}' with prompt (truncated): {rephrased_prompt[:100]}...")
-	print(f"[DEBUG] Rewritten code prompt:\n{rephrased_prompt[:300]}")
-	system_prompt = get_prompt("rewrite_code")
-	raw_output = call_ollama_model(code_model, rephrased_prompt, system_prompt)
+	system_prompt, rephrased_prompt = code_prompt_parts(prompt)
+	log.debug("Calling code model '%s' with prompt (truncated): %.100s...", code_model, rephrased_prompt)
+	raw_output = complete_code(code_model, rephrased_prompt, system_prompt)
 	sanitized = sanitize_code_response(raw_output)
 	clean_code = strip_prompt_echo(rephrased_prompt, sanitized)
-	print(f"[DEBUG] Raw LLM Output (truncated):\n{raw_output[:300]}")
+	log.debug("Raw code output (truncated):\n%.300s", raw_output)
 	score = score_code_patch(clean_code)
-	print(f"[DEBUG] Patch Score: {score}/10")
+	log.debug("Patch score: %d/10", score)
 	log_patch_score(prompt, score, clean_code)
 	if not is_valid_python_code(clean_code):
 		print("[WARN] LLM returned invalid Python code")
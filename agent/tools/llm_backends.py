@@ -0,0 +1,302 @@
+# agent/tools/llm_backends.py
+import asyncio
+import json
+import os
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Set, Tuple
+
+# Generation options use Ollama's names; adapters translate them for their server:
+#   temperature, top_p, seed, stop, num_predict (max output tokens), num_ctx, repeat_penalty
+Messages = List[Dict[str, str]]
+
+
+class ModelUnavailable(RuntimeError):
+	"""The endpoint answered, but does not have the requested model (HTTP 404)."""
+
+
+# --- asyncio transport ---
+# One httpx.AsyncClient (connection pool) per event loop; httpx is optional and
+# without it the async methods run the blocking ones on a worker thread.
+_async_clients: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_httpx = None
+
+
+def _load_httpx():
+	global _httpx
+	if _httpx is None:
+		try:
+			import httpx
+			_httpx = httpx
+		except ImportError:
+			_httpx = False
+	return _httpx or None
+
+
+def async_http_available() -> bool:
+	return _load_httpx() is not None
+
+
+def async_client():
+	"""The running loop's shared httpx.AsyncClient (None without httpx)."""
+	httpx = _load_httpx()
+	if httpx is None:
+		return None
+	loop = asyncio.get_running_loop()
+	client = _async_clients.get(loop)
+	if client is None or client.is_closed:
+		# timeout=None: like requests, no timeout unless the call passes one
+		client = _async_clients[loop] = httpx.AsyncClient(timeout=None, limits=httpx.Limits(max_connections=None))
+	return client
+
+
+async def aclose_async_client() -> None:
+	"""Close the running loop's client (call before the loop shuts down)."""
+	client = _async_clients.pop(asyncio.get_running_loop(), None)
+	if client is not None:
+		await client.aclose()
+
+
+async def _threaded_stream(iterator: Iterator[str]) -> AsyncIterator[str]:
+	"""Drive a blocking stream from worker threads (fallback without httpx)."""
+	done = object()
+	try:
+		while True:
+			item = await asyncio.to_thread(next, iterator, done)
+			if item is done:
+				return
+			yield item
+	finally:
+		try:
+			await asyncio.to_thread(iterator.close)
+		except ValueError:
+			pass  # cancelled mid-next(): the generator is still running and is closed when collected
+
+
+@dataclass
+class ChatResult:
+	"""Backend-neutral chat completion"""
+	content: str
+	model: str = ""
+	prompt_tokens: int = 0
+	output_tokens: int = 0
+	load_seconds: float = 0.0  # time the server spent (re)loading weights, if reported
+	prompt_seconds: float = 0.0
+	generate_seconds: float = 0.0
+	done_reason: str = ""
+	raw: Dict[str, Any] = field(default_factory=dict, repr=False)
+
+
+class LLMBackend:
+	"""
+	Adapter for one server API. Implementations translate a generic chat request
+	(model, messages, options) into `chat_path` + _body(), parse replies in
+	_parse_chat()/_parse_stream_line(), and raise ModelUnavailable for an unknown
+	model; transport errors propagate as requests (or, async, httpx) exceptions so
+	the endpoint pool can fail over.
+	"""
+	name = "base"
+	chat_path = ""
+
+	def __init__(self, api_key: Optional[str] = None):
+		self.api_key = api_key
+
+	def headers(self) -> Dict[str, str]:
+		return {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+
+	def _body(self, model: str, messages: Messages, options: Optional[Dict[str, Any]], stream: bool) -> Dict[str, Any]:
+		raise NotImplementedError
+
+	def _parse_chat(self, data: Dict[str, Any], model: str) -> ChatResult:
+		raise NotImplementedError
+
+	def _parse_stream_line(self, line: str) -> Tuple[str, bool]:
+		"""(content delta, finished) for one line of a streamed reply."""
+		raise NotImplementedError
+
+	def chat(self, url: str, model: str, messages: Messages, options: Optional[Dict[str, Any]] = None,
+			timeout: Optional[float] = None) -> ChatResult:
+		body = self._body(model, messages, options, False)
+		return self._parse_chat(self._post(f"{url}{self.chat_path}", body, model, timeout).json(), model)
+
+	def stream_chat(self, url: str, model: str, messages: Messages, options: Optional[Dict[str, Any]] = None,
+			timeout: Optional[float] = None) -> Iterator[str]:
+		"""Yield content deltas. Closing the generator aborts generation on the server."""
+		body = self._body(model, messages, options, True)
+		response = self._post(f"{url}{self.chat_path}", body, model, timeout, stream=True)
+		try:
+			for line in response.iter_lines():
+				if not line:
+					continue
+				delta, finished = self._parse_stream_line(line.decode("utf-8") if isinstance(line, bytes) else line)
+				if delta:
+					yield delta
+				if finished:
+					break
+		finally:
+			response.close()
+
+	async def achat(self, url: str, model: str, messages: Messages, options: Optional[Dict[str, Any]] = None,
+			timeout: Optional[float] = None) -> ChatResult:
+		"""chat() on the loop's async client; cancelling the task aborts the request."""
+		client = async_client()
+		if client is None:
+			return await asyncio.to_thread(self.chat, url, model, messages, options, timeout)
+		target = f"{url}{self.chat_path}"
+		response = await client.post(target, json=self._body(model, messages, options, False), headers=self.headers(),
+			timeout=timeout)
+		self._check_status(response, model, target)
+		return self._parse_chat(response.json(), model)
+
+	async def astream_chat(self, url: str, model: str, messages: Messages, options: Optional[Dict[str, Any]] = None,
+			timeout: Optional[float] = None) -> AsyncIterator[str]:
+		"""Async stream_chat(); aclose() (or cancelling the consumer) aborts generation on the server."""
+		client = async_client()
+		if client is None:
+			async for delta in _threaded_stream(self.stream_chat(url, model, messages, options, timeout)):
+				yield delta
+			return
+		target = f"{url}{self.chat_path}"
+		body = self._body(model, messages, options, True)
+		async with client.stream("POST", target, json=body, headers=self.headers(), timeout=timeout) as response:
+			self._check_status(response, model, target)
+			async for line in response.aiter_lines():
+				if not line:
+					continue
+				delta, finished = self._parse_stream_line(line)
+				if delta:
+					yield delta
+				if finished:
+					break
+
+	def list_models(self, url: str, timeout: float = 2.0) -> Set[str]:
+		"""Models the server offers (doubles as the health check)."""
+		raise NotImplementedError
+
+	def embed(self, url: str, model: str, texts: List[str], timeout: Optional[float] = None) -> List[List[float]]:
+		"""One embedding vector per input text."""
+		raise NotImplementedError
+
+	def _post(self, url: str, body: Dict[str, Any], model: str, timeout: Optional[float], stream: bool = False):
+		import requests
+		response = requests.post(url, json=body, headers=self.headers(), timeout=timeout, stream=stream)
+		if response.status_code == 404:
+			response.close()
+			raise ModelUnavailable(f"Model '{model}' not available at {url}")
+		response.raise_for_status()
+		return response
+
+	@staticmethod
+	def _check_status(response, model: str, url: str) -> None:
+		if response.status_code == 404:
+			raise ModelUnavailable(f"Model '{model}' not available at {url}")
+		response.raise_for_status()
+
+
+class OllamaBackend(LLMBackend):
+	"""Ollama native API: /api/chat (NDJSON streaming), /api/tags."""
+	name = "ollama"
+	chat_path = "/api/chat"
+
+	def _body(self, model: str, messages: Messages, options: Optional[Dict[str, Any]], stream: bool) -> Dict[str, Any]:
+		body: Dict[str, Any] = {"model": model, "messages": messages, "stream": stream}
+		if options:
+			body["options"] = {k: v for k, v in options.items() if v is not None}
+		return body
+
+	def _parse_chat(self, data, model) -> ChatResult:
+		return ChatResult(
+			content=(data.get("message") or {}).get("content", ""),
+			model=data.get("model", model),
+			prompt_tokens=int(data.get("prompt_eval_count") or 0),
+			output_tokens=int(data.get("eval_count") or 0),
+			load_seconds=float(data.get("load_duration") or 0) / 1e9,
+			prompt_seconds=float(data.get("prompt_eval_duration") or 0) / 1e9,
+			generate_seconds=float(data.get("eval_duration") or 0) / 1e9,
+			done_reason=data.get("done_reason", ""),
+			raw=data,
+		)
+
+	def _parse_stream_line(self, line) -> Tuple[str, bool]:
+		data = json.loads(line)
+		if data.get("error"):
+			raise RuntimeError(data["error"])
+		return (data.get("message") or {}).get("content", ""), bool(data.get("done"))
+
+	def list_models(self, url, timeout=2.0) -> Set[str]:
+		import requests
+		r = requests.get(f"{url}/api/tags", headers=self.headers(), timeout=timeout)
+		r.raise_for_status()
+		return {m.get("name") or m.get("model") for m in r.json().get("models", []) if m.get("name") or m.get("model")}
+
+	def embed(self, url, model, texts, timeout=None) -> List[List[float]]:
+		data = self._post(f"{url}/api/embed", {"model": model, "input": list(texts)}, model, timeout).json()
+		return data.get("embeddings") or []
+
+
+class OpenAICompatBackend(LLMBackend):
+	"""OpenAI-compatible servers (vLLM, llama.cpp server, LM Studio, TGI...): /v1/chat/completions (SSE), /v1/models."""
+	name = "openai"
+	chat_path = "/v1/chat/completions"
+
+	def _body(self, model: str, messages: Messages, options: Optional[Dict[str, Any]], stream: bool) -> Dict[str, Any]:
+		body: Dict[str, Any] = {"model": model, "messages": messages, "stream": stream}
+		opts = dict(options or {})
+		if opts.get("num_predict"):
+			body["max_tokens"] = int(opts["num_predict"])
+		for key in ("temperature", "top_p", "seed", "stop"):
+			if opts.get(key) is not None:
+				body[key] = opts[key]
+		if opts.get("repeat_penalty") is not None:
+			# Not in the OpenAI schema, but honored by llama.cpp/vLLM; ignored elsewhere
+			body["repeat_penalty"] = opts["repeat_penalty"]
+		# num_ctx is a server-side setting for these servers and is not sent
+		return body
+
+	def _parse_chat(self, data, model) -> ChatResult:
+		choice = (data.get("choices") or [{}])[0]
+		usage = data.get("usage") or {}
+		return ChatResult(
+			content=(choice.get("message") or {}).get("content") or "",
+			model=data.get("model", model),
+			prompt_tokens=int(usage.get("prompt_tokens") or 0),
+			output_tokens=int(usage.get("completion_tokens") or 0),
+			done_reason=choice.get("finish_reason") or "",
+			raw=data,
+		)
+
+	def _parse_stream_line(self, line) -> Tuple[str, bool]:
+		if not line.startswith("data:"):
+			return "", False
+		payload = line[5:].strip()
+		if payload == "[DONE]":
+			return "", True
+		choice = (json.loads(payload).get("choices") or [{}])[0]
+		return (choice.get("delta") or {}).get("content") or "", bool(choice.get("finish_reason"))
+
+	def list_models(self, url, timeout=2.0) -> Set[str]:
+		import requests
+		r = requests.get(f"{url}/v1/models", headers=self.headers(), timeout=timeout)
+		r.raise_for_status()
+		return {m.get("id") for m in r.json().get("data", []) if m.get("id")}
+
+	def embed(self, url, model, texts, timeout=None) -> List[List[float]]:
+		data = self._post(f"{url}/v1/embeddings", {"model": model, "input": list(texts)}, model, timeout).json()
+		rows = sorted(data.get("data") or [], key=lambda d: d.get("index", 0))
+		return [row.get("embedding") or [] for row in rows]
+
+
+BACKENDS = {
+	"ollama": OllamaBackend,
+	"openai": OpenAICompatBackend,
+}
+
+
+def make_backend(api: str = "ollama", api_key: Optional[str] = None, api_key_env: Optional[str] = None) -> LLMBackend:
+	"""Backend for an endpoint's `api` setting ("ollama" | "openai")."""
+	cls = BACKENDS.get((api or "ollama").lower())
+	if cls is None:
+		raise ValueError(f"Unknown LLM backend api '{api}' (expected one of: {', '.join(BACKENDS)})")
+	if not api_key and api_key_env:
+		api_key = os.environ.get(api_key_env)
+	return cls(api_key=api_key)
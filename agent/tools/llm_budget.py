@@ -0,0 +1,135 @@
+# agent/tools/llm_budget.py
+import logging
+import math
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+log = logging.getLogger(__name__)
+
+# Defaults for llm.budget in config.json
+DEFAULT_BUCKETS = (2048, 4096, 8192, 16384, 32768)
+DEFAULT_CHARS_PER_TOKEN = 3.5  # code tokenizes denser than prose (~4 chars/token)
+DEFAULT_OUTPUT_RATIO = 2.0  # a rewrite should not be much longer than its input
+DEFAULT_MIN_OUTPUT = 128
+DEFAULT_CODE_OUTPUT = 2048
+MESSAGE_OVERHEAD = 8  # role markers / template tokens per message
+
+
+@dataclass
+class Budget:
+	"""Context and output sizes chosen for one call"""
+	prompt_tokens: int
+	num_ctx: int
+	num_predict: int
+	truncated: bool = False  # prompt + output did not fit in max_ctx
+
+
+def budget_config() -> Dict[str, Any]:
+	try:
+		from agent.tools.llm import _config_view
+		return _config_view().get("llm", {}).get("budget", {}) or {}
+	except Exception:
+		return {}
+
+
+def estimate_tokens(text: str, chars_per_token: Optional[float] = None) -> int:
+	"""Cheap token estimate (no tokenizer): characters / chars_per_token, rounded up."""
+	if not text:
+		return 0
+	ratio = chars_per_token or float(budget_config().get("chars_per_token", DEFAULT_CHARS_PER_TOKEN))
+	return int(math.ceil(len(text) / ratio))
+
+
+def estimate_message_tokens(messages: List[Dict[str, str]], chars_per_token: Optional[float] = None) -> int:
+	return sum(estimate_tokens(m.get("content") or "", chars_per_token) + MESSAGE_OVERHEAD for m in messages)
+
+
+def max_context(config: Optional[Dict[str, Any]] = None) -> int:
+	cfg = budget_config() if config is None else config
+	buckets = cfg.get("ctx_buckets") or DEFAULT_BUCKETS
+	return int(cfg.get("max_ctx") or max(buckets))
+
+
+class BudgetPlanner:
+	"""
+	Picks num_ctx as the smallest configured bucket that holds prompt + output,
+	and num_predict from the size of the text being rewritten (`source`).
+
+	Changing num_ctx makes Ollama reload the model runner, so a model keeps its
+	previous bucket while that is adequate and at most one bucket larger.
+	"""
+
+	def __init__(self, config: Optional[Dict[str, Any]] = None):
+		self.config = config
+		self._last_ctx: Dict[str, int] = {}
+		self._lock = threading.Lock()
+
+	def _cfg(self) -> Dict[str, Any]:
+		return budget_config() if self.config is None else self.config
+
+	def output_cap(self, source: Optional[str], cfg: Dict[str, Any], chars_per_token: float) -> int:
+		if source:
+			ratio = float(cfg.get("output_ratio", DEFAULT_OUTPUT_RATIO))
+			floor = int(cfg.get("min_output_tokens", DEFAULT_MIN_OUTPUT))
+			return max(floor, int(math.ceil(estimate_tokens(source, chars_per_token) * ratio)))
+		return int(cfg.get("code_output_tokens", DEFAULT_CODE_OUTPUT))
+
+	def plan(self, model: str, messages: List[Dict[str, str]], options: Optional[Dict[str, Any]] = None,
+			source: Optional[str] = None) -> Budget:
+		cfg = self._cfg()
+		chars_per_token = float(cfg.get("chars_per_token", DEFAULT_CHARS_PER_TOKEN))
+		buckets = sorted(int(b) for b in (cfg.get("ctx_buckets") or DEFAULT_BUCKETS))
+		ceiling = max_context(cfg)
+		options = options or {}
+
+		prompt_tokens = estimate_message_tokens(messages, chars_per_token)
+		num_predict = int(options.get("num_predict") or self.output_cap(source, cfg, chars_per_token))
+		needed = prompt_tokens + num_predict
+
+		fitting = [b for b in buckets if b >= needed and b <= ceiling]
+		truncated = False
+		if fitting:
+			num_ctx = fitting[0]
+		else:
+			num_ctx = ceiling
+			truncated = True
+			num_predict = max(0, ceiling - prompt_tokens) or min(num_predict, DEFAULT_MIN_OUTPUT)
+
+		if options.get("num_ctx"):
+			num_ctx = int(options["num_ctx"])
+		else:
+			with self._lock:
+				last = self._last_ctx.get(model)
+				larger = [b for b in buckets if b > num_ctx]
+				step_up = larger[0] if larger else num_ctx
+				if last and needed <= last <= step_up:
+					num_ctx = last
+				self._last_ctx[model] = num_ctx
+		return Budget(prompt_tokens, num_ctx, num_predict, truncated)
+
+
+_planner: Optional[BudgetPlanner] = None
+
+
+def get_budget_planner() -> BudgetPlanner:
+	global _planner
+	if _planner is None:
+		_planner = BudgetPlanner()
+	return _planner
+
+
+def apply_budget(model: str, messages: List[Dict[str, str]], options: Optional[Dict[str, Any]] = None,
+		source: Optional[str] = None) -> Dict[str, Any]:
+	"""Options with num_ctx/num_predict filled in (explicit caller values win); logs the budget."""
+	budget = get_budget_planner().plan(model, messages, options, source)
+	merged = dict(options or {})
+	merged["num_ctx"] = budget.num_ctx
+	merged["num_predict"] = budget.num_predict
+	log.debug(
+		"[BUDGET] %s: prompt≈%d tok, num_ctx=%d, num_predict=%d, source≈%d tok",
+		model, budget.prompt_tokens, budget.num_ctx, budget.num_predict, estimate_tokens(source) if source else 0,
+	)
+	if budget.truncated:
+		print(f"[WARN] Prompt for '{model}' (≈{budget.prompt_tokens} tok) leaves little room in max_ctx={budget.num_ctx}; output may be cut short")
+	return merged
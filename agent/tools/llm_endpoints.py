@@ -0,0 +1,406 @@
+# agent/tools/llm_endpoints.py
+import asyncio
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from agent.tools.llm_backends import LLMBackend, ModelUnavailable, make_backend
+
+DEFAULT_URL = "http://localhost:11434"
+HEALTH_TIMEOUT = 2.0
+HEALTH_INTERVAL = 30.0  # seconds between background health checks (llm.health_check_s; 0 disables)
+RETRY_BACKOFF = (2.0, 60.0)  # seconds: first retry, cap
+
+
+class NoEndpointAvailable(RuntimeError):
+	"""Raised when no healthy endpoint serves the requested model."""
+
+
+@dataclass
+class Endpoint:
+	"""One LLM server. models=None means 'whatever the server reports'."""
+	url: str
+	api: str = "ollama"
+	backend: LLMBackend = field(default_factory=make_backend, repr=False)
+	weight: float = 1.0
+	models: Optional[Set[str]] = None
+	max_parallel: int = 1
+	outstanding: int = 0
+	healthy: bool = True
+	failures: int = 0
+	retry_at: float = 0.0
+	discovered_models: Optional[Set[str]] = None
+	missing_models: Set[str] = field(default_factory=set)
+	served: int = 0
+
+	def serves(self, model: str) -> bool:
+		if model in self.missing_models:
+			return False
+		if self.models is not None:
+			return "*" in self.models or model in self.models
+		if self.discovered_models is not None:
+			return model in self.discovered_models or f"{model}:latest" in self.discovered_models
+		return True
+
+
+def _normalize_url(url: str) -> str:
+	url = (url or DEFAULT_URL).strip().rstrip("/")
+	if not url.startswith(("http://", "https://")):
+		url = "http://" + url
+	# Accept full API URLs from older configs ("http://host:11434/api/chat", ".../v1")
+	for suffix in ("/api/chat", "/api/generate", "/api", "/v1/chat/completions", "/v1"):
+		if url.endswith(suffix):
+			url = url[: -len(suffix)]
+	return url
+
+
+def _should_fail_over(error: Exception) -> bool:
+	"""Connection errors, timeouts and 5xx responses (requests or httpx): try the next endpoint."""
+	import requests
+	if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+		return True
+	if isinstance(error, requests.HTTPError):
+		return (getattr(error.response, "status_code", 0) or 0) >= 500
+	httpx = sys.modules.get("httpx")  # only raised by the async transport, which imports it
+	if httpx is not None:
+		if isinstance(error, httpx.TransportError):
+			return True
+		if isinstance(error, httpx.HTTPStatusError):
+			return error.response.status_code >= 500
+	return False
+
+
+class EndpointPool:
+	"""
+	Least-outstanding-requests balancing (weighted) over LLM servers, with
+	passive health tracking: a connection error/5xx marks an endpoint down with
+	exponential backoff; it is health-checked again before being reused.
+	"""
+
+	def __init__(self, endpoints: List[Endpoint]):
+		self.endpoints = endpoints or [Endpoint(DEFAULT_URL)]
+		self._lock = threading.Lock()
+		self._health_stop: Optional[threading.Event] = None
+
+	@classmethod
+	def from_config(cls, config: Dict[str, Any]) -> "EndpointPool":
+		entries = (config.get("llm", {}) or {}).get("endpoints") or []
+		endpoints = []
+		for e in entries:
+			if isinstance(e, str):
+				e = {"url": e}
+			models = e.get("models")
+			api = e.get("api", "ollama")
+			endpoints.append(Endpoint(
+				url=_normalize_url(e.get("url", DEFAULT_URL)),
+				api=api,
+				backend=make_backend(api, e.get("api_key"), e.get("api_key_env")),
+				weight=float(e.get("weight", 1.0)) or 1.0,
+				models=set(models) if models else None,
+				max_parallel=max(1, int(e.get("max_parallel", 1))),
+			))
+		if not endpoints:
+			endpoints = [Endpoint(_normalize_url(os.environ.get("OLLAMA_HOST", DEFAULT_URL)))]
+		return cls(endpoints)
+
+	# --- selection ---
+	def capacity(self, model: str) -> int:
+		"""Parallel requests the pool can serve for `model` (used to size scheduler limits)."""
+		return sum(e.max_parallel for e in self.endpoints if e.serves(model)) or 1
+
+	def _available(self, model: str, exclude: Set[str]) -> List[Endpoint]:
+		now = time.monotonic()
+		return [
+			e for e in self.endpoints
+			if e.url not in exclude and e.serves(model) and (e.healthy or now >= e.retry_at)
+		]
+
+	def _pick(self, model: str, exclude: Set[str]) -> Tuple[Endpoint, bool]:
+		"""(best endpoint, needs a health probe first); a healthy pick is already counted as outstanding."""
+		with self._lock:
+			candidates = self._available(model, exclude)
+			if not candidates:
+				raise NoEndpointAvailable(f"No healthy endpoint serves model '{model}'")
+			best = min(candidates, key=lambda e: ((e.outstanding + 1) / e.weight, e.served))
+			if best.healthy:
+				self._claim(best)
+				return best, False
+			return best, True
+
+	def _claim(self, endpoint: Endpoint) -> None:
+		endpoint.outstanding += 1
+		endpoint.served += 1
+
+	def choose(self, model: str, exclude: Optional[Set[str]] = None) -> Endpoint:
+		exclude = exclude or set()
+		while True:
+			best, probe = self._pick(model, exclude)
+			if not probe:
+				return best
+			# Half-open: an endpoint past its backoff must pass a health check first
+			if self.health_check(best):
+				with self._lock:
+					self._claim(best)
+				return best
+			exclude.add(best.url)
+
+	async def achoose(self, model: str, exclude: Optional[Set[str]] = None) -> Endpoint:
+		"""choose() for coroutines: the (blocking, rare) half-open probe runs on a worker thread."""
+		exclude = exclude or set()
+		while True:
+			best, probe = self._pick(model, exclude)
+			if not probe:
+				return best
+			if await asyncio.to_thread(self.health_check, best):
+				with self._lock:
+					self._claim(best)
+				return best
+			exclude.add(best.url)
+
+	def release(self, endpoint: Endpoint) -> None:
+		with self._lock:
+			endpoint.outstanding = max(0, endpoint.outstanding - 1)
+
+	# --- health ---
+	def mark_failed(self, endpoint: Endpoint, error: Exception) -> None:
+		with self._lock:
+			endpoint.failures += 1
+			endpoint.healthy = False
+			backoff = min(RETRY_BACKOFF[1], RETRY_BACKOFF[0] * (2 ** (endpoint.failures - 1)))
+			endpoint.retry_at = time.monotonic() + backoff
+		print(f"[WARN] LLM endpoint {endpoint.url} marked down for {backoff:.0f}s: {error}")
+
+	def mark_ok(self, endpoint: Endpoint) -> None:
+		if endpoint.healthy and not endpoint.failures:
+			return
+		with self._lock:
+			endpoint.healthy = True
+			endpoint.failures = 0
+
+	def health_check(self, endpoint: Endpoint) -> bool:
+		"""List the endpoint's models via its backend; refreshes the discovered model list."""
+		try:
+			names = endpoint.backend.list_models(endpoint.url, timeout=HEALTH_TIMEOUT)
+			with self._lock:
+				endpoint.discovered_models = set(names)
+				endpoint.missing_models.clear()
+			self.mark_ok(endpoint)
+			return True
+		except Exception as e:
+			self.mark_failed(endpoint, e)
+			return False
+
+	def check_all(self, due_only: bool = False) -> Dict[str, bool]:
+		"""Health-check every endpoint; due_only skips endpoints still inside their backoff."""
+		now = time.monotonic()
+		return {
+			e.url: self.health_check(e) for e in self.endpoints
+			if not due_only or e.healthy or now >= e.retry_at
+		}
+
+	def start_health_checks(self, interval: float = HEALTH_INTERVAL) -> bool:
+		"""
+		Run check_all(due_only=True) every `interval` seconds on a daemon thread, so a
+		dead server is marked down before a request waits on it and a recovered one
+		rejoins without traffic. Only for pools of two or more endpoints (a single
+		one has nothing to fail over to). Returns True if started.
+		"""
+		if interval <= 0 or len(self.endpoints) < 2 or self._health_stop is not None:
+			return False
+		stop = self._health_stop = threading.Event()
+
+		def loop():
+			while not stop.wait(interval):
+				self.check_all(due_only=True)
+
+		threading.Thread(target=loop, name="saias-endpoint-health", daemon=True).start()
+		return True
+
+	def stop_health_checks(self) -> None:
+		if self._health_stop is not None:
+			self._health_stop.set()
+			self._health_stop = None
+
+	# --- dispatch ---
+	def request(self, model: str, fn: Callable[[Endpoint], Any]) -> Any:
+		"""
+		Run fn(endpoint) on the best endpoint for `model`, failing over to the next
+		one on connection errors, timeouts, 5xx responses or a missing model.
+		"""
+		tried: Set[str] = set()
+		last_error: Optional[Exception] = None
+		while True:
+			try:
+				endpoint = self.choose(model, tried)
+			except NoEndpointAvailable:
+				if last_error is not None:
+					raise last_error
+				raise
+			tried.add(endpoint.url)
+			try:
+				result = fn(endpoint)
+				self.mark_ok(endpoint)
+				return result
+			except ModelUnavailable as e:
+				with self._lock:
+					endpoint.missing_models.add(model)
+				last_error = e
+			except Exception as e:
+				if not _should_fail_over(e):
+					raise
+				self.mark_failed(endpoint, e)
+				last_error = e
+			finally:
+				self.release(endpoint)
+
+	async def arequest(self, model: str, fn: Callable[[Endpoint], Awaitable[Any]]) -> Any:
+		"""request() for coroutines: awaits fn(endpoint), with the same failover."""
+		tried: Set[str] = set()
+		last_error: Optional[Exception] = None
+		while True:
+			try:
+				endpoint = await self.achoose(model, tried)
+			except NoEndpointAvailable:
+				if last_error is not None:
+					raise last_error
+				raise
+			tried.add(endpoint.url)
+			try:
+				result = await fn(endpoint)
+				self.mark_ok(endpoint)
+				return result
+			except ModelUnavailable as e:
+				with self._lock:
+					endpoint.missing_models.add(model)
+				last_error = e
+			except Exception as e:
+				if not _should_fail_over(e):
+					raise
+				self.mark_failed(endpoint, e)
+				last_error = e
+			finally:
+				self.release(endpoint)
+
+	def request_stream(self, model: str, fn: Callable[[Endpoint], Iterator[Any]]) -> Iterator[Any]:
+		"""
+		Streaming variant of request(): yields from fn(endpoint). Failover only happens
+		before the first item arrives; the endpoint counts as outstanding until the stream ends.
+		"""
+		tried: Set[str] = set()
+		last_error: Optional[Exception] = None
+		while True:
+			try:
+				endpoint = self.choose(model, tried)
+			except NoEndpointAvailable:
+				if last_error is not None:
+					raise last_error
+				raise
+			tried.add(endpoint.url)
+			started = False
+			try:
+				for item in fn(endpoint):
+					started = True
+					yield item
+				self.mark_ok(endpoint)
+				return
+			except ModelUnavailable as e:
+				with self._lock:
+					endpoint.missing_models.add(model)
+				last_error = e
+			except Exception as e:
+				if not _should_fail_over(e):
+					raise
+				self.mark_failed(endpoint, e)
+				if started:
+					raise
+				last_error = e
+			finally:
+				self.release(endpoint)
+
+	async def arequest_stream(self, model: str, fn: Callable[[Endpoint], AsyncIterator[Any]]) -> AsyncIterator[Any]:
+		"""request_stream() for coroutines; fn(endpoint) returns an async iterator."""
+		tried: Set[str] = set()
+		last_error: Optional[Exception] = None
+		while True:
+			try:
+				endpoint = await self.achoose(model, tried)
+			except NoEndpointAvailable:
+				if last_error is not None:
+					raise last_error
+				raise
+			tried.add(endpoint.url)
+			started = False
+			stream = fn(endpoint)
+			try:
+				async for item in stream:
+					started = True
+					yield item
+				self.mark_ok(endpoint)
+				return
+			except ModelUnavailable as e:
+				with self._lock:
+					endpoint.missing_models.add(model)
+				last_error = e
+			except Exception as e:
+				if not _should_fail_over(e):
+					raise
+				self.mark_failed(endpoint, e)
+				if started:
+					raise
+				last_error = e
+			finally:
+				aclose = getattr(stream, "aclose", None)
+				if aclose is not None:
+					await aclose()  # closes the HTTP response now, not when the generator is collected
+				self.release(endpoint)
+
+	def status(self) -> List[Dict[str, Any]]:
+		with self._lock:
+			return [
+				{
+					"url": e.url, "api": e.api, "weight": e.weight, "healthy": e.healthy, "outstanding": e.outstanding,
+					"served": e.served, "failures": e.failures,
+					"models": sorted(e.models or e.discovered_models or []),
+				}
+				for e in self.endpoints
+			]
+
+
+_pool: Optional[EndpointPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_endpoint_pool(config: Optional[Dict[str, Any]] = None) -> EndpointPool:
+	global _pool
+	if _pool is None:
+		with _pool_lock:
+			if _pool is None:
+				if config is None:
+					from agent.tools.llm import load_config
+					try:
+						config = load_config()
+					except Exception:
+						config = {}
+				_pool = EndpointPool.from_config(config)
+				_pool.start_health_checks(float((config.get("llm", {}) or {}).get("health_check_s", HEALTH_INTERVAL)))
+	return _pool
+
+
+def configure_endpoints(endpoints: Optional[List[Any]] = None, health_check_s: float = HEALTH_INTERVAL) -> EndpointPool:
+	"""
+	Replace the process-wide pool, e.g. with local stand-in servers:
+	configure_endpoints(["http://127.0.0.1:8001", {"url": "http://127.0.0.1:8002", "weight": 2}]).
+	None rebuilds it from config.json.
+	"""
+	global _pool
+	with _pool_lock:
+		if _pool is not None:
+			_pool.stop_health_checks()
+		_pool = None
+		if endpoints is not None:
+			_pool = EndpointPool.from_config({"llm": {"endpoints": endpoints}})
+			_pool.start_health_checks(health_check_s)
+	return get_endpoint_pool()
@@ -0,0 +1,218 @@
+# agent/tools/log_setup.py
+"""
+Process-wide logging: level-gated, non-blocking, rotated.
+
+setup_logging() routes the root logger through a QueueHandler; a QueueListener
+thread formats records and writes them to a size-rotated file under
+agent/memory/logs, so callers never wait on disk. Records are formatted in the
+listener, and only after the level check, so
+
+	log.debug("payload:\n%s", lazy_json(payload))
+
+costs nothing unless DEBUG is enabled (logging_level in config.json, or the
+SAIAS_LOG_LEVEL environment variable).
+
+Full payloads (chat requests, raw model output, ...) go to record_payload():
+an in-memory ring that keeps references only. When an ERROR is logged, the ring
+is written to logs/payloads-<time>.jsonl so failures come with their inputs;
+only the newest logging.max_dumps of those files are kept.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+LOG_DIR = Path(__file__).resolve().parents[1] / "memory" / "logs"
+CONFIG_PATH = Path(__file__).resolve().parents[1] / "memory" / "config.json"
+LEVEL_ENV = "SAIAS_LOG_LEVEL"
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(name)s - %(message)s"
+DEFAULTS = {
+	"max_bytes": 5 * 1024 * 1024,  # rotate the log file at this size
+	"backup_count": 3,  # rotated files kept
+	"payload_ring": 32,  # recent payloads kept for error dumps
+	"dump_interval": 30.0,  # seconds between payload dumps (error bursts write one file)
+	"max_dumps": 20,  # payload dump files kept; older ones are deleted
+}
+DUMP_GLOB = "payloads-*.jsonl"
+
+_lock = threading.Lock()
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class _Lazy:
+	"""Defers an expensive computation until a handler actually formats the record."""
+	__slots__ = ("fn", "args", "kwargs")
+
+	def __init__(self, fn: Callable, *args, **kwargs):
+		self.fn = fn
+		self.args = args
+		self.kwargs = kwargs
+
+	def __str__(self) -> str:
+		return str(self.fn(*self.args, **self.kwargs))
+
+
+def lazy(fn: Callable, *args, **kwargs) -> _Lazy:
+	return _Lazy(fn, *args, **kwargs)
+
+
+def lazy_json(value: Any, indent: int = 2) -> _Lazy:
+	return _Lazy(json.dumps, value, indent=indent, ensure_ascii=False, default=str)
+
+
+class PayloadRing:
+	"""Last N payloads by reference (nothing is copied or serialized until dump())."""
+
+	def __init__(self, size: int = DEFAULTS["payload_ring"]):
+		self._items: deque = deque(maxlen=size)
+		self._lock = threading.Lock()
+		self._last_dump = 0.0
+
+	def resize(self, size: int) -> None:
+		with self._lock:
+			self._items = deque(self._items, maxlen=max(1, size))
+
+	def record(self, kind: str, **fields) -> None:
+		item = (time.time(), threading.current_thread().name, kind, fields)
+		with self._lock:
+			self._items.append(item)
+
+	def __len__(self) -> int:
+		return len(self._items)
+
+	def dump(self, reason: str = "", directory: Path = LOG_DIR, min_interval: float = 0.0,
+			keep: int = DEFAULTS["max_dumps"]) -> Optional[Path]:
+		"""
+		Write the ring as JSON lines, then delete all but the newest `keep` dump
+		files; None when empty or dumped less than min_interval ago.
+		"""
+		with self._lock:
+			now = time.time()
+			if not self._items or now - self._last_dump < min_interval:
+				return None
+			self._last_dump = now
+			items = list(self._items)
+		directory.mkdir(parents=True, exist_ok=True)
+		path = directory / f"payloads-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}.jsonl"
+		with open(path, "w", encoding="utf-8") as f:
+			f.write(json.dumps({"reason": reason, "count": len(items)}, ensure_ascii=False) + "\n")
+			for ts, thread, kind, fields in items:
+				entry = {"time": datetime.fromtimestamp(ts).isoformat(), "thread": thread, "kind": kind, **fields}
+				f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+		_prune_dumps(directory, keep)
+		return path
+
+
+def _prune_dumps(directory: Path, keep: int) -> None:
+	"""Delete all but the newest `keep` payload dumps (names sort by time)."""
+	for old in sorted(directory.glob(DUMP_GLOB))[:-max(1, keep)]:
+		try:
+			old.unlink()
+		except OSError:
+			pass
+
+
+PAYLOADS = PayloadRing()
+
+
+def record_payload(kind: str, **fields) -> None:
+	"""Keep a full payload for the next error dump (cheap: stores references)."""
+	PAYLOADS.record(kind, **fields)
+
+
+class _ThreadQueueHandler(logging.handlers.QueueHandler):
+	"""
+	In-process queue: hand the record over unformatted so %-formatting (and any
+	lazy() arguments) run in the listener thread instead of the caller.
+	"""
+
+	def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+		return record
+
+
+class _PayloadDumpHandler(logging.Handler):
+	"""On ERROR and above, write the payload ring next to the log (rate-limited)."""
+
+	def __init__(self, interval: float, keep: int):
+		super().__init__(logging.ERROR)
+		self.interval = interval
+		self.keep = keep
+
+	def emit(self, record: logging.LogRecord) -> None:
+		try:
+			path = PAYLOADS.dump(record.getMessage()[:500], min_interval=self.interval, keep=self.keep)
+			if path is not None:
+				logging.getLogger(__name__).info("Recent payloads written to %s", path)
+		except Exception:
+			self.handleError(record)
+
+
+def _logging_config() -> Dict[str, Any]:
+	try:
+		from agent.tools.memory_store import read_json
+		config = read_json(CONFIG_PATH, default={}, copy_result=False) or {}
+	except Exception:
+		config = {}
+	settings = dict(DEFAULTS)
+	settings.update(config.get("logging", {}) or {})
+	settings["level"] = os.environ.get(LEVEL_ENV) or config.get("logging_level") or "INFO"
+	return settings
+
+
+def log_level() -> int:
+	level = logging.getLevelName(str(_logging_config()["level"]).upper())
+	return level if isinstance(level, int) else logging.INFO
+
+
+def setup_logging(name: str = "saias") -> Path:
+	"""
+	Configure the root logger once per process (later calls are no-ops and return
+	the first log path). Logs go to agent/memory/logs/<name>.log.
+	"""
+	global _listener
+	with _lock:
+		if _listener is not None:
+			return Path(_listener.handlers[0].baseFilename)
+		settings = _logging_config()
+		LOG_DIR.mkdir(parents=True, exist_ok=True)
+		file_handler = logging.handlers.RotatingFileHandler(
+			LOG_DIR / f"{name}.log", maxBytes=int(settings["max_bytes"]), backupCount=int(settings["backup_count"]),
+			encoding="utf-8", delay=True,
+		)
+		file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+		PAYLOADS.resize(int(settings["payload_ring"]))
+
+		records: queue.SimpleQueue = queue.SimpleQueue()
+		_listener = logging.handlers.QueueListener(
+			records, file_handler, _PayloadDumpHandler(float(settings["dump_interval"]), int(settings["max_dumps"])), respect_handler_level=True,
+		)
+		root = logging.getLogger()
+		root.setLevel(log_level())
+		root.addHandler(_ThreadQueueHandler(records))
+		_listener.start()
+		atexit.register(stop_logging)
+		return Path(file_handler.baseFilename)
+
+
+def stop_logging() -> None:
+	"""Flush queued records and stop the listener thread."""
+	global _listener
+	with _lock:
+		listener, _listener = _listener, None
+	if listener is None:
+		return
+	listener.stop()
+	root = logging.getLogger()
+	for handler in list(root.handlers):
+		if isinstance(handler, _ThreadQueueHandler):
+			root.removeHandler(handler)
+	for handler in listener.handlers:
+		handler.close()
@@ -0,0 +1,213 @@
+# agent/tools/memory_store.py
+import atexit
+import copy
+import json
+import os
+import stat
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+MEMORY_DIR = Path(__file__).resolve().parents[1] / "memory"
+
+PathLike = Union[str, Path]
+
+_MISSING = object()
+
+
+class MemoryStore:
+	"""
+	In-process cache for the JSON/text documents under agent/memory.
+
+	- Reads are served from memory until the file's (mtime, size) changes on disk.
+	- Writes are atomic (temp file in the same directory + os.replace).
+	- Deferred writes (defer=True) are coalesced and flushed after `flush_delay`
+	  seconds, on flush(), or at interpreter exit.
+	"""
+
+	def __init__(self, flush_delay: float = 0.5):
+		self.flush_delay = flush_delay
+		self._lock = threading.RLock()
+		self._cache: Dict[str, Tuple[Tuple[int, int], Any]] = {}  # path → (stat key, value)
+		self._pending: Dict[str, Tuple[str, Any, int]] = {}  # path → (kind, value, indent)
+		self._timer: Optional[threading.Timer] = None
+		self.hits = 0
+		self.misses = 0
+
+	@staticmethod
+	def _key(path: PathLike) -> str:
+		return os.path.abspath(os.fspath(path))
+
+	@staticmethod
+	def _stat(path: str) -> Optional[Tuple[int, int]]:
+		try:
+			st = os.stat(path)
+			return (st.st_mtime_ns, st.st_size)
+		except OSError:
+			return None
+
+	def _read(self, path: PathLike, kind: str, parse) -> Any:
+		key = self._key(path)
+		with self._lock:
+			pending = self._pending.get(key)
+			if pending is not None:
+				self.hits += 1
+				return pending[1]
+			stat = self._stat(key)
+			if stat is None:
+				self._cache.pop(key, None)
+				return _MISSING
+			cached = self._cache.get(key)
+			if cached is not None and cached[0] == stat:
+				self.hits += 1
+				return cached[1]
+		with open(key, "r", encoding="utf-8") as f:
+			value = parse(f.read())
+		with self._lock:
+			self.misses += 1
+			self._cache[key] = (stat, value)
+		return value
+
+	# --- reads ---
+	def read_json(self, path: PathLike, default: Any = None, copy_result: bool = True) -> Any:
+		"""
+		Parsed JSON for `path`, or `default` if missing/corrupt.
+		Pass copy_result=False only for read-only use: the cached object is shared.
+		"""
+		try:
+			value = self._read(path, "json", json.loads)
+		except (OSError, ValueError):
+			return default
+		if value is _MISSING:
+			return default
+		return copy.deepcopy(value) if copy_result else value
+
+	def read_text(self, path: PathLike, default: str = "") -> str:
+		try:
+			value = self._read(path, "text", lambda text: text)
+		except (OSError, UnicodeDecodeError):
+			return default
+		return default if value is _MISSING else value
+
+	# --- writes ---
+	def write_json(self, path: PathLike, data: Any, defer: bool = False, indent: int = 2) -> None:
+		self._write(path, "json", data, defer, indent)
+
+	def write_text(self, path: PathLike, text: str, defer: bool = False) -> None:
+		self._write(path, "text", text, defer, 0)
+
+	def _write(self, path: PathLike, kind: str, value: Any, defer: bool, indent: int) -> None:
+		key = self._key(path)
+		if kind == "json":
+			value = copy.deepcopy(value)  # callers may keep mutating their object
+		with self._lock:
+			self._pending[key] = (kind, value, indent)
+			if defer:
+				self._schedule_flush()
+				return
+		self.flush(key)
+
+	def _schedule_flush(self) -> None:
+		if self._timer is None:
+			self._timer = threading.Timer(self.flush_delay, self.flush)
+			self._timer.daemon = True
+			self._timer.start()
+
+	def flush(self, path: Optional[PathLike] = None) -> None:
+		"""Write pending documents to disk (all of them, or just `path`)."""
+		with self._lock:
+			if path is None:
+				keys = list(self._pending)
+				if self._timer is not None:
+					self._timer.cancel()
+					self._timer = None
+			else:
+				keys = [self._key(path)] if self._key(path) in self._pending else []
+			for key in keys:
+				kind, value, indent = self._pending[key]
+				text = json.dumps(value, indent=indent or None, ensure_ascii=False) if kind == "json" else value
+				try:
+					_atomic_write_text(key, text)
+				except OSError as e:
+					print(f"[WARN] Could not write {key}: {e}")
+					continue
+				del self._pending[key]
+				stat = self._stat(key)
+				if stat is not None:
+					self._cache[key] = (stat, value)
+
+	def invalidate(self, path: Optional[PathLike] = None) -> None:
+		"""Forget cached (and pending) state for `path`, or for everything."""
+		with self._lock:
+			if path is None:
+				self._cache.clear()
+				self._pending.clear()
+			else:
+				self._cache.pop(self._key(path), None)
+				self._pending.pop(self._key(path), None)
+
+	def delete(self, path: PathLike) -> None:
+		self.invalidate(path)
+		try:
+			os.remove(self._key(path))
+		except FileNotFoundError:
+			pass
+
+	def stat_key(self, path: PathLike) -> Optional[Tuple[int, int]]:
+		"""(mtime_ns, size) of `path`, for callers deriving their own caches."""
+		return self._stat(self._key(path))
+
+
+def _read_umask() -> int:
+	mask = os.umask(0)
+	os.umask(mask)
+	return mask
+
+
+# Read once at import: os.umask() can only be queried by setting it, which is not thread-safe
+_UMASK = _read_umask()
+
+
+def _atomic_write_text(path: str, text: str) -> None:
+	directory = os.path.dirname(path) or "."
+	os.makedirs(directory, exist_ok=True)
+	# mkstemp creates the file 0600: keep the target's mode, or the umask default a plain open() would give
+	try:
+		mode = stat.S_IMODE(os.stat(path).st_mode)
+	except FileNotFoundError:
+		mode = 0o666 & ~_UMASK
+	fd, tmp_path = tempfile.mkstemp(prefix=".tmp_", suffix=os.path.basename(path), dir=directory)
+	try:
+		with os.fdopen(fd, "w", encoding="utf-8") as f:
+			os.chmod(tmp_path, mode)
+			f.write(text)
+			f.flush()
+			os.fsync(f.fileno())
+		os.replace(tmp_path, path)
+	except BaseException:
+		try:
+			os.remove(tmp_path)
+		except OSError:
+			pass
+		raise
+
+
+store = MemoryStore()
+atexit.register(store.flush)
+
+
+def read_json(path: PathLike, default: Any = None, copy_result: bool = True) -> Any:
+	return store.read_json(path, default, copy_result)
+
+
+def read_text(path: PathLike, default: str = "") -> str:
+	return store.read_text(path, default)
+
+
+def write_json(path: PathLike, data: Any, defer: bool = False, indent: int = 2) -> None:
+	store.write_json(path, data, defer, indent)
+
+
+def write_text(path: PathLike, text: str, defer: bool = False) -> None:
+	store.write_text(path, text, defer)
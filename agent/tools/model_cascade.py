@@ -0,0 +1,125 @@
+# agent/tools/model_cascade.py
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from agent.tools.llm import get_model_config, load_config, safe_code_llm
+from agent.tools.memory_store import read_json, write_json
+
+MEMORY_DIR = Path(__file__).resolve().parents[1] / "memory"
+STATS_PATH = MEMORY_DIR / "cascade_stats.json"
+DEFAULT_MIN_SCORE = 6
+
+
+def cascade_config() -> Dict:
+	try:
+		return load_config().get("llm", {}).get("cascade", {}) or {}
+	except Exception:
+		return {}
+
+
+def code_model_tiers() -> List[str]:
+	"""
+	Models to try for code generation, cheapest first. The configured code_model
+	is always the final tier; llm.cascade.fast_models (or fast_model) come before it.
+	"""
+	_, code_model = get_model_config()
+	cfg = cascade_config()
+	if not cfg.get("enabled", False):
+		return [code_model]
+	fast = cfg.get("fast_models") or ([cfg["fast_model"]] if cfg.get("fast_model") else [])
+	tiers = [m for m in fast if m and m != code_model]
+	return tiers + [code_model]
+
+
+class CascadeStats:
+	"""Per-tier attempts/acceptances/escalations and latency, persisted to cascade_stats.json."""
+
+	def __init__(self, path: Path = STATS_PATH):
+		self.path = path
+		self._lock = threading.Lock()
+		data = read_json(path, default={})
+		tiers = data.get("tiers") if isinstance(data, dict) else None
+		self._tiers: Dict[str, Dict[str, float]] = tiers if isinstance(tiers, dict) else {}
+
+	def record(self, model: str, outcome: str, seconds: float) -> None:
+		"""outcome ∈ {"accepted", "escalated", "failed"}"""
+		with self._lock:
+			t = self._tiers.setdefault(model, {
+				"attempts": 0, "accepted": 0, "escalated": 0, "failed": 0,
+				"seconds": 0.0, "accepted_seconds": 0.0,
+			})
+			t["attempts"] += 1
+			t[outcome] += 1
+			t["seconds"] += seconds
+			if outcome == "accepted":
+				t["accepted_seconds"] += seconds
+			snapshot = {"tiers": self._tiers}
+			write_json(self.path, snapshot, defer=True)
+
+	def summary(self, tiers: Optional[List[str]] = None) -> Dict[str, Dict[str, float]]:
+		"""
+		Escalation rate and estimated latency saved per tier. Savings compare each
+		fast-tier acceptance with the final tier's average accepted latency.
+		"""
+		with self._lock:
+			data = {m: dict(t) for m, t in self._tiers.items()}
+		tiers = tiers or list(data)
+		final = data.get(tiers[-1], {}) if tiers else {}
+		final_avg = (final.get("accepted_seconds", 0.0) / final["accepted"]) if final.get("accepted") else None
+		out = {}
+		for model, t in data.items():
+			attempts = t.get("attempts", 0) or 0
+			row = dict(t)
+			row["escalation_rate"] = ((t.get("escalated", 0) + t.get("failed", 0)) / attempts) if attempts else 0.0
+			row["avg_seconds"] = (t.get("seconds", 0.0) / attempts) if attempts else 0.0
+			if final_avg is not None and tiers and model != tiers[-1]:
+				# Time a fast acceptance saved, minus time wasted on attempts that escalated anyway
+				row["latency_saved_seconds"] = t.get("accepted", 0) * final_avg - t.get("seconds", 0.0)
+			out[model] = row
+		return out
+
+
+_stats: Optional[CascadeStats] = None
+
+
+def get_cascade_stats() -> CascadeStats:
+	global _stats
+	if _stats is None:
+		_stats = CascadeStats()
+	return _stats
+
+
+def run_cascade(prompt: str, validate: Callable[[str], bool], score: Optional[Callable[[str], float]] = None,
+		source: Optional[str] = None) -> Optional[str]:
+	"""
+	Generate code with the cheapest tier that produces an acceptable result.
+	A non-final tier is accepted when its output passes `validate` and scores at
+	least llm.cascade.min_score; otherwise the prompt escalates to the next tier.
+	The final (configured code_model) tier only has to pass `validate`.
+	`source` is the code being rewritten (sizes the output budget).
+	"""
+	tiers = code_model_tiers()
+	min_score = float(cascade_config().get("min_score", DEFAULT_MIN_SCORE))
+	stats = get_cascade_stats()
+
+	for i, model in enumerate(tiers):
+		final = i == len(tiers) - 1
+		start = time.perf_counter()
+		code = safe_code_llm(prompt, model=model, source=source)
+		ok = bool(code) and validate(code)
+		if ok and not final and score is not None:
+			ok = score(code) >= min_score
+		elapsed = time.perf_counter() - start
+
+		if ok:
+			stats.record(model, "accepted", elapsed)
+			if i:
+				print(f"[CASCADE] Accepted from '{model}' after {i} escalation(s)")
+			return code
+		# a rejection only escalates when there is a next tier
+		stats.record(model, "failed" if final or not code else "escalated", elapsed)
+		if not final:
+			print(f"[CASCADE] '{model}' result rejected; escalating to '{tiers[i + 1]}'")
+	return None
@@ -0,0 +1,154 @@
+# agent/tools/patch_journal.py
+"""
+Checkpoint journal for self-patch runs.
+
+An append-only JSONL file (memory/self_patch_journal.jsonl) records, as they
+complete, every chunk result (refactored code or failure) and every file
+outcome (patch emitted, skipped and why). A run that was interrupted (crash,
+reboot, GUI exit, stop request) leaves no "run_end" line, so the next run
+resumes it: files that already have an outcome are skipped while their source
+is unchanged, and chunks that already have code are reused instead of being
+sent to the model again. Only failed chunks are re-requested, up to the retry
+budget. A finished run's journal is replaced when the next run starts.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+JOURNAL_PATH = Path(__file__).resolve().parents[1] / "memory" / "self_patch_journal.jsonl"
+
+
+def text_hash(text: str) -> str:
+	return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def chunk_key(chunk) -> str:
+	"""Stable identity of a CodeChunk's work: position plus content (an edited chunk is new work)."""
+	return f"{chunk.chunk_type}:{chunk.name}:{chunk.start_line}:{text_hash(chunk.content)[:16]}"
+
+
+def _file_key(file_path) -> str:
+	return str(Path(file_path).resolve())
+
+
+class PatchJournal:
+	def __init__(self, path: Optional[Path] = None):
+		self.path = Path(path or JOURNAL_PATH)
+		self.run_id = ""
+		self.resumed = False
+		self.files: Dict[str, Dict[str, Any]] = {}  # file → last outcome entry
+		self.chunks: Dict[Tuple[str, str], Dict[str, Any]] = {}  # (file, chunk key) → {"code", "attempts"}
+		self._lock = threading.Lock()
+		self._out = None
+
+	@classmethod
+	def open(cls, resume: bool = True, path: Optional[Path] = None) -> "PatchJournal":
+		"""Resume the unfinished run in `path` (default JOURNAL_PATH) when resume, else start a new run there."""
+		journal = cls(path)
+		if resume and journal._load():
+			journal.resumed = True
+			journal._out = open(journal.path, "a", encoding="utf-8")
+			journal._terminate_partial_line()
+			print(
+				f"[RESUME] Continuing self-patch run {journal.run_id}: {len(journal.files)} file(s) done, "
+				f"{sum(1 for c in journal.chunks.values() if c.get('code'))} chunk(s) checkpointed"
+			)
+		else:
+			journal = cls(path)  # drop anything replayed from a finished run
+			journal.path.parent.mkdir(parents=True, exist_ok=True)
+			journal.run_id = datetime.now().strftime("%Y%m%d-%H%M%S")
+			journal._out = open(journal.path, "w", encoding="utf-8")
+			journal._append({"event": "run_start", "run_id": journal.run_id, "started": datetime.now().isoformat()})
+		return journal
+
+	def _load(self) -> bool:
+		"""Replay the journal; False when there is none or its run finished."""
+		if not self.path.exists():
+			return False
+		finished = False
+		with open(self.path, "r", encoding="utf-8") as f:
+			for raw in f:
+				try:
+					entry = json.loads(raw)
+				except ValueError:
+					continue  # line cut off by the interruption
+				event = entry.get("event")
+				if event == "run_start":
+					self.run_id = entry.get("run_id", "")
+				elif event == "chunk":
+					key = (entry["file"], entry["key"])
+					previous = self.chunks.get(key, {})
+					self.chunks[key] = {
+						"code": entry.get("code") or previous.get("code"),
+						"attempts": previous.get("attempts", 0) + 1,
+					}
+				elif event == "file":
+					self.files[entry["file"]] = entry
+				elif event == "run_end":
+					finished = True
+		return bool(self.run_id) and not finished
+
+	def _terminate_partial_line(self) -> None:
+		if self.path.stat().st_size:
+			with open(self.path, "rb") as f:
+				f.seek(-1, os.SEEK_END)
+				if f.read(1) != b"\n":
+					self._out.write("\n")
+
+	def _append(self, entry: Dict[str, Any]) -> None:
+		# flush + fsync per entry: a checkpoint must survive a crash or power loss
+		line = json.dumps(entry, ensure_ascii=False) + "\n"
+		with self._lock:
+			if self._out is None:
+				return
+			self._out.write(line)
+			self._out.flush()
+			os.fsync(self._out.fileno())
+
+	# --- chunks ---
+	def chunk(self, file_path, key: str) -> Tuple[Optional[str], int]:
+		"""(checkpointed code or None, attempts already made) for one chunk of this run."""
+		with self._lock:
+			entry = self.chunks.get((_file_key(file_path), key))
+		if entry is None:
+			return None, 0
+		return entry.get("code"), int(entry.get("attempts", 0))
+
+	def record_chunk(self, file_path, key: str, code: Optional[str]) -> None:
+		file_key = _file_key(file_path)
+		with self._lock:
+			previous = self.chunks.get((file_key, key), {})
+			self.chunks[(file_key, key)] = {"code": code or previous.get("code"), "attempts": previous.get("attempts", 0) + 1}
+		self._append({"event": "chunk", "file": file_key, "key": key, "code": code, "time": time.time()})
+
+	# --- files ---
+	def file_outcome(self, file_path, source: str) -> Optional[Dict[str, Any]]:
+		"""The recorded outcome for this file, if its source has not changed since."""
+		with self._lock:
+			entry = self.files.get(_file_key(file_path))
+		if entry is None or entry.get("source_hash") != text_hash(source):
+			return None
+		return entry
+
+	def record_file(self, file_path, source: str, outcome: str, **fields) -> None:
+		entry = {"event": "file", "file": _file_key(file_path), "source_hash": text_hash(source), "outcome": outcome, **fields}
+		with self._lock:
+			self.files[entry["file"]] = entry
+		self._append(entry)
+
+	# --- run ---
+	def finish(self, **fields) -> None:
+		"""Mark the run complete (the next run starts a new journal)."""
+		self._append({"event": "run_end", "finished": datetime.now().isoformat(), **fields})
+		self.close()
+
+	def close(self) -> None:
+		with self._lock:
+			out, self._out = self._out, None
+		if out is not None:
+			out.close()
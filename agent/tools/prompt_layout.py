@@ -0,0 +1,103 @@
+# agent/tools/prompt_layout.py
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+Messages = List[Dict[str, str]]
+
+
+def render_messages(messages: Messages) -> str:
+	"""Flat text approximating what the server tokenizes (role markers + contents, in order)."""
+	return "".join(f"<{m.get('role', '')}>\n{m.get('content', '')}\n" for m in messages)
+
+
+def fingerprint(text: str) -> str:
+	return hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+
+
+def _common_prefix(a: str, b: str) -> int:
+	n = min(len(a), len(b))
+	i = 0
+	# Compare in blocks first; prompts share long prefixes when the layout is right
+	step = 256
+	while i + step <= n and a[i:i + step] == b[i:i + step]:
+		i += step
+	while i < n and a[i] == b[i]:
+		i += 1
+	return i
+
+
+class PrefixMonitor:
+	"""
+	Checks that each prompt starts with its declared stable prefix and tracks,
+	per (kind, model), how often that prefix changed between calls and how much
+	of the previous prompt the new one shares (what the server's KV prefix
+	cache can reuse).
+	"""
+
+	def __init__(self):
+		self._lock = threading.Lock()
+		self._last: Dict[Tuple[str, str], Tuple[str, str]] = {}  # (kind, model) → (stable fingerprint, full text)
+		self._stats: Dict[str, Dict[str, Any]] = {}
+
+	def observe(self, kind: str, model: str, stable: str, messages: Messages) -> bool:
+		"""
+		Record one prompt whose system message should begin with `stable`; False if
+		it does not, or if the stable text changed since the last call.
+		"""
+		full = render_messages(messages)
+		stable_fp = fingerprint(stable)
+		ok = full.startswith(f"<system>\n{stable}")
+		if not ok:
+			print(f"[WARN] {kind} prompt for '{model}' does not start with its stable prefix; KV prefix reuse is lost")
+		with self._lock:
+			st = self._stats.setdefault(kind, {
+				"calls": 0, "prefix_changes": 0, "layout_violations": 0,
+				"shared_chars": 0, "total_chars": 0, "fingerprint": stable_fp,
+			})
+			st["calls"] += 1
+			st["total_chars"] += len(full)
+			if not ok:
+				st["layout_violations"] += 1
+			previous = self._last.get((kind, model))
+			if previous is not None:
+				if previous[0] != stable_fp:
+					st["prefix_changes"] += 1
+					ok = False
+					print(f"[PREFIX] {kind} stable prefix changed for '{model}' ({previous[0]} → {stable_fp})")
+				st["shared_chars"] += _common_prefix(previous[1], full)
+			st["fingerprint"] = stable_fp
+			self._last[(kind, model)] = (stable_fp, full)
+		return ok
+
+	def stats(self) -> Dict[str, Dict[str, Any]]:
+		with self._lock:
+			out = {}
+			for kind, st in self._stats.items():
+				row = dict(st)
+				row["reuse_ratio"] = (st["shared_chars"] / st["total_chars"]) if st["total_chars"] else 0.0
+				out[kind] = row
+			return out
+
+
+PREFIX_MONITOR = PrefixMonitor()
+
+
+def prefix_stats() -> Dict[str, Dict[str, Any]]:
+	return PREFIX_MONITOR.stats()
+
+
+def layout_messages(stable_system: str, volatile_system: Optional[str] = None,
+		history: Optional[Messages] = None, user: str = "") -> Messages:
+	"""
+	Order prompt parts from least to most volatile so consecutive calls share
+	the longest byte-identical prefix: stable system text (identity, rules,
+	instructions), then slowly-changing context, then history, then the new user turn.
+	"""
+	system = stable_system.strip()
+	if volatile_system and volatile_system.strip():
+		system = f"{system}\n\n{volatile_system.strip()}"
+	messages: Messages = [{"role": "system", "content": system}] if system else []
+	messages.extend(history or [])
+	messages.append({"role": "user", "content": user.strip()})
+	return messages
@@ -1,5 +1,6 @@
 import os
-import json
+
+from agent.tools.memory_store import write_json
 
 ROOT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 REGISTRY_PATH = os.path.join(ROOT_PATH, 'memory', 'root_registry.json')
@@ -22,8 +23,7 @@ def build_file_tree(base_dir):
 
 def update_registry():
 	tree = build_file_tree(ROOT_PATH)
-	with open(REGISTRY_PATH, "w", encoding="utf-8") as f:
-		json.dump(tree, f, indent=2)
+	write_json(REGISTRY_PATH, tree)
 
 	print(f"[✓] Root registry saved at {REGISTRY_PATH}")
 
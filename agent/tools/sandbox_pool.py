@@ -0,0 +1,262 @@
+# agent/tools/sandbox_pool.py
+"""
+Warm interpreter pool for self-patch sandbox checks.
+
+Candidates used to be checked by starting `python <file>.temp` (full
+interpreter start-up plus every import, per candidate) or by importing them
+inside the agent itself (fast, but the candidate's module-level code then
+runs in, and can pollute, the agent). Instead, a multiprocessing forkserver
+with the common dependencies pre-imported (sandbox.preload) forks worker
+processes ahead of time. Each worker runs exactly one candidate, either as
+__main__ like `python file` ("run") or as an imported module ("import"),
+under CPU-time and address-space limits plus a wall-clock timeout, and then
+exits. A replacement is forked in the background, so the next candidate
+finds a warm worker waiting.
+
+Needs the forkserver start method (POSIX). Elsewhere, or with
+sandbox.pool: false, get_sandbox_pool() returns None and callers keep their
+subprocess / in-process checks.
+"""
+import atexit
+import io
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+from agent.tools.tracing import span
+
+log = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 2
+DEFAULT_TIMEOUT_S = 10.0
+DEFAULT_CPU_S = 10
+DEFAULT_MEMORY_MB = 2048
+# Imported once in the forkserver, inherited by every worker
+DEFAULT_PRELOAD = (
+	"requests", "numpy",
+	"agent.tools.memory_store", "agent.tools.tracing", "agent.tools.log_setup", "agent.tools.llm",
+)
+ERROR_TAIL = 2000  # chars of traceback / output kept for a failed candidate
+
+
+@dataclass
+class SandboxResult:
+	ok: bool
+	error: str = ""
+	elapsed: float = 0.0
+
+
+# --- worker side (runs in the forked process) ---
+def _apply_limits(cpu_s: int, memory_mb: int) -> None:
+	try:
+		import resource
+	except ImportError:
+		return
+	if cpu_s:
+		resource.setrlimit(resource.RLIMIT_CPU, (cpu_s, cpu_s + 1))  # SIGXCPU, then SIGKILL
+	if memory_mb:
+		limit = memory_mb * 1024 * 1024
+		resource.setrlimit(resource.RLIMIT_AS, (limit, limit))  # allocations beyond it raise MemoryError
+
+
+def _run_candidate(path: str, mode: str) -> Tuple[bool, str]:
+	import importlib.machinery
+	import importlib.util
+	import runpy
+
+	sys.path.insert(0, os.path.dirname(os.path.abspath(path)))  # like `python path`
+	try:
+		if mode == "import":
+			# explicit loader: the .temp suffix is not a recognised source suffix
+			loader = importlib.machinery.SourceFileLoader("test_module", path)
+			spec = importlib.util.spec_from_file_location("test_module", path, loader=loader)
+			module = importlib.util.module_from_spec(spec)
+			sys.modules["test_module"] = module
+			loader.exec_module(module)
+		else:
+			sys.argv = [path]
+			runpy.run_path(path, run_name="__main__")
+	except SystemExit as e:
+		if e.code not in (None, 0):
+			return False, f"exited with status {e.code}"
+	except BaseException:
+		return False, traceback.format_exc()[-ERROR_TAIL:]
+	return True, ""
+
+
+def _worker_main(conn, cpu_s: int, memory_mb: int) -> None:
+	try:
+		path, mode, cwd = conn.recv()  # idle until the pool hands over a candidate
+	except (EOFError, OSError):
+		return  # pool closed
+	os.chdir(cwd)  # forked from the forkserver, which kept the cwd it started in
+	_apply_limits(cpu_s, memory_mb)
+	# Candidate output is noise (the old subprocess check captured and dropped it)
+	devnull = os.open(os.devnull, os.O_WRONLY)
+	os.dup2(devnull, 1)
+	os.dup2(devnull, 2)
+	sys.stdout = sys.stderr = io.StringIO()
+	ok, error = _run_candidate(path, mode)
+	if not ok:
+		output = sys.stdout.getvalue() if isinstance(sys.stdout, io.StringIO) else ""
+		if output.strip():
+			error = f"{output[-ERROR_TAIL:]}\n{error}"  # the error (exception line) last
+	conn.send((ok, error))
+	conn.close()
+	os._exit(0)  # skip atexit hooks the candidate may have registered
+
+
+# --- pool side ---
+class _Worker:
+	__slots__ = ("process", "conn")
+
+	def __init__(self, process, conn):
+		self.process = process
+		self.conn = conn
+
+	def retire(self) -> None:
+		self.conn.close()
+		if self.process.is_alive():
+			self.process.kill()
+		self.process.join(1)
+
+
+class SandboxPool:
+	def __init__(self, workers: int = DEFAULT_WORKERS, timeout_s: float = DEFAULT_TIMEOUT_S, cpu_s: int = DEFAULT_CPU_S,
+			memory_mb: int = DEFAULT_MEMORY_MB, preload: Sequence[str] = DEFAULT_PRELOAD):
+		self.size = max(1, int(workers))
+		self.timeout = float(timeout_s)
+		self.cpu_s = int(cpu_s)
+		self.memory_mb = int(memory_mb)
+		self.ctx = multiprocessing.get_context("forkserver")
+		# The agent's own modules must be importable in the forkserver however the agent was started
+		project_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+		if project_dir not in sys.path:
+			sys.path.append(project_dir)
+		# "__main__": the agent's entry script is imported once there, not again in every worker
+		self.ctx.set_forkserver_preload(["__main__", *preload])
+		self._idle: Deque[_Worker] = deque()
+		self._lock = threading.Lock()
+		self._closed = False
+		self._warmers: List[threading.Thread] = []
+		self.counts: Dict[str, int] = {"runs": 0, "passed": 0, "failed": 0, "timeouts": 0, "cold": 0}
+
+	@classmethod
+	def from_config(cls, config: Dict[str, Any]) -> "SandboxPool":
+		cfg = config.get("sandbox", {}) or {}
+		return cls(
+			cfg.get("workers", DEFAULT_WORKERS),
+			cfg.get("timeout_s", DEFAULT_TIMEOUT_S),
+			cfg.get("cpu_s", DEFAULT_CPU_S),
+			cfg.get("memory_mb", DEFAULT_MEMORY_MB),
+			cfg.get("preload", DEFAULT_PRELOAD),
+		)
+
+	def _fork(self) -> _Worker:
+		parent_conn, child_conn = self.ctx.Pipe()
+		process = self.ctx.Process(
+			target=_worker_main, args=(child_conn, self.cpu_s, self.memory_mb), name="saias-sandbox", daemon=True
+		)
+		process.start()
+		child_conn.close()
+		return _Worker(process, parent_conn)
+
+	def warm(self) -> None:
+		"""Fork workers up to the pool size (the first call also starts the forkserver and its preloads)."""
+		while True:
+			with self._lock:
+				if self._closed or len(self._idle) >= self.size:
+					return
+			try:
+				worker = self._fork()
+			except Exception as e:
+				log.warning("Could not fork sandbox worker: %s", e)
+				return
+			with self._lock:
+				if not self._closed:
+					self._idle.append(worker)
+					continue
+			worker.retire()
+			return
+
+	def warm_async(self) -> None:
+		thread = threading.Thread(target=self.warm, name="saias-sandbox-warm", daemon=True)
+		with self._lock:
+			self._warmers = [t for t in self._warmers if t.is_alive()]
+			self._warmers.append(thread)
+			thread.start()  # under the lock: close() never joins an unstarted thread
+
+	def _take(self) -> _Worker:
+		with self._lock:
+			while self._idle:
+				worker = self._idle.popleft()
+				if worker.process.is_alive():
+					return worker
+				worker.retire()
+			self.counts["cold"] += 1
+		return self._fork()
+
+	def run(self, path: str, mode: str = "run") -> SandboxResult:
+		"""Check one candidate in a fresh warm worker: mode "run" (as __main__) or "import"."""
+		with span("sandbox.run", mode=mode) as s:
+			start = time.perf_counter()
+			worker = self._take()
+			try:
+				worker.conn.send((os.path.abspath(path), mode, os.getcwd()))
+				if worker.conn.poll(self.timeout):
+					ok, error = worker.conn.recv()
+				else:
+					ok, error = False, f"timed out after {self.timeout:.0f}s"
+					self.counts["timeouts"] += 1
+			except (EOFError, OSError):
+				worker.process.join(1)
+				ok, error = False, f"sandbox worker died (exit code {worker.process.exitcode}; CPU or memory limit?)"
+			finally:
+				worker.retire()  # one candidate per worker: no state leaks into the next check
+				self.warm_async()
+			result = SandboxResult(ok, error, time.perf_counter() - start)
+			self.counts["runs"] += 1
+			self.counts["passed" if ok else "failed"] += 1
+			s.set(ok=ok)
+		return result
+
+	def close(self) -> None:
+		"""Retire idle workers; waits for in-flight warm-ups, whose new workers are retired too."""
+		with self._lock:
+			self._closed = True
+			idle, self._idle = list(self._idle), deque()
+			warmers, self._warmers = self._warmers, []
+		for worker in idle:
+			worker.retire()
+		for thread in warmers:
+			thread.join(self.timeout)
+
+
+_pool: Optional[SandboxPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_sandbox_pool() -> Optional[SandboxPool]:
+	"""The shared pool, started (and warming) on first use; None where unsupported or disabled."""
+	global _pool
+	if _pool is None:
+		with _pool_lock:
+			if _pool is None:
+				if "forkserver" not in multiprocessing.get_all_start_methods():
+					return None
+				from agent.tools.memory_store import read_json
+				from agent.tools.llm import CONFIG_PATH
+				config = read_json(CONFIG_PATH, default={}, copy_result=False) or {}
+				if not (config.get("sandbox", {}) or {}).get("pool", True):
+					return None
+				_pool = SandboxPool.from_config(config)
+				_pool.warm_async()
+				atexit.register(_pool.close)
+	return _pool
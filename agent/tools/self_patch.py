@@ -3,7 +3,9 @@ import sys
 import json
 import shutil
 import subprocess
+import threading
 import ast
+import importlib.machinery
 import importlib.util
 import difflib
 import logging
@@ -12,22 +14,24 @@ from pathlib import Path
 from agent.tools.llm import call_code_llm
 from agent.tools.llm import score_code_patch
 from agent.tools.llm import safe_code_llm
+from agent.tools.llm import llm_priority, load_config, PRIORITY_BACKGROUND
 from agent.tools.code_chunker import chunk_and_refactor_file, ChunkContext
 from agent.tools.backup import backup_file
 from agent.tools.auto_test import run_patch_tests
 from agent.tools.dependency_graph import DependencyGraph
 from agent.tools.rewards import log_reward
+from agent.tools.patch_journal import PatchJournal
+from agent.tools.sandbox_pool import get_sandbox_pool
+from agent.tools.memory_store import read_json, write_json
+from agent.tools.tracing import current_span, traced
+from agent.tools.log_setup import record_payload, setup_logging
 
 ROOT_DIR = Path(__file__).resolve().parents[1]
 BASE_DIR = Path(__file__).resolve().parent
 PATCH_DIR = ROOT_DIR / "memory" / "patch_notes"
 SKIPPED_LOG = PATCH_DIR / "skipped_patches.log"
 PATCH_DIR.mkdir(parents=True, exist_ok=True)
-
-logging.basicConfig(filename='saiasselfpatch_log.log', level=logging.DEBUG, 
-					format='%(asctime)s - %(levelname)s - %(message)s')
-
-logging.info("Your clear log message here.")
+_RUN_LOCK = threading.Lock()  # one run at a time per process (GUI, daemon and job scheduler share the journal)
 
 def apply_patch(file_path, patch_content):
 	backup_file(file_path)  # First backup the original file
@@ -59,7 +63,12 @@ def get_all_python_files(base_dir="."):
 				py_files.append(full_path)
 	return py_files
 
+@traced("sandbox.run")
 def test_patch(temp_path):
+	# Warm pre-forked interpreter (sandbox_pool) when available: no interpreter start-up or re-imports per candidate
+	pool = get_sandbox_pool()
+	if pool is not None:
+		return pool.run(temp_path).ok
 	try:
 		subprocess.run(["python", temp_path], check=True, timeout=10, capture_output=True)
 		return True
@@ -67,10 +76,11 @@ def test_patch(temp_path):
 		return False
 
 def log_skipped_patch(filename: str, reason: str):
-	print(f"[DEBUG] Skipped log path: {SKIPPED_LOG}")
+	logging.debug("Skipped log path: %s", SKIPPED_LOG)
 	with open(SKIPPED_LOG, "a", encoding="utf-8") as f:
 		f.write(f"{datetime.now().isoformat()} - {filename}: {reason}\n")
 
+@traced("patch.ast_diff")
 def is_meaningful_change(original: str, modified: str) -> bool:
 	"""
 	True only for substantive changes.
@@ -132,13 +142,21 @@ def is_meaningful_change(original: str, modified: str) -> bool:
 			return "\n".join(l for l in lines if l)
 		return _text_norm(original) != _text_norm(modified)
 
+@traced("sandbox.import")
 def safe_import_test(file_path):
+	# Isolated in a sandbox worker when available, instead of executing the module inside the agent
+	pool = get_sandbox_pool()
+	if pool is not None:
+		result = pool.run(file_path, mode="import")
+		if not result.ok:
+			print(f"[TEST ERROR] {file_path} → {result.error.strip().splitlines()[-1] if result.error.strip() else 'failed'}")
+		return result.ok
 	try:
-		spec = importlib.util.spec_from_file_location("test_module", file_path)
-		if spec is None or spec.loader is None:
-			return False
+		# explicit loader: the .temp suffix is not a recognised source suffix (as in sandbox_pool)
+		loader = importlib.machinery.SourceFileLoader("test_module", str(file_path))
+		spec = importlib.util.spec_from_file_location("test_module", file_path, loader=loader)
 		module = importlib.util.module_from_spec(spec)
-		spec.loader.exec_module(module)
+		loader.exec_module(module)
 		return True
 	except Exception as e:
 		print(f"[TEST ERROR] {file_path} → {e}")
@@ -148,10 +166,9 @@ def load_pending_patch_map():
 	patch_map = {}
 	for patch_file in PATCH_DIR.glob("PATCH_*.json"):
 		try:
-			with open(patch_file, "r", encoding="utf-8") as f:
-				data = json.load(f)
-				if not data.get("applied"):
-					patch_map[data["target_file"]] = True
+			data = read_json(patch_file, copy_result=False)
+			if data and not data.get("applied"):
+				patch_map[data["target_file"]] = True
 		except Exception:
 			continue
 	return patch_map
@@ -173,59 +190,106 @@ def _aggregate_chunk_score(chunk_metadata) -> float:
 			continue
 	return sum(scores) / len(scores) if scores else 0.0
 
-def run_self_patch():
+def run_self_patch(stop_event=None, resume=None):
+	"""
+	`stop_event` (threading.Event): when set, the run stops before the next file.
+	`resume`: continue an interrupted run from its journal (default self_patch.resume, on).
+	"""
+	if not _RUN_LOCK.acquire(blocking=False):
+		print("[WARN] A self-patch run is already in progress; not starting another.")
+		return 0
+	try:
+		# Self-patching is background work: interactive chat is scheduled ahead of it
+		with llm_priority(PRIORITY_BACKGROUND):
+			return _run_self_patch(stop_event, resume)
+	finally:
+		_RUN_LOCK.release()
+
+@traced("self_patch.run")
+def _run_self_patch(stop_event=None, resume=None):
 	patches_created = 0
 	pending_patch_map = load_pending_patch_map()
 
-	# Build debug dump dir once
-	debug_dump_dir = ROOT_DIR / "memory" / "debug_code_dump"
-	debug_dump_dir.mkdir(parents=True, exist_ok=True)
+	try:
+		settings = load_config().get("self_patch", {}) or {}
+	except Exception:
+		settings = {}
+	# Per-file source snapshots on disk only when asked for (self_patch.debug_dump);
+	# otherwise the original is kept in the in-memory payload ring for error dumps
+	debug_dump = bool(settings.get("debug_dump", False))
+	chunk_retries = int(settings.get("chunk_retries", 1))
+	get_sandbox_pool()  # start forking warm sandbox workers while the first files are being refactored
+	journal = PatchJournal.open(resume=settings.get("resume", True) if resume is None else resume)
+	try:
+		patches_created, stopped = _patch_files(journal, pending_patch_map, debug_dump, chunk_retries, stop_event)
+		if not stopped:
+			journal.finish(patches=patches_created)
+	finally:
+		journal.close()  # without finish() (stopped, crashed), the next run resumes from this journal
+	current_span().set(patches=patches_created, resumed=journal.resumed)
+	return patches_created
+
+def _patch_files(journal, pending_patch_map, debug_dump, chunk_retries, stop_event):
+	"""Patch every project file not settled yet in this run; returns (patches created, stopped early)."""
+	patches_created = 0
+	debug_dump_dir = None
+	if debug_dump:
+		debug_dump_dir = ROOT_DIR / "memory" / "debug_code_dump"
+		debug_dump_dir.mkdir(parents=True, exist_ok=True)
 
 	# [OK] Single loop — no redundancy
 	for file_path in get_all_python_files():
+		if stop_event is not None and stop_event.is_set():
+			print("[INFO] Self-patch run stopped on request.")
+			return patches_created, True
 		file_path = Path(file_path)  # Ensure it's a Path object
 
 		# 1. Read original code once
 		try:
 			with open(file_path, "r", encoding="utf-8") as f:
-				original_code = f.read()
-				graph = DependencyGraph()
-				graph.build()
-
-				rel_path = os.path.relpath(file_path, ROOT_DIR)
-				dependents = graph.get_dependents(rel_path)
-				if dependents:
-					print(f"[⚠️] {file_path} is used by: {', '.join(dependents)}")
-					warning_comment = (
-						f"# WARNING: This file is imported by:\n"
-						f"# {', '.join([f'  - {d}' for d in dependents])}\n"
-						f"# Do NOT change public function signatures or break compatibility.\n"
-						f"# If you modify any exported functions, ensure backward compatibility.\n\n"
-					)
-					original_code = warning_comment + original_code
+				source = original_code = f.read()
+			# Settled earlier in this (resumed) run and unchanged since
+			done = journal.file_outcome(file_path, source)
+			if done is not None:
+				print(f"[RESUME] {file_path}: {done.get('outcome')} earlier in this run")
+				continue
+			graph = DependencyGraph()
+			graph.build()
+
+			rel_path = os.path.relpath(file_path, ROOT_DIR)
+			dependents = graph.get_dependents(rel_path)
+			if dependents:
+				print(f"[⚠️] {file_path} is used by: {', '.join(dependents)}")
+				warning_comment = (
+					f"# WARNING: This file is imported by:\n"
+					f"# {', '.join([f'  - {d}' for d in dependents])}\n"
+					f"# Do NOT change public function signatures or break compatibility.\n"
+					f"# If you modify any exported functions, ensure backward compatibility.\n\n"
+				)
+				original_code = warning_comment + original_code
 		except Exception as e:
 			logging.error(f"Failed to read {file_path}: {e}")
 			continue
 
 		# 2. Save debug dump (optional: only if needed)
-		debug_file_path = debug_dump_dir / f"{file_path.stem}.txt"
-		with open(debug_file_path, "w", encoding="utf-8") as debug_out:
-			debug_out.write(original_code)
+		record_payload("self_patch_source", file=str(file_path), code=original_code)
+		if debug_dump_dir is not None:
+			with open(debug_dump_dir / f"{file_path.stem}.txt", "w", encoding="utf-8") as debug_out:
+				debug_out.write(original_code)
 
 		# 3. Skip if already pending
 		if pending_patch_map.get(str(file_path)):
 			log_skipped_patch(str(file_path), "Already patched")
 			continue
 
-		# 4. Attempt refactoring (with one retry if empty)
-		refactored_code, chunk_metadata = chunk_and_refactor_file(str(file_path))
-		if not refactored_code:
-			# simple nudge retry — same call, models often succeed on 2nd try
-			refactored_code, chunk_metadata = chunk_and_refactor_file(str(file_path))
+		# 4. Attempt refactoring: failed chunks are retried (models often succeed on the 2nd try);
+		# chunks checkpointed in the journal are reused
+		refactored_code, chunk_metadata = chunk_and_refactor_file(str(file_path), journal, retries=chunk_retries)
 		if not refactored_code:
 			print(f"[SKIP] LLM returned no code for {file_path}")
 			log_skipped_patch(str(file_path), "LLM returned empty or invalid code")
 			log_reward("skipped", reason="empty_or_invalid_code", file=str(file_path))
+			journal.record_file(file_path, source, "skipped", reason="empty_or_invalid_code")
 			continue
 
 		# 5. Score the refactor (prefer chunk scores; fall back to LLM score)
@@ -239,6 +303,7 @@ def run_self_patch():
 			print(f"[SKIP] Refactor score too low ({refactor_score:.1f}/10) for {file_path}")
 			log_skipped_patch(str(file_path), f"Refactor score too low ({refactor_score:.1f}/10)")
 			log_reward("skipped", reason="low_score", score=float(refactor_score), file=str(file_path))
+			journal.record_file(file_path, source, "skipped", reason="low_score", score=float(refactor_score))
 			continue
 
 		# 6. Check for meaningful change (AST gate)
@@ -246,6 +311,7 @@ def run_self_patch():
 			print(f"[SKIP] No meaningful changes detected (AST-equivalent) in {file_path}")
 			log_skipped_patch(str(file_path), "ast_equivalent_or_cosmetic")
 			log_reward("skipped", reason="ast_equivalent_or_cosmetic", file=str(file_path))
+			journal.record_file(file_path, source, "skipped", reason="ast_equivalent_or_cosmetic")
 			continue
 
 		# 7. Test in sandbox
@@ -283,8 +349,7 @@ def run_self_patch():
 
 			# Save patch
 			patch_file = PATCH_DIR / f"{patch_id}.json"
-			with open(patch_file, "w", encoding="utf-8") as f:
-				json.dump(patch_info, f, indent=2)
+			write_json(patch_file, patch_info)
 
 			# credit SAIAS for generating a non-cosmetic patch
 			# (use fields from patch_info so names can drift without breaking)
@@ -297,6 +362,10 @@ def run_self_patch():
 				score=float(patch_info.get("refactor_score", 0)),
 				chunk_avg=float(chunk_avg),
 			)
+			patches_created += 1
+			journal.record_file(file_path, source, "patch", patch_id=patch_id)
+		else:
+			journal.record_file(file_path, source, "skipped", reason="sandbox_failed")
 
 		# 9. Clean up temp file
 		try:
@@ -304,8 +373,9 @@ def run_self_patch():
 		except:
 			pass
 
-	return patches_created
+	return patches_created, False
 
 if __name__ == "__main__":
-	count = run_self_patch()
+	setup_logging("self_patch")
+	count = run_self_patch(resume=False if "--fresh" in sys.argv[1:] else None)
 	print(f"[OK] {count} patch(es) generated.")
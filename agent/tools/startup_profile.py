@@ -0,0 +1,117 @@
+# agent/tools/startup_profile.py
+import builtins
+import contextlib
+import logging
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class StartupProfiler:
+	"""
+	Opt-in cold-start profiler (run.py --profile-startup).
+	Records named phases, one-off marks (e.g. first paint) and per-import timings
+	by wrapping builtins.__import__. When disabled every call is a cheap no-op.
+	"""
+
+	def __init__(self):
+		self.enabled = False
+		self.t0 = time.perf_counter()
+		self.phases: List[Tuple[str, float, float]] = []  # (name, start offset, duration)
+		self.marks: List[Tuple[str, float]] = []  # (name, offset)
+		self.imports: Dict[str, List[float]] = {}  # module → [cumulative, self]
+		self._lock = threading.Lock()
+		self._local = threading.local()
+		self._orig_import = None
+
+	def enable(self):
+		if self.enabled:
+			return
+		self.enabled = True
+		self.t0 = time.perf_counter()
+		self._install_import_hook()
+
+	def disable(self):
+		self.enabled = False
+		if self._orig_import is not None:
+			builtins.__import__ = self._orig_import
+			self._orig_import = None
+
+	def elapsed(self) -> float:
+		return time.perf_counter() - self.t0
+
+	@contextlib.contextmanager
+	def phase(self, name: str):
+		if not self.enabled:
+			yield
+			return
+		start = time.perf_counter()
+		try:
+			yield
+		finally:
+			end = time.perf_counter()
+			with self._lock:
+				self.phases.append((name, start - self.t0, end - start))
+
+	def mark(self, name: str):
+		if self.enabled:
+			with self._lock:
+				self.marks.append((name, self.elapsed()))
+
+	def _install_import_hook(self):
+		orig = builtins.__import__
+		self._orig_import = orig
+		profiler = self
+
+		def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+			# Only first-time absolute imports are interesting; everything else is a dict lookup
+			if level or name in sys.modules or not profiler.enabled:
+				return orig(name, globals, locals, fromlist, level)
+			stack = getattr(profiler._local, "stack", None)
+			if stack is None:
+				stack = profiler._local.stack = []
+			stack.append(0.0)  # time spent in nested imports
+			start = time.perf_counter()
+			try:
+				return orig(name, globals, locals, fromlist, level)
+			finally:
+				cumulative = time.perf_counter() - start
+				nested = stack.pop()
+				if stack:
+					stack[-1] += cumulative
+				with profiler._lock:
+					entry = profiler.imports.setdefault(name, [0.0, 0.0])
+					entry[0] += cumulative
+					entry[1] += cumulative - nested
+
+		builtins.__import__ = timed_import
+
+	def report(self, top_imports: int = 15) -> str:
+		with self._lock:
+			phases = list(self.phases)
+			marks = list(self.marks)
+			imports = sorted(self.imports.items(), key=lambda kv: kv[1][0], reverse=True)
+		lines = ["[PROFILE] Startup report"]
+		lines.append("  Phases (start → duration):")
+		for name, start, dur in phases:
+			lines.append(f"    {start * 1000:8.1f} ms  {dur * 1000:8.1f} ms  {name}")
+		if marks:
+			lines.append("  Marks:")
+			for name, offset in marks:
+				lines.append(f"    {offset * 1000:8.1f} ms  {name}")
+		if imports:
+			lines.append(f"  Slowest imports (cumulative / self, top {top_imports}):")
+			for name, (cum, own) in imports[:top_imports]:
+				lines.append(f"    {cum * 1000:8.1f} ms  {own * 1000:8.1f} ms  {name}")
+		return "\n".join(lines)
+
+	def emit_report(self, header: Optional[str] = None):
+		text = self.report()
+		if header:
+			text = f"{header}\n{text}"
+		print(text, flush=True)
+		logging.info(text)
+
+
+PROFILER = StartupProfiler()
@@ -0,0 +1,279 @@
+# agent/tools/tracing.py
+"""
+Lightweight span tracing.
+
+	from agent.tools.tracing import current_span, span, traced
+
+	with span("chunk.refactor", name=chunk.name) as s:
+		...
+		s.set(score=score)
+
+	@traced("route")
+	def route(user_input):
+		current_span().set(chars=len(user_input))
+
+Spans nest per thread/context (children's time is subtracted from the parent's
+self time). Finished spans go to a bounded buffer that can be exported as Chrome
+trace-event JSON (chrome://tracing, https://ui.perfetto.dev), and per-name
+aggregates (count, total, self, max, errors) are kept for the whole run.
+Tracing is off by default: span() then returns a shared no-op object and
+traced() calls straight through. Enable it with run.py --trace FILE, the
+SAIAS_TRACE=FILE environment variable, or TRACER.enable().
+"""
+import atexit
+import contextvars
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+TRACE_ENV = "SAIAS_TRACE"  # path to write a Chrome trace to at exit
+DEFAULT_MAX_EVENTS = 200_000  # buffered spans kept for export (oldest dropped first)
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("trace_span", default=None)
+
+
+class _NullSpan:
+	"""Returned by span() while tracing is disabled."""
+	__slots__ = ()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		return False
+
+	def set(self, **attrs) -> None:
+		pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Span:
+	__slots__ = ("tracer", "name", "attrs", "start_ns", "child_ns", "parent", "tid", "_token")
+
+	def __init__(self, tracer: "Tracer", name: str, attrs: Dict[str, Any]):
+		self.tracer = tracer
+		self.name = name
+		self.attrs = attrs
+		self.start_ns = 0
+		self.child_ns = 0
+		self.parent: Optional["Span"] = None
+		self.tid = 0
+		self._token = None
+
+	def set(self, **attrs) -> None:
+		"""Attach attributes (shown as args in the trace viewer)."""
+		self.attrs.update(attrs)
+
+	def __enter__(self) -> "Span":
+		self.parent = _current_span.get()
+		self.tid = threading.get_ident()
+		self._token = _current_span.set(self)
+		self.tracer.active[self.tid] = self
+		self.start_ns = time.perf_counter_ns()
+		return self
+
+	def __exit__(self, exc_type, exc, tb) -> bool:
+		dur = time.perf_counter_ns() - self.start_ns
+		try:
+			_current_span.reset(self._token)
+		except ValueError:
+			_current_span.set(self.parent)  # exited from another context (e.g. a generator resumed elsewhere)
+		if self.parent is not None and self.parent.tid == self.tid:
+			self.parent.child_ns += dur  # children on worker threads (copied contexts) overlap the parent instead
+			self.tracer.active[self.tid] = self.parent
+		else:
+			self.tracer.active.pop(self.tid, None)
+		if exc_type is not None:
+			self.attrs["error"] = exc_type.__name__
+		self.tracer._record(self.name, self.start_ns, dur, dur - self.child_ns, self.attrs, exc_type is not None)
+		return False
+
+
+class Tracer:
+	def __init__(self, max_events: int = DEFAULT_MAX_EVENTS):
+		self.enabled = False
+		self.export_path: Optional[str] = None
+		self.t0_ns = time.perf_counter_ns()
+		self.events: deque = deque(maxlen=max_events)  # (name, start_ns, dur_ns, tid, attrs)
+		self.aggregates: Dict[str, List[float]] = {}  # name → [count, total_ns, self_ns, max_ns, errors]
+		self.threads: Dict[int, str] = {}
+		self.active: Dict[int, Span] = {}  # thread id → innermost open span (read by the UI stall watchdog)
+		self.dropped = 0
+		self._lock = threading.Lock()
+		self._atexit = False
+
+	def enable(self, export_path: Optional[str] = None) -> None:
+		"""Start recording; with export_path the Chrome trace is written there at exit."""
+		if export_path:
+			self.export_path = export_path
+			if not self._atexit:
+				atexit.register(self._export_at_exit)
+				self._atexit = True
+		if not self.enabled:
+			self.t0_ns = time.perf_counter_ns()
+			self.enabled = True
+
+	def disable(self) -> None:
+		self.enabled = False
+
+	def reset(self) -> None:
+		with self._lock:
+			self.events.clear()
+			self.aggregates.clear()
+			self.threads.clear()
+			self.dropped = 0
+		self.t0_ns = time.perf_counter_ns()
+
+	# --- recording ---
+	def span(self, name: str, **attrs):
+		"""Context manager timing the enclosed block (a no-op object when disabled)."""
+		if not self.enabled:
+			return NULL_SPAN
+		return Span(self, name, attrs)
+
+	def active_span(self, thread_id: int) -> Optional[str]:
+		"""Name of the innermost open span on another thread, e.g. the UI thread while it is stalled."""
+		span = self.active.get(thread_id)
+		return span.name if span is not None else None
+
+	def add(self, name: str, start_ns: int, dur_ns: int, **attrs) -> None:
+		"""
+		Record an already-measured span. For work that spans generator yields
+		(streamed replies), where a context-manager span would nest wrongly.
+		"""
+		if self.enabled:
+			self._record(name, start_ns, dur_ns, dur_ns, attrs, "error" in attrs)
+
+	def _record(self, name: str, start_ns: int, dur_ns: int, self_ns: int, attrs: Dict[str, Any], failed: bool) -> None:
+		thread = threading.current_thread()
+		with self._lock:
+			if len(self.events) == self.events.maxlen:
+				self.dropped += 1
+			self.events.append((name, start_ns, dur_ns, thread.ident, attrs))
+			self.threads.setdefault(thread.ident, thread.name)
+			agg = self.aggregates.get(name)
+			if agg is None:
+				agg = self.aggregates[name] = [0, 0, 0, 0, 0]
+			agg[0] += 1
+			agg[1] += dur_ns
+			agg[2] += self_ns
+			agg[3] = max(agg[3], dur_ns)
+			agg[4] += int(failed)
+
+	# --- reporting ---
+	def stats(self) -> Dict[str, Dict[str, Any]]:
+		"""Per-span-name aggregates, slowest total first."""
+		with self._lock:
+			items = [(name, list(agg)) for name, agg in self.aggregates.items()]
+		items.sort(key=lambda kv: kv[1][1], reverse=True)
+		return {
+			name: {
+				"count": int(count),
+				"total_ms": round(total / 1e6, 3),
+				"self_ms": round(own / 1e6, 3),
+				"mean_ms": round(total / count / 1e6, 3) if count else 0.0,
+				"max_ms": round(peak / 1e6, 3),
+				"errors": int(errors),
+			}
+			for name, (count, total, own, peak, errors) in items
+		}
+
+	def format_stats(self, top: int = 25) -> str:
+		stats = list(self.stats().items())[:top]
+		lines = [f"[TRACE] {'span':<32}{'count':>7}{'total ms':>12}{'self ms':>12}{'mean ms':>10}{'max ms':>10}{'err':>5}"]
+		for name, s in stats:
+			lines.append(
+				f"[TRACE] {name:<32}{s['count']:>7}{s['total_ms']:>12.1f}{s['self_ms']:>12.1f}"
+				f"{s['mean_ms']:>10.1f}{s['max_ms']:>10.1f}{s['errors']:>5}"
+			)
+		return "\n".join(lines)
+
+	def chrome_trace(self) -> Dict[str, Any]:
+		"""Trace-event JSON ("X" complete events plus thread names)."""
+		pid = os.getpid()
+		with self._lock:
+			events = list(self.events)
+			threads = dict(self.threads)
+			dropped = self.dropped
+		trace: List[Dict[str, Any]] = [
+			{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": tname}}
+			for tid, tname in threads.items()
+		]
+		for name, start_ns, dur_ns, tid, attrs in events:
+			trace.append({
+				"name": name, "cat": name.split(".", 1)[0], "ph": "X", "pid": pid, "tid": tid,
+				"ts": (start_ns - self.t0_ns) / 1000, "dur": dur_ns / 1000,
+				"args": {k: _jsonable(v) for k, v in attrs.items()},
+			})
+		return {"traceEvents": trace, "displayTimeUnit": "ms", "otherData": {"dropped_spans": dropped}}
+
+	def export_chrome(self, path: str) -> str:
+		with open(path, "w", encoding="utf-8") as f:
+			json.dump(self.chrome_trace(), f)
+		return path
+
+	def _export_at_exit(self) -> None:
+		if not self.export_path or not self.aggregates:
+			return
+		try:
+			self.export_chrome(self.export_path)
+			print(self.format_stats())
+			print(f"[TRACE] Wrote {len(self.events)} spans to {self.export_path}")
+		except OSError as e:
+			print(f"[WARN] Could not write trace to {self.export_path}: {e}")
+
+
+def _jsonable(value: Any) -> Any:
+	if value is None or isinstance(value, (bool, int, float, str)):
+		return value
+	return str(value)
+
+
+TRACER = Tracer()
+span = TRACER.span
+
+
+def traced(name: Optional[str] = None, **attrs) -> Callable[[Callable], Callable]:
+	"""Decorator: run the function (or coroutine function) inside a span (named after it by default)."""
+	def decorate(fn: Callable) -> Callable:
+		span_name = name or fn.__qualname__
+
+		if inspect.iscoroutinefunction(fn):
+			@functools.wraps(fn)
+			async def async_wrapper(*args, **kwargs):
+				if not TRACER.enabled:
+					return await fn(*args, **kwargs)
+				with Span(TRACER, span_name, dict(attrs)):
+					return await fn(*args, **kwargs)
+			return async_wrapper
+
+		@functools.wraps(fn)
+		def wrapper(*args, **kwargs):
+			if not TRACER.enabled:
+				return fn(*args, **kwargs)
+			with Span(TRACER, span_name, dict(attrs)):
+				return fn(*args, **kwargs)
+		return wrapper
+	return decorate
+
+
+def current_span():
+	"""The innermost open span in this context (the no-op span when none / disabled)."""
+	if not TRACER.enabled:
+		return NULL_SPAN
+	return _current_span.get() or NULL_SPAN
+
+
+def trace_stats() -> Dict[str, Dict[str, Any]]:
+	return TRACER.stats()
+
+
+if os.environ.get(TRACE_ENV):
+	TRACER.enable(os.environ[TRACE_ENV])
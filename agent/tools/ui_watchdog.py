@@ -0,0 +1,154 @@
+# agent/tools/ui_watchdog.py
+"""
+UI-thread stall detection.
+
+The GUI calls StallWatchdog.beat() from a QTimer on the UI thread every
+`interval_ms`. Late beats are event-loop latency (timer drift). A monitor
+thread notices when beats stop and samples what the UI thread is doing (the
+innermost agent frame, plus the active tracing span when tracing is on). When
+the loop comes back, every stall over `threshold_ms` is logged with that
+location and counted in stats().
+
+Kept free of Qt imports so it can be driven (and reused) without a GUI.
+"""
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional
+
+from agent.tools.tracing import TRACER
+
+log = logging.getLogger(__name__)
+
+PROJECT_DIR = str(Path(__file__).resolve().parents[2])
+DEFAULT_INTERVAL_MS = 50
+DEFAULT_THRESHOLD_MS = 200
+RECENT_STALLS = 20
+LATENCY_SAMPLES = 600  # ~30 s of beats at the default interval
+
+
+@dataclass
+class Stall:
+	started: float  # wall-clock time the loop stopped responding
+	duration_ms: float
+	where: str  # most-sampled location on the UI thread
+	span: Optional[str] = None
+	stack: List[str] = field(default_factory=list)
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+	if not sorted_values:
+		return 0.0
+	return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+class StallWatchdog:
+	def __init__(self, interval_ms: int = DEFAULT_INTERVAL_MS, threshold_ms: int = DEFAULT_THRESHOLD_MS,
+			thread_id: Optional[int] = None):
+		self.interval = interval_ms / 1000.0
+		self.threshold = threshold_ms / 1000.0
+		self.thread_id = thread_id or threading.get_ident()  # construct on the UI thread
+		self.stalls: Deque[Stall] = deque(maxlen=RECENT_STALLS)
+		self.count = 0
+		self.total_ms = 0.0
+		self.max_ms = 0.0
+		self._latencies: Deque[float] = deque(maxlen=LATENCY_SAMPLES)  # ms late per beat
+		self._last_beat = time.perf_counter()
+		self._samples: Counter = Counter()  # location → times seen during the current stall
+		self._sample_stack: List[str] = []
+		self._sample_span: Optional[str] = None
+		self._lock = threading.Lock()
+		self._stop = threading.Event()
+		self._thread: Optional[threading.Thread] = None
+
+	@classmethod
+	def from_config(cls, config: Dict[str, Any]) -> "StallWatchdog":
+		cfg = config.get("gui", {}).get("watchdog", {}) or {}
+		return cls(int(cfg.get("interval_ms", DEFAULT_INTERVAL_MS)), int(cfg.get("threshold_ms", DEFAULT_THRESHOLD_MS)))
+
+	# --- lifecycle ---
+	def start(self) -> "StallWatchdog":
+		self._last_beat = time.perf_counter()
+		self._thread = threading.Thread(target=self._monitor, name="saias-ui-watchdog", daemon=True)
+		self._thread.start()
+		return self
+
+	def stop(self) -> None:
+		self._stop.set()
+
+	# --- UI thread ---
+	def beat(self) -> Optional[Stall]:
+		"""Call from the UI-thread timer; returns the stall that just ended, if any."""
+		now = time.perf_counter()
+		with self._lock:
+			gap = now - self._last_beat
+			self._last_beat = now
+			late = max(0.0, gap - self.interval)
+			self._latencies.append(late * 1000)
+			samples, stack, span = self._samples, self._sample_stack, self._sample_span
+			self._samples, self._sample_stack, self._sample_span = Counter(), [], None
+		if late < self.threshold:
+			return None
+		where = samples.most_common(1)[0][0] if samples else "unknown (not sampled)"
+		stall = Stall(time.time() - gap, round(late * 1000, 1), where, span, stack)
+		with self._lock:
+			self.stalls.append(stall)
+			self.count += 1
+			self.total_ms += stall.duration_ms
+			self.max_ms = max(self.max_ms, stall.duration_ms)
+		log.warning("UI stall: event loop blocked %.0f ms in %s%s", stall.duration_ms, where,
+			f" (span {span})" if span else "")
+		return stall
+
+	# --- monitor thread ---
+	def _monitor(self) -> None:
+		poll = max(0.01, self.threshold / 4)
+		while not self._stop.wait(poll):
+			with self._lock:
+				overdue = time.perf_counter() - self._last_beat - self.interval
+			if overdue >= self.threshold / 2:
+				self._sample()
+
+	def _sample(self) -> None:
+		frame = sys._current_frames().get(self.thread_id)
+		if frame is None:
+			return
+		stack = traceback.extract_stack(frame)
+		where = _locate(stack)
+		span = TRACER.active_span(self.thread_id) if TRACER.enabled else None
+		with self._lock:
+			self._samples[where] += 1
+			if not self._sample_stack:  # first sample: closest to where the stall began
+				self._sample_stack = [f"{Path(f.filename).name}:{f.lineno} {f.name}" for f in stack[-8:]]
+			if span and not self._sample_span:
+				self._sample_span = span
+
+	# --- reporting ---
+	def stats(self) -> Dict[str, Any]:
+		with self._lock:
+			latencies = sorted(self._latencies)
+			recent = list(self.stalls)[-5:]
+			count, total, peak = self.count, self.total_ms, self.max_ms
+		return {
+			"stalls": count,
+			"stall_ms_total": round(total, 1),
+			"stall_ms_max": round(peak, 1),
+			"loop_latency_ms": {"p50": round(_percentile(latencies, 50), 1), "p99": round(_percentile(latencies, 99), 1)},
+			"recent": [{"ms": s.duration_ms, "where": s.where, "span": s.span} for s in recent],
+		}
+
+
+def _locate(stack: traceback.StackSummary) -> str:
+	"""Innermost frame in this project's code (else the innermost frame)."""
+	for frame in reversed(stack):
+		if frame.filename.startswith(PROJECT_DIR) and not frame.filename.endswith("ui_watchdog.py"):
+			return f"{frame.name} ({Path(frame.filename).name}:{frame.lineno})"
+	if stack:
+		frame = stack[-1]
+		return f"{frame.name} ({Path(frame.filename).name}:{frame.lineno})"
+	return "unknown"
@@ -0,0 +1,354 @@
+# agent/tools/vector_memory.py
+import hashlib
+import json
+import math
+import os
+import re
+import tempfile
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+	import numpy as np
+except ImportError:  # optional dependency: without it chat falls back to the static context
+	np = None
+
+from agent.tools.capability_index import get_capability_index, tokenize
+from agent.tools.chat_memory import CHAT_LOG, load_entries
+from agent.tools.memory_store import read_text, store
+from agent.tools.tracing import traced
+
+MEMORY_DIR = Path(__file__).resolve().parents[1] / "memory"
+CONTEXT_PATH = MEMORY_DIR / "context.md"
+INDEX_PATH = MEMORY_DIR / "vector_index.npz"
+
+# Defaults for the "retrieval" section of config.json
+DEFAULT_DIM = 2048
+DEFAULT_TOP_K = 5
+DEFAULT_TOKEN_BUDGET = 350
+DEFAULT_MIN_SCORE = 0.08
+CHAT_CLIP = 600
+SECTION_CHARS = 800
+EMBED_BATCH = 64
+# Question words carry no topic; capability_index's stopwords cover the rest
+_EXTRA_STOPWORDS = {
+	"what", "which", "how", "who", "where", "when", "why", "am", "was", "were", "does", "did",
+	"have", "has", "we", "our", "about", "there", "any", "some", "all", "tell", "know",
+}
+
+
+@dataclass
+class Snippet:
+	"""One retrievable piece of memory"""
+	id: str  # "context:<n>", "cap:<name>", "chat:<seq>"
+	source: str  # context | capability | tool | chat
+	text: str
+	score: float = 0.0
+
+
+def retrieval_config() -> Dict:
+	try:
+		from agent.tools.llm import _config_view
+		return _config_view().get("retrieval", {}) or {}
+	except Exception:
+		return {}
+
+
+def retrieval_available() -> bool:
+	return np is not None and bool(retrieval_config().get("enabled", True))
+
+
+# --- embedders ---
+class HashedEmbedder:
+	"""
+	Offline fallback: signed feature hashing of stemmed unigrams and bigrams,
+	log-scaled term frequency, L2-normalized. No model, microseconds per text.
+	"""
+
+	uses_idf = True  # raw term features: weight by corpus rarity at query time
+	persist = False  # re-embedding is cheaper than rewriting the saved index on every chat turn
+
+	def __init__(self, dim: int = DEFAULT_DIM):
+		self.dim = dim
+		self.name = f"hashed:{dim}"
+
+	def embed(self, texts: List[str]) -> "np.ndarray":
+		out = np.zeros((len(texts), self.dim), dtype=np.float32)
+		for row, text in enumerate(texts):
+			tokens = [t for t in tokenize(text) if t not in _EXTRA_STOPWORDS]
+			features = Counter(tokens)
+			features.update(f"{a}_{b}" for a, b in zip(tokens, tokens[1:]))
+			for feature, tf in features.items():
+				h = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+				sign = 1.0 if (h >> 63) & 1 else -1.0
+				out[row, h % self.dim] += sign * (1.0 + math.log(tf))
+		norms = np.linalg.norm(out, axis=1, keepdims=True)
+		norms[norms == 0] = 1.0
+		return out / norms
+
+
+class BackendEmbedder:
+	"""Embeddings from the LLM endpoints (Ollama /api/embed or OpenAI-compatible /v1/embeddings)."""
+
+	uses_idf = False
+	persist = True  # one model call per snippet: keep embeddings across restarts
+
+	def __init__(self, model: str):
+		self.model = model
+		self.name = f"backend:{model}"
+
+	def embed(self, texts: List[str]) -> "np.ndarray":
+		from agent.tools.llm_endpoints import get_endpoint_pool
+		pool = get_endpoint_pool()
+		rows: List[List[float]] = []
+		for i in range(0, len(texts), EMBED_BATCH):
+			batch = texts[i:i + EMBED_BATCH]
+			rows.extend(pool.request(self.model, lambda ep: ep.backend.embed(ep.url, self.model, batch)))
+		matrix = np.asarray(rows, dtype=np.float32)
+		norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+		norms[norms == 0] = 1.0
+		return matrix / norms
+
+
+def make_embedder(config: Optional[Dict] = None):
+	cfg = retrieval_config() if config is None else config
+	if cfg.get("embedder", "hashed") in ("ollama", "backend") and cfg.get("embed_model"):
+		return BackendEmbedder(cfg["embed_model"])
+	return HashedEmbedder(int(cfg.get("dim", DEFAULT_DIM)))
+
+
+# --- sources ---
+def _context_sections(text: str, max_chars: int = SECTION_CHARS) -> List[str]:
+	"""context.md split into blank-line separated blocks (a heading and its bullets), long blocks split by lines."""
+	sections = []
+	for block in re.split(r"\n\s*\n", text):
+		current: List[str] = []
+		for line in block.strip().splitlines():
+			if current and sum(len(l) + 1 for l in current) + len(line) > max_chars:
+				sections.append("\n".join(current))
+				current = [current[0]] if not current[0].lstrip().startswith(("-", "*")) else []
+			current.append(line)
+		if current:
+			sections.append("\n".join(current))
+	return [s for s in sections if len(tokenize(s)) >= 3]
+
+
+def _content_hash(text: str) -> str:
+	return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+class VectorIndex:
+	"""
+	Dense index over context.md sections, capability/tool descriptions and chat
+	messages. Rows are embedded once and kept in a float32 matrix; refresh()
+	re-embeds only new or changed snippets and drops removed ones. Model-backed
+	embeddings are persisted to vector_index.npz so they survive restarts; hashed
+	ones are cheaper to recompute than to save.
+	"""
+
+	def __init__(self, path: Path = INDEX_PATH, embedder=None):
+		self.path = Path(path)
+		self.embedder = embedder or make_embedder()
+		self._lock = threading.Lock()
+		self._sources_key: Optional[Tuple] = None
+		self.snippets: List[Snippet] = []
+		self.hashes: List[str] = []
+		self.matrix = None
+		self._idf = None
+		self._weighted = None  # matrix scaled by idf and re-normalized (hashed embeddings)
+		self._load()
+		self._reweight()
+
+	# --- persistence ---
+	def _load(self) -> None:
+		try:
+			with np.load(self.path, allow_pickle=False) as data:
+				meta = json.loads(str(data["meta"]))
+				matrix = data["matrix"]
+		except Exception:
+			return
+		if meta.get("embedder") != self.embedder.name or len(meta.get("ids", [])) != len(matrix):
+			return
+		self.snippets = [Snippet(i, s, t) for i, s, t in zip(meta["ids"], meta["sources"], meta["texts"])]
+		self.hashes = meta["hashes"]
+		self.matrix = matrix.astype(np.float32, copy=False)
+
+	def _save(self) -> None:
+		meta = {
+			"embedder": self.embedder.name,
+			"ids": [s.id for s in self.snippets],
+			"sources": [s.source for s in self.snippets],
+			"texts": [s.text for s in self.snippets],
+			"hashes": self.hashes,
+		}
+		self.path.parent.mkdir(parents=True, exist_ok=True)
+		fd, tmp = tempfile.mkstemp(prefix=".tmp_", suffix=".npz", dir=str(self.path.parent))
+		try:
+			with os.fdopen(fd, "wb") as f:
+				np.savez(f, matrix=self._matrix_or_empty(), meta=np.array(json.dumps(meta)))
+			os.replace(tmp, self.path)
+		except OSError as e:
+			print(f"[WARN] Could not save vector index: {e}")
+			try:
+				os.remove(tmp)
+			except OSError:
+				pass
+
+	def _matrix_or_empty(self):
+		if self.matrix is None:
+			dim = getattr(self.embedder, "dim", 0)
+			return np.zeros((0, dim), dtype=np.float32)
+		return self.matrix
+
+	def _reweight(self) -> None:
+		"""Recompute idf weights; called whenever the matrix changes."""
+		if self.matrix is None or not getattr(self.embedder, "uses_idf", False):
+			self._idf, self._weighted = None, self.matrix
+			return
+		n = len(self.matrix)
+		df = np.count_nonzero(self.matrix, axis=0)
+		self._idf = (np.log((n + 1) / (df + 1)) + 1.0).astype(np.float32)
+		weighted = self.matrix * self._idf
+		norms = np.linalg.norm(weighted, axis=1, keepdims=True)
+		norms[norms == 0] = 1.0
+		self._weighted = weighted / norms
+
+	# --- updates ---
+	def _collect(self) -> List[Snippet]:
+		snippets = [
+			Snippet(f"context:{i}", "context", section)
+			for i, section in enumerate(_context_sections(read_text(CONTEXT_PATH)))
+		]
+		for cap in get_capability_index().documents():
+			if cap.name.split(":")[-1].startswith("_"):
+				continue  # private helpers are noise in chat context
+			label = cap.name.split(":")[-1].split(".")[-1].replace("_", " ")
+			text = f"{cap.name} ({label}): {cap.description}" if cap.description else f"{cap.name} ({label})"
+			snippets.append(Snippet(f"cap:{cap.name}", "tool" if cap.source == "tool" else "capability", text))
+		for entry in load_entries():
+			speaker = "User" if entry["role"] == "user" else "SAIAS"
+			content = entry["content"].strip()
+			if len(content) > CHAT_CLIP:
+				content = content[:CHAT_CLIP] + "…"
+			snippets.append(Snippet(f"chat:{entry['seq']}", "chat", f"{speaker}: {content}"))
+		return snippets
+
+	def refresh(self, force: bool = False) -> int:
+		"""Bring the index up to date with its sources. Returns the number of snippets embedded."""
+		cap_index = get_capability_index()
+		cap_index.refresh()
+		key = (store.stat_key(CONTEXT_PATH), store.stat_key(CHAT_LOG), cap_index.version)
+		if not force and key == self._sources_key and self.matrix is not None:
+			return 0
+		with self._lock:
+			current = self._collect()
+			known = {s.id: (i, h) for i, (s, h) in enumerate(zip(self.snippets, self.hashes))}
+			rows, hashes, todo = [], [], []
+			for snippet in current:
+				h = _content_hash(snippet.text)
+				hit = known.get(snippet.id)
+				if hit is not None and hit[1] == h and self.matrix is not None and not force:
+					rows.append(self.matrix[hit[0]])
+				else:
+					rows.append(None)
+					todo.append(len(rows) - 1)
+				hashes.append(h)
+			if todo:
+				try:
+					vectors = self.embedder.embed([current[i].text for i in todo])
+				except Exception as e:
+					print(f"[WARN] Embedding failed ({self.embedder.name}): {e}")
+					return 0
+				for i, vector in zip(todo, vectors):
+					rows[i] = vector
+			changed = bool(todo) or len(current) != len(self.snippets)
+			self.snippets = current
+			self.hashes = hashes
+			self.matrix = np.vstack(rows).astype(np.float32, copy=False) if rows else None
+			self._sources_key = key
+			self._reweight()  # rows may have been reordered even when nothing was re-embedded
+			if changed and getattr(self.embedder, "persist", False):
+				self._save()
+			return len(todo)
+
+	# --- querying ---
+	def search(self, query: str, top_k: int = DEFAULT_TOP_K, token_budget: int = DEFAULT_TOKEN_BUDGET,
+			min_score: float = DEFAULT_MIN_SCORE, exclude: Optional[Callable[[Snippet], bool]] = None) -> List[Snippet]:
+		"""Best-matching snippets (cosine similarity) until top_k or the token budget is reached."""
+		from agent.tools.llm_budget import estimate_tokens
+
+		self.refresh()
+		if not query or self.matrix is None or not len(self.snippets):
+			return []
+		q = self.embedder.embed([query])[0]
+		with self._lock:
+			if self._idf is not None:
+				q = q * self._idf
+				q = q / (np.linalg.norm(q) or 1.0)
+			scores = self._weighted @ q
+			snippets = self.snippets
+		candidates = np.argsort(-scores)[: max(top_k * 4, top_k)]
+		results: List[Snippet] = []
+		used = 0
+		for i in candidates:
+			score = float(scores[i])
+			if score < min_score or len(results) >= top_k:
+				break
+			snippet = snippets[i]
+			if exclude is not None and exclude(snippet):
+				continue
+			cost = estimate_tokens(snippet.text)
+			if used + cost > token_budget:
+				continue
+			used += cost
+			results.append(Snippet(snippet.id, snippet.source, snippet.text, round(score, 4)))
+		return results
+
+
+_index: Optional[VectorIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_vector_index() -> VectorIndex:
+	global _index
+	if _index is None:
+		with _index_lock:
+			if _index is None:
+				_index = VectorIndex(INDEX_PATH)
+	return _index
+
+
+@traced("retrieval.notes")
+def relevant_notes(query: str) -> str:
+	"""
+	Retrieved memory for a chat turn, formatted for the prompt ("" when nothing
+	clears the threshold or retrieval is unavailable). Chat messages that are
+	still verbatim in the prompt (chat_summary.verbatim_window) are skipped.
+	"""
+	if not retrieval_available():
+		return ""
+	from agent.tools.chat_summary import verbatim_window
+
+	cfg = retrieval_config()
+	_, window = verbatim_window()
+	verbatim_seqs = {e["seq"] for e in window}
+
+	def verbatim(snippet: Snippet) -> bool:
+		return snippet.source == "chat" and int(snippet.id.split(":", 1)[1]) in verbatim_seqs
+
+	try:
+		snippets = get_vector_index().search(
+			query,
+			top_k=int(cfg.get("top_k", DEFAULT_TOP_K)),
+			token_budget=int(cfg.get("token_budget", DEFAULT_TOKEN_BUDGET)),
+			min_score=float(cfg.get("min_score", DEFAULT_MIN_SCORE)),
+			exclude=verbatim,
+		)
+	except Exception as e:
+		print(f"[WARN] Retrieval failed: {e}")
+		return ""
+	# One line per snippet: a context.md heading and its bullets become "Heading; item; item"
+	return "\n".join("- " + re.sub(r"\s*\n\s*(?:[-*]\s+)?", "; ", s.text.strip()) for s in snippets)
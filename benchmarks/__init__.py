@@ -0,0 +1,16 @@
+"""
+Offline benchmarks for SAIAS pipelines.
+
+Runs intent routing, chunk refactoring and self-patching against a local
+stand-in LLM server (scripted, replayed from a cassette, or proxying a real
+server while recording), reports latency percentiles and throughput per stage,
+and compares them with a stored baseline:
+
+	python -m benchmarks --iterations 10
+	python -m benchmarks --record http://localhost:11434 --cassette qwen-run
+	python -m benchmarks --replay qwen-run --check
+
+Static-analysis scaling on synthetic repos lives in benchmarks.scaling:
+
+	python -m benchmarks.scaling --sizes 1000,10000,50000
+"""
@@ -0,0 +1,85 @@
+# benchmarks/__main__.py
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from benchmarks.cassette import Cassette
+from benchmarks.fake_llm_server import FakeLLMServer, Script
+from benchmarks.suite import (
+	BASELINE_PATH, DEFAULT_TOLERANCE, STAGES, compare, format_results, load_baseline, run_suite, save_baseline,
+)
+
+DEFAULT_SCRIPT = Path(__file__).resolve().parent / "scripts" / "default.json"
+
+
+def parse_args(argv=None):
+	parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Offline SAIAS pipeline benchmarks")
+	parser.add_argument("--stages", default=",".join(STAGES), help=f"comma-separated subset of: {', '.join(STAGES)}")
+	parser.add_argument("--iterations", type=int, default=5)
+	parser.add_argument("--warmup", type=int, default=1)
+	parser.add_argument("--latency", type=float, default=0.05, help="stand-in time to first token (s)")
+	parser.add_argument("--tokens-per-sec", type=float, default=200.0, help="stand-in generation speed (0 = instant)")
+	parser.add_argument("--script", default=str(DEFAULT_SCRIPT), help="scripted replies (JSON rules)")
+	source = parser.add_mutually_exclusive_group()
+	source.add_argument("--record", metavar="UPSTREAM_URL", help="proxy to a real server and record a cassette")
+	source.add_argument("--replay", metavar="CASSETTE", help="replay a recorded cassette (misses use the script)")
+	parser.add_argument("--cassette", help="cassette name/path to record into (with --record)")
+	parser.add_argument("--replay-timing", action="store_true", help="replay with recorded latencies")
+	parser.add_argument("--baseline", default=str(BASELINE_PATH))
+	parser.add_argument("--check", action="store_true", help="exit 1 if a stage regressed vs. the baseline")
+	parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="allowed slowdown (0.25 = 25%%)")
+	parser.add_argument("--update-baseline", action="store_true")
+	parser.add_argument("--json", action="store_true", help="print results as JSON")
+	return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+	args = parse_args(argv)
+	stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+	unknown = [s for s in stages if s not in STAGES]
+	if unknown:
+		print(f"[ERROR] Unknown stage(s): {', '.join(unknown)}")
+		return 2
+
+	mode, cassette = "script", None
+	if args.record:
+		mode, cassette = "record", Cassette.named(args.cassette or "recording")
+	elif args.replay:
+		mode, cassette = "replay", Cassette.named(args.replay)
+
+	server = FakeLLMServer(
+		latency=args.latency, tokens_per_sec=args.tokens_per_sec, script=Script.load(Path(args.script)),
+		mode=mode, cassette=cassette, upstream=args.record, replay_timing=args.replay_timing,
+	)
+	with server:
+		results = run_suite(server, stages, iterations=args.iterations, warmup=args.warmup)
+
+	print(json.dumps(results, indent=2) if args.json else format_results(results))
+	if mode == "record":
+		print(f"[OK] Recorded {len(cassette)} replies to {cassette.path}")
+	elif mode == "replay":
+		print(f"[INFO] Replayed {server.stats.replayed} replies, {server.stats.misses} cassette misses")
+
+	settings = {"latency": args.latency, "tokens_per_sec": args.tokens_per_sec, "mode": mode, "iterations": args.iterations}
+	if args.update_baseline:
+		save_baseline(results, Path(args.baseline), settings)
+		print(f"[OK] Baseline written to {args.baseline}")
+		return 0
+	if args.check:
+		baseline = load_baseline(Path(args.baseline))
+		if not baseline:
+			print(f"[WARN] No baseline at {args.baseline}; run with --update-baseline first")
+			return 0
+		problems = compare(results, baseline, args.tolerance)
+		if problems:
+			print("[FAIL] Regressions vs. baseline:")
+			for p in problems:
+				print(f"  - {p}")
+			return 1
+		print("[OK] No regressions vs. baseline")
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main(sys.argv[1:]))
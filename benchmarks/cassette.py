@@ -0,0 +1,56 @@
+# benchmarks/cassette.py
+import hashlib
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from agent.tools.memory_store import read_json, write_json
+
+CASSETTE_DIR = Path(__file__).resolve().parent / "cassettes"
+
+
+def request_key(model: str, messages: List[Dict[str, str]]) -> str:
+	"""Identity of a chat request for record/replay (model + messages; sampling options are ignored)."""
+	blob = json.dumps([model, [[m.get("role"), m.get("content")] for m in messages]], ensure_ascii=False)
+	return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+	"""Recorded LLM replies keyed by request_key(), stored as JSON under benchmarks/cassettes."""
+
+	def __init__(self, path: Path):
+		self.path = Path(path)
+		self._lock = threading.Lock()
+		data = read_json(self.path, default={}) or {}
+		self.entries: Dict[str, Dict[str, Any]] = data.get("entries", {})
+
+	@classmethod
+	def named(cls, name: str) -> "Cassette":
+		path = Path(name)
+		if path.suffix != ".json":
+			path = CASSETTE_DIR / f"{name}.json"
+		return cls(path)
+
+	def get(self, key: str) -> Optional[Dict[str, Any]]:
+		with self._lock:
+			return self.entries.get(key)
+
+	def put(self, key: str, model: str, messages: List[Dict[str, str]], content: str,
+			timing: Optional[Dict[str, float]] = None) -> None:
+		last_user = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+		with self._lock:
+			self.entries[key] = {
+				"model": model,
+				"prompt_preview": last_user[:200],
+				"content": content,
+				"timing": timing or {},
+			}
+
+	def save(self) -> None:
+		with self._lock:
+			snapshot = {"entries": dict(self.entries)}
+		write_json(self.path, snapshot)
+
+	def __len__(self) -> int:
+		return len(self.entries)
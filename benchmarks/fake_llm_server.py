@@ -0,0 +1,387 @@
+# benchmarks/fake_llm_server.py
+"""
+Local stand-in for an LLM server. Speaks both the Ollama API (/api/chat,
+/api/tags, /api/embed) and the OpenAI-compatible API (/v1/chat/completions,
+/v1/models, /v1/embeddings), with configurable prompt latency and generation
+speed. Replies come from a script (regex rules), a cassette (replay), or an
+upstream server (record).
+"""
+import ast
+import io
+import json
+import re
+import textwrap
+import threading
+import time
+import tokenize
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from benchmarks.cassette import Cassette, request_key
+
+ECHO_CODE = "@echo_code"
+REFACTOR_CODE = "@refactor_code"
+CODE_MARKER = "# Code to refactor:"
+DEFAULT_REPLY = "OK."
+TRAILING_CHATTER = (
+	"\n\nThis version keeps the public interface unchanged while tightening the implementation. "
+	"Let me know if you want further changes."
+)
+
+
+@dataclass
+class Rule:
+	pattern: re.Pattern
+	response: str
+
+
+@dataclass
+class ServerStats:
+	requests: int = 0
+	streamed: int = 0
+	output_tokens: int = 0
+	replayed: int = 0
+	recorded: int = 0
+	misses: int = 0
+	per_model: Dict[str, int] = field(default_factory=dict)
+
+
+def estimate_tokens(text: str) -> int:
+	return max(1, len(text) // 4) if text else 0
+
+
+def echo_code(prompt: str) -> str:
+	"""A plausible refactor: the code after CODE_MARKER (or the whole prompt), fenced, followed by chatter."""
+	code = prompt.split(CODE_MARKER, 1)[1] if CODE_MARKER in prompt else prompt
+	return f"```python\n{code.strip()}\n```{TRAILING_CHATTER}"
+
+
+def _first_local(tree: ast.AST) -> Optional[Tuple[str, int, int]]:
+	"""(name, first line, last line) of the first local variable assigned in a function, if any."""
+	for fn in ast.walk(tree):
+		if not isinstance(fn, (ast.FunctionDef, ast.AsyncFunctionDef)):
+			continue
+		args = fn.args
+		params = {a.arg for a in args.posonlyargs + args.args + args.kwonlyargs}
+		params.update(a.arg for a in (args.vararg, args.kwarg) if a is not None)
+		declared = {n for node in ast.walk(fn) if isinstance(node, (ast.Global, ast.Nonlocal)) for n in node.names}
+		for node in ast.walk(fn):
+			if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store) and node.id not in params | declared:
+				return node.id, fn.lineno, fn.end_lineno
+	return None
+
+
+def rename_local(code: str) -> str:
+	"""
+	A small real change: rename the first local variable of the first function
+	that has one (x → x_value), within that function only. Attribute names and
+	keyword arguments are left alone. Code without such a local comes back unchanged.
+	"""
+	try:
+		found = _first_local(ast.parse(textwrap.dedent(code)))
+	except SyntaxError:
+		return code
+	if found is None:
+		return code
+	name, first, last = found
+	lines = code.splitlines(keepends=True)
+	positions = []
+	previous, depth = None, 0
+	try:
+		tokens = list(tokenize.generate_tokens(io.StringIO(code).readline))
+	except (tokenize.TokenError, IndentationError):
+		return code
+	for i, tok in enumerate(tokens):
+		if tok.type == tokenize.OP and tok.string in "([{":
+			depth += 1
+		elif tok.type == tokenize.OP and tok.string in ")]}":
+			depth -= 1
+		elif tok.type == tokenize.NAME and tok.string == name and first <= tok.start[0] <= last:
+			after = tokens[i + 1] if i + 1 < len(tokens) else None
+			keyword_arg = depth > 0 and after is not None and after.string == "="
+			if not (previous is not None and previous.string == ".") and not keyword_arg:
+				positions.append(tok.start)
+		if tok.type not in (tokenize.NL, tokenize.NEWLINE, tokenize.COMMENT, tokenize.INDENT, tokenize.DEDENT):
+			previous = tok
+	for row, col in reversed(positions):
+		line = lines[row - 1]
+		lines[row - 1] = f"{line[:col]}{name}_value{line[col + len(name):]}"
+	return "".join(lines)
+
+
+def refactor_code(prompt: str) -> str:
+	"""Like echo_code(), but with a local variable renamed, so the reply scores as a meaningful refactor."""
+	code = prompt.split(CODE_MARKER, 1)[1] if CODE_MARKER in prompt else prompt
+	return f"```python\n{rename_local(code.strip())}\n```{TRAILING_CHATTER}"
+
+
+DIRECTIVES = {ECHO_CODE: echo_code, REFACTOR_CODE: refactor_code}
+
+
+class Script:
+	"""
+	Scripted replies: {"rules": [{"match": regex, "response": text | "@echo_code" | "@refactor_code"}],
+	"default": text}. Rules are matched against the last user message; the first match wins.
+	"""
+
+	def __init__(self, rules: Optional[List[Rule]] = None, default: str = DEFAULT_REPLY):
+		self.rules = rules or []
+		self.default = default
+
+	@classmethod
+	def load(cls, path: Path) -> "Script":
+		with open(path, "r", encoding="utf-8") as f:
+			data = json.load(f)
+		rules = [Rule(re.compile(r["match"], re.IGNORECASE | re.DOTALL), r["response"]) for r in data.get("rules", [])]
+		return cls(rules, data.get("default", DEFAULT_REPLY))
+
+	def reply(self, messages: List[Dict[str, str]]) -> str:
+		prompt = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+		for rule in self.rules:
+			if rule.pattern.search(prompt):
+				return self._respond(rule.response, prompt)
+		return self._respond(self.default, prompt)
+
+	@staticmethod
+	def _respond(response: str, prompt: str) -> str:
+		directive = DIRECTIVES.get(response)
+		return directive(prompt) if directive is not None else response
+
+
+class FakeLLMServer:
+	"""
+	Usage:
+		with FakeLLMServer(latency=0.05, tokens_per_sec=200) as server:
+			configure_endpoints([server.url])
+
+	Modes: "script" (default), "replay" (cassette; misses fall back to the script),
+	"record" (forward to `upstream`, save replies to the cassette).
+	"""
+
+	def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, tokens_per_sec: float = 0.0,
+			script: Optional[Script] = None, mode: str = "script", cassette: Optional[Cassette] = None,
+			upstream: Optional[str] = None, models: Optional[List[str]] = None, replay_timing: bool = False):
+		if mode not in ("script", "replay", "record"):
+			raise ValueError(f"Unknown mode '{mode}'")
+		if mode in ("replay", "record") and cassette is None:
+			raise ValueError(f"Mode '{mode}' needs a cassette")
+		if mode == "record" and not upstream:
+			raise ValueError("Mode 'record' needs an upstream URL")
+		self.latency = latency
+		self.tokens_per_sec = tokens_per_sec
+		self.script = script or Script()
+		self.mode = mode
+		self.cassette = cassette
+		self.upstream = (upstream or "").rstrip("/")
+		self.models = models
+		self.replay_timing = replay_timing  # replay with the recorded latency instead of latency/tokens_per_sec
+		self.stats = ServerStats()
+		self._lock = threading.Lock()
+		self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+		self._httpd.daemon_threads = True
+		self._thread: Optional[threading.Thread] = None
+
+	@property
+	def url(self) -> str:
+		host, port = self._httpd.server_address[:2]
+		return f"http://{host}:{port}"
+
+	def start(self) -> "FakeLLMServer":
+		self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-llm", daemon=True)
+		self._thread.start()
+		return self
+
+	def stop(self) -> None:
+		self._httpd.shutdown()
+		self._httpd.server_close()
+		if self.cassette is not None and self.mode == "record":
+			self.cassette.save()
+
+	def __enter__(self) -> "FakeLLMServer":
+		return self.start()
+
+	def __exit__(self, *exc) -> None:
+		self.stop()
+
+	# --- reply generation ---
+	def _count(self, model: str, tokens: int, stream: bool) -> None:
+		with self._lock:
+			self.stats.requests += 1
+			self.stats.streamed += int(stream)
+			self.stats.output_tokens += tokens
+			self.stats.per_model[model] = self.stats.per_model.get(model, 0) + 1
+
+	def _resolve(self, api: str, body: Dict[str, Any]) -> Tuple[str, Optional[Dict[str, float]]]:
+		"""(reply text, recorded timing or None)"""
+		model = body.get("model", "")
+		messages = body.get("messages") or []
+		if self.mode == "replay":
+			entry = self.cassette.get(request_key(model, messages))
+			if entry is not None:
+				with self._lock:
+					self.stats.replayed += 1
+				return entry["content"], entry.get("timing")
+			with self._lock:
+				self.stats.misses += 1
+		elif self.mode == "record":
+			start = time.perf_counter()
+			content = self._forward(api, body)
+			timing = {"seconds": time.perf_counter() - start}
+			self.cassette.put(request_key(model, messages), model, messages, content, timing)
+			with self._lock:
+				self.stats.recorded += 1
+			return content, None  # already waited for the upstream
+		return self.script.reply(messages), None
+
+	def _forward(self, api: str, body: Dict[str, Any]) -> str:
+		import requests
+		body = dict(body, stream=False)
+		if api == "ollama":
+			r = requests.post(f"{self.upstream}/api/chat", json=body, timeout=600)
+			r.raise_for_status()
+			return (r.json().get("message") or {}).get("content", "")
+		r = requests.post(f"{self.upstream}/v1/chat/completions", json=body, timeout=600)
+		r.raise_for_status()
+		return ((r.json().get("choices") or [{}])[0].get("message") or {}).get("content") or ""
+
+	def _pieces(self, text: str) -> List[str]:
+		return re.findall(r"\S+\s*|\s+", text) or [""]
+
+	def _delays(self, text: str, timing: Optional[Dict[str, float]]) -> Tuple[float, float]:
+		"""(time to first token, per-piece delay)"""
+		pieces = max(1, len(self._pieces(text)))
+		if timing is not None and self.replay_timing:
+			return timing.get("seconds", 0.0) * 0.2, timing.get("seconds", 0.0) * 0.8 / pieces
+		per_piece = 0.0
+		if self.tokens_per_sec > 0:
+			per_piece = estimate_tokens(text) / self.tokens_per_sec / pieces
+		return self.latency, per_piece
+
+	def generate(self, api: str, body: Dict[str, Any]) -> Iterator[str]:
+		"""Reply pieces, paced like a real server (first-token latency, then tokens/sec)."""
+		text, timing = self._resolve(api, body)
+		first, per_piece = self._delays(text, timing) if self.mode != "record" else (0.0, 0.0)
+		self._count(body.get("model", ""), estimate_tokens(text), bool(body.get("stream")))
+		if first:
+			time.sleep(first)
+		for piece in self._pieces(text):
+			if per_piece:
+				time.sleep(per_piece)
+			yield piece
+
+	# --- HTTP ---
+	def _handler_class(self):
+		server = self
+
+		class Handler(BaseHTTPRequestHandler):
+			protocol_version = "HTTP/1.1"
+
+			def log_message(self, *args):
+				pass
+
+			def handle_one_request(self):
+				try:
+					super().handle_one_request()
+				except ConnectionError:
+					self.close_connection = True  # client went away mid-request or mid-reply (early stop): not an error
+
+			def _json(self, code: int, payload: Any) -> None:
+				body = json.dumps(payload).encode("utf-8")
+				self.send_response(code)
+				self.send_header("Content-Type", "application/json")
+				self.send_header("Content-Length", str(len(body)))
+				self.end_headers()
+				self.wfile.write(body)
+
+			def _stream(self, content_type: str, chunks: Iterator[bytes]) -> None:
+				self.send_response(200)
+				self.send_header("Content-Type", content_type)
+				self.send_header("Transfer-Encoding", "chunked")
+				self.end_headers()
+				try:
+					for chunk in chunks:
+						self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+						self.wfile.flush()
+					self.wfile.write(b"0\r\n\r\n")
+				except (BrokenPipeError, ConnectionResetError):
+					pass  # client stopped early (e.g. code early-stop)
+
+			def _models(self) -> List[str]:
+				return server.models or ["fake"]
+
+			def do_GET(self):
+				if self.path == "/api/tags":
+					self._json(200, {"models": [{"name": m} for m in self._models()]})
+				elif self.path == "/v1/models":
+					self._json(200, {"data": [{"id": m, "object": "model"} for m in self._models()]})
+				else:
+					self._json(404, {"error": "not found"})
+
+			def do_POST(self):
+				length = int(self.headers.get("Content-Length") or 0)
+				try:
+					body = json.loads(self.rfile.read(length) or b"{}")
+				except ValueError:
+					self._json(400, {"error": "bad json"})
+					return
+				model = body.get("model", "")
+				if server.models and model not in server.models:
+					self._json(404, {"error": f"model '{model}' not found"})
+				elif self.path == "/api/chat":
+					self._ollama_chat(body)
+				elif self.path == "/v1/chat/completions":
+					self._openai_chat(body)
+				elif self.path in ("/api/embed", "/v1/embeddings"):
+					self._embed(body)
+				else:
+					self._json(404, {"error": "not found"})
+
+			def _ollama_chat(self, body):
+				model = body.get("model", "")
+				start = time.perf_counter()
+				if body.get("stream", True):
+					def chunks():
+						for piece in server.generate("ollama", body):
+							yield json.dumps({"model": model, "message": {"role": "assistant", "content": piece}, "done": False}).encode() + b"\n"
+						yield json.dumps({"model": model, "done": True, "done_reason": "stop"}).encode() + b"\n"
+					self._stream("application/x-ndjson", chunks())
+					return
+				text = "".join(server.generate("ollama", body))
+				elapsed_ns = int((time.perf_counter() - start) * 1e9)
+				self._json(200, {
+					"model": model, "message": {"role": "assistant", "content": text}, "done": True,
+					"done_reason": "stop", "eval_count": estimate_tokens(text), "eval_duration": elapsed_ns,
+					"prompt_eval_duration": int(server.latency * 1e9), "load_duration": 0,
+				})
+
+			def _openai_chat(self, body):
+				model = body.get("model", "")
+				if body.get("stream"):
+					def chunks():
+						for piece in server.generate("openai", body):
+							data = {"object": "chat.completion.chunk", "model": model, "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]}
+							yield b"data: " + json.dumps(data).encode() + b"\n\n"
+						done = {"object": "chat.completion.chunk", "model": model, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+						yield b"data: " + json.dumps(done).encode() + b"\n\ndata: [DONE]\n\n"
+					self._stream("text/event-stream", chunks())
+					return
+				text = "".join(server.generate("openai", body))
+				self._json(200, {
+					"object": "chat.completion", "model": model,
+					"choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+					"usage": {"prompt_tokens": 0, "completion_tokens": estimate_tokens(text)},
+				})
+
+			def _embed(self, body):
+				from agent.tools.vector_memory import HashedEmbedder
+				inputs = body.get("input") or []
+				inputs = [inputs] if isinstance(inputs, str) else inputs
+				vectors = HashedEmbedder(256).embed(list(inputs)).tolist()
+				if self.path == "/api/embed":
+					self._json(200, {"model": body.get("model", ""), "embeddings": vectors})
+				else:
+					self._json(200, {"data": [{"index": i, "embedding": v} for i, v in enumerate(vectors)]})
+
+		return Handler
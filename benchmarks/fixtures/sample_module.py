@@ -0,0 +1,45 @@
+import json
+import os
+from pathlib import Path
+
+DEFAULT_LIMIT = 10
+
+
+def load_items(path):
+	items = []
+	with open(path, "r", encoding="utf-8") as f:
+		for line in f:
+			line = line.strip()
+			if line:
+				items.append(json.loads(line))
+	return items
+
+
+def filter_items(items, key, value):
+	result = []
+	for item in items:
+		if item.get(key) == value:
+			result.append(item)
+	return result
+
+
+def top_items(items, field, limit=DEFAULT_LIMIT):
+	ordered = sorted(items, key=lambda i: i.get(field, 0), reverse=True)
+	return ordered[:limit]
+
+
+class ItemStore:
+	def __init__(self, root):
+		self.root = Path(root)
+		self.cache = {}
+
+	def path_for(self, name):
+		return os.path.join(str(self.root), name + ".jsonl")
+
+	def get(self, name):
+		if name not in self.cache:
+			self.cache[name] = load_items(self.path_for(name))
+		return self.cache[name]
+
+	def best(self, name, field):
+		return top_items(self.get(name), field)
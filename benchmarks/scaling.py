@@ -0,0 +1,281 @@
+# benchmarks/scaling.py
+"""
+Scaling benchmarks for the static-analysis entry points on synthetic repos:
+
+	python -m benchmarks.scaling --sizes 1000,10000
+	python -m benchmarks.scaling --sizes 1000,10000,50000 --keep /tmp/synth --json
+
+Each entry point runs in a fresh worker process per data point, so peak RSS is
+that entry's own high-water mark. A second traced run reports Python
+allocations (tracemalloc slows the code down, so its time is not used).
+Repo entries (dependency_graph, file_tree) sweep the module count (--sizes);
+module entries (chunk_file, build_context, meaningful_change) sweep the size of
+the giant modules (--giant-functions), since they work one file at a time.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.suite import percentile
+from benchmarks.synthetic_repo import RepoSpec, generate_repo, render_module
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+REPO_ENTRIES = ("dependency_graph", "file_tree")
+MODULE_ENTRIES = ("chunk_file", "build_context", "meaningful_change")
+ENTRIES = REPO_ENTRIES + MODULE_ENTRIES
+DEFAULT_SIZES = (1000, 10000)
+DEFAULT_GIANT_FUNCTIONS = (250, 500, 1000)
+WORKER_TIMEOUT = 3600  # seconds per worker run
+CORE_INDEX = 1000  # module index used for standalone giant modules (imports from earlier modules)
+
+
+def _max_rss_mb() -> float:
+	rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024  # bytes on macOS, KiB elsewhere
+
+
+# --- entry points (run inside the worker) ---
+def _entry_dependency_graph(repo: Path, giants: List[Path]) -> Callable[[], Any]:
+	from agent.tools.dependency_graph import DependencyGraph
+
+	def run():
+		graph = DependencyGraph(root=repo)
+		graph.build()
+		return len(graph.graph)
+	return run
+
+
+def _entry_file_tree(repo: Path, giants: List[Path]) -> Callable[[], Any]:
+	from agent.tools.root_registry import build_file_tree
+	return lambda: len(build_file_tree(repo))
+
+
+def _entry_chunk_file(repo: Path, giants: List[Path]) -> Callable[[], Any]:
+	from agent.tools.code_chunker import CodeChunker
+	chunker = CodeChunker()
+	return lambda: sum(len(chunker.chunk_file(str(path))) for path in giants)
+
+
+def _entry_build_context(repo: Path, giants: List[Path]) -> Callable[[], Any]:
+	import ast
+	from agent.tools.code_chunker import CodeChunker
+	chunker = CodeChunker()
+	parsed = []
+	for path in giants:
+		source = path.read_text(encoding="utf-8")
+		parsed.append((ast.parse(source), source.splitlines()))  # parse outside the timed region
+	return lambda: sum(len(chunker._build_context(tree, lines).cross_references) for tree, lines in parsed)
+
+
+def _entry_meaningful_change(repo: Path, giants: List[Path]) -> Callable[[], Any]:
+	from agent.tools.self_patch import is_meaningful_change
+	pairs = []
+	for path in giants:
+		source = path.read_text(encoding="utf-8")
+		pairs.append((source, source.replace("limit=10)", "limit=20)", 1)))  # real change
+		pairs.append((source, source.replace("import os\n", "import os  # paths\n", 1)))  # cosmetic only
+	return lambda: sum(is_meaningful_change(a, b) for a, b in pairs)
+
+
+BUILDERS = {
+	"dependency_graph": _entry_dependency_graph,
+	"file_tree": _entry_file_tree,
+	"chunk_file": _entry_chunk_file,
+	"build_context": _entry_build_context,
+	"meaningful_change": _entry_meaningful_change,
+}
+
+
+def run_worker(entry: str, repo: Path, giants: List[Path], repeat: int, trace: bool) -> Dict[str, Any]:
+	"""Measure one entry point in this process (called in a fresh subprocess by measure())."""
+	fn = BUILDERS[entry](repo, giants)
+	rss_before = _max_rss_mb()
+	if trace:
+		tracemalloc.start()
+		fn()
+		current, peak = tracemalloc.get_traced_memory()
+		blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+		tracemalloc.stop()
+		return {"alloc_peak_mb": round(peak / 1048576, 2), "retained_mb": round(current / 1048576, 2), "retained_blocks": blocks}
+	samples = []
+	result = None
+	for _ in range(max(1, repeat)):
+		start = time.perf_counter()
+		result = fn()
+		samples.append(time.perf_counter() - start)
+	peak = _max_rss_mb()
+	return {
+		"p50": round(percentile(samples, 50), 6),
+		"min": round(min(samples), 6),
+		"rss_peak_mb": round(peak, 1),
+		"rss_growth_mb": round(peak - rss_before, 1),
+		"result": result,
+	}
+
+
+def _worker_cmd(entry: str, repo: Path, giants: List[Path], repeat: int, trace: bool) -> List[str]:
+	cmd = [sys.executable, "-m", "benchmarks.scaling", "--worker", entry, "--repo", str(repo), "--repeat", str(repeat)]
+	for path in giants:
+		cmd += ["--giant", str(path)]
+	return cmd + (["--trace"] if trace else [])
+
+
+def measure(entry: str, repo: Path, giants: List[Path], repeat: int) -> Dict[str, Any]:
+	"""Timed run and traced run of `entry`, each in its own worker process."""
+	merged: Dict[str, Any] = {}
+	env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(PROJECT_ROOT), os.environ.get("PYTHONPATH")])))
+	for trace in (False, True):
+		# Run from a scratch dir: importing self_patch drops its log file into the cwd
+		with tempfile.TemporaryDirectory(prefix="saias-scale-") as cwd:
+			proc = subprocess.run(_worker_cmd(entry, repo, giants, repeat, trace), cwd=cwd, env=env,
+				capture_output=True, text=True, timeout=WORKER_TIMEOUT)
+		lines = [l for l in proc.stdout.splitlines() if l.startswith("{")]
+		if proc.returncode != 0 or not lines:
+			tail = (proc.stderr or proc.stdout).strip().splitlines()[-1:] or ["no output"]
+			return {"error": tail[0]}
+		merged.update(json.loads(lines[-1]))
+	return merged
+
+
+def ensure_repo(workdir: Path, spec: RepoSpec) -> Path:
+	"""Generate (or reuse) the synthetic repo for `spec` under `workdir`."""
+	repo = workdir / f"synth-{spec.files}-s{spec.seed}-g{spec.giant_modules}x{spec.giant_functions}"
+	marker = repo / ".complete"
+	if not marker.exists():
+		start = time.perf_counter()
+		generate_repo(repo, spec)
+		marker.write_text("ok", encoding="utf-8")
+		print(f"[INFO] Generated {spec.files} modules in {time.perf_counter() - start:.1f}s -> {repo}")
+	return repo
+
+
+def ensure_modules(workdir: Path, functions: int, count: int, seed: int) -> List[Path]:
+	"""`count` standalone giant modules with `functions` functions each, for the module entries."""
+	spec = RepoSpec(files=CORE_INDEX + count, seed=seed, giant_functions=functions)
+	rng = random.Random(seed)
+	paths = []
+	for i in range(count):
+		path = workdir / f"giant-s{seed}" / f"giant_{functions}_{i}.py"
+		if not path.exists():
+			path.parent.mkdir(parents=True, exist_ok=True)
+			path.write_text(render_module(spec, rng, CORE_INDEX + i, giant=True), encoding="utf-8")
+		paths.append(path)
+	return paths
+
+
+def scaling_exponent(points: Dict[int, float]) -> Optional[float]:
+	"""Slope of log(time) over log(size) between the smallest and largest size (1.0 = linear)."""
+	sizes = sorted(n for n, t in points.items() if t > 0)
+	if len(sizes) < 2:
+		return None
+	lo, hi = sizes[0], sizes[-1]
+	return round(math.log(points[hi] / points[lo]) / math.log(hi / lo), 2)
+
+
+def _sweep(points, entries, run) -> Dict[int, Dict[str, Any]]:
+	results: Dict[int, Dict[str, Any]] = {}
+	for point in points:
+		results[point] = {}
+		for entry in entries:
+			results[point][entry] = metrics = run(point, entry)
+			if "error" in metrics:
+				print(f"[WARN] {entry} @ {point} failed: {metrics['error']}")
+	return results
+
+
+def run_scaling(sizes=DEFAULT_SIZES, giant_functions=DEFAULT_GIANT_FUNCTIONS, entries=ENTRIES,
+		workdir: Optional[Path] = None, repeat: int = 3, giant_modules: int = 3, seed: int = 0) -> Dict[str, Any]:
+	"""
+	{"repo": {files: {entry: metrics}}, "module": {functions: {entry: metrics}}, "exponents": {entry: slope}}
+	Synthetic repos use the largest --giant-functions value for their giant modules.
+	"""
+	repo_entries = [e for e in entries if e in REPO_ENTRIES]
+	module_entries = [e for e in entries if e in MODULE_ENTRIES]
+	with tempfile.TemporaryDirectory(prefix="saias-synth-") as tmp:
+		base = Path(workdir) if workdir else Path(tmp)
+		base.mkdir(parents=True, exist_ok=True)
+		largest = max(giant_functions) if giant_functions else RepoSpec.giant_functions
+
+		def repo_point(files: int, entry: str) -> Dict[str, Any]:
+			spec = RepoSpec(files=files, seed=seed, giant_modules=giant_modules, giant_functions=largest)
+			return measure(entry, ensure_repo(base, spec), [], repeat)
+
+		def module_point(functions: int, entry: str) -> Dict[str, Any]:
+			return measure(entry, base, ensure_modules(base, functions, giant_modules, seed), repeat)
+
+		repo = _sweep(sizes if repo_entries else [], repo_entries, repo_point)
+		module = _sweep(giant_functions if module_entries else [], module_entries, module_point)
+	exponents = {}
+	for results, names in ((repo, repo_entries), (module, module_entries)):
+		for entry in names:
+			exponents[entry] = scaling_exponent({n: r[entry].get("p50", 0.0) for n, r in results.items()})
+	return {"repo": repo, "module": module, "exponents": exponents}
+
+
+def format_scaling(report: Dict[str, Any]) -> str:
+	lines = [f"{'entry':<20}{'size':>8}{'p50 ms':>11}{'rss MB':>9}{'+rss MB':>9}{'alloc MB':>10}{'kept MB':>9}{'blocks':>10}"]
+	for axis, label in (("repo", "files"), ("module", "fns/mod")):
+		if report[axis]:
+			lines.append(f"-- by {label}")
+		for size, entries in report[axis].items():
+			for entry, r in entries.items():
+				if "error" in r:
+					lines.append(f"{entry:<20}{size:>8}  error: {r['error']}")
+					continue
+				lines.append(
+					f"{entry:<20}{size:>8}{r['p50'] * 1000:>11.1f}{r['rss_peak_mb']:>9.1f}{r['rss_growth_mb']:>9.1f}"
+					f"{r['alloc_peak_mb']:>10.1f}{r['retained_mb']:>9.1f}{r['retained_blocks']:>10}"
+				)
+	slopes = [f"{e}={s}" for e, s in report["exponents"].items() if s is not None]
+	if slopes:
+		lines.append(f"time ~ size^k: {', '.join(slopes)}")
+	return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+	parser = argparse.ArgumentParser(prog="python -m benchmarks.scaling", description="Static-analysis scaling benchmarks")
+	parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES), help="comma-separated module counts")
+	parser.add_argument("--entries", default=",".join(ENTRIES), help=f"comma-separated subset of: {', '.join(ENTRIES)}")
+	parser.add_argument("--repeat", type=int, default=3, help="timed runs per entry (p50 is reported)")
+	parser.add_argument("--giant-functions", default=",".join(str(s) for s in DEFAULT_GIANT_FUNCTIONS),
+		help="comma-separated functions per giant module (module entries sweep these)")
+	parser.add_argument("--giant-modules", type=int, default=3, help="giant modules per repo / per module data point")
+	parser.add_argument("--seed", type=int, default=0)
+	parser.add_argument("--keep", metavar="DIR", help="generate repos under DIR and keep them for later runs")
+	parser.add_argument("--json", action="store_true", help="print results as JSON")
+	# worker mode (internal)
+	parser.add_argument("--worker", choices=ENTRIES, help=argparse.SUPPRESS)
+	parser.add_argument("--repo", help=argparse.SUPPRESS)
+	parser.add_argument("--giant", action="append", default=[], help=argparse.SUPPRESS)
+	parser.add_argument("--trace", action="store_true", help=argparse.SUPPRESS)
+	args = parser.parse_args(argv)
+
+	if args.worker:
+		print(json.dumps(run_worker(args.worker, Path(args.repo), [Path(g) for g in args.giant], args.repeat, args.trace)))
+		return 0
+
+	entries = [e.strip() for e in args.entries.split(",") if e.strip()]
+	unknown = [e for e in entries if e not in ENTRIES]
+	if unknown:
+		print(f"[ERROR] Unknown entry point(s): {', '.join(unknown)}")
+		return 2
+	sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+	giant_functions = [int(s) for s in args.giant_functions.split(",") if s.strip()]
+	report = run_scaling(sizes, giant_functions, entries, Path(args.keep) if args.keep else None,
+		args.repeat, args.giant_modules, args.seed)
+	print(json.dumps(report, indent=2) if args.json else format_scaling(report))
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main(sys.argv[1:]))
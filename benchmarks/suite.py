@@ -0,0 +1,231 @@
+# benchmarks/suite.py
+import contextlib
+import json
+import math
+import os
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+BENCH_DIR = Path(__file__).resolve().parent
+FIXTURES_DIR = BENCH_DIR / "fixtures"
+BASELINE_PATH = BENCH_DIR / "baseline.json"
+DEFAULT_TOLERANCE = 0.25  # allowed slowdown vs. baseline before a stage counts as regressed
+MIN_REGRESSION_SECONDS = 0.005  # ignore differences below timer noise
+
+ROUTE_PROMPTS = [
+	"hi there",
+	"what are my preferences?",
+	"show patches",
+	"explain the endpoint pool briefly",
+]
+
+
+def percentile(values: List[float], pct: float) -> float:
+	"""Linear-interpolated percentile (pct in 0..100)."""
+	if not values:
+		return 0.0
+	ordered = sorted(values)
+	k = (len(ordered) - 1) * pct / 100.0
+	lo, hi = math.floor(k), math.ceil(k)
+	if lo == hi:
+		return ordered[int(k)]
+	return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+@dataclass
+class StageResult:
+	name: str
+	samples: List[float] = field(default_factory=list)
+	llm_requests: int = 0
+	output_tokens: int = 0
+	errors: int = 0
+
+	def summary(self) -> Dict[str, Any]:
+		total = sum(self.samples)
+		return {
+			"iterations": len(self.samples),
+			"p50": round(percentile(self.samples, 50), 6),
+			"p90": round(percentile(self.samples, 90), 6),
+			"p99": round(percentile(self.samples, 99), 6),
+			"mean": round(total / len(self.samples), 6) if self.samples else 0.0,
+			"throughput_per_s": round(len(self.samples) / total, 3) if total else 0.0,
+			"llm_requests": self.llm_requests,
+			"tokens_per_s": round(self.output_tokens / total, 1) if total else 0.0,
+			"errors": self.errors,
+		}
+
+
+@contextlib.contextmanager
+def isolated_state(workdir: Path) -> Iterator[Path]:
+	"""
+	Point the modules that write under agent/memory (patch notes, self-patch
+	journal, rewards, cascade stats, chat log and summary, vector index) at
+	`workdir` and run from it, so benchmark runs leave the tree untouched.
+	"""
+	from agent.tools import chat_memory, chat_summary, llm, model_cascade, patch_journal, rewards, self_patch, vector_memory
+	from agent.tools.memory_store import store
+
+	saved = {
+		(self_patch, "ROOT_DIR"): self_patch.ROOT_DIR,
+		(self_patch, "PATCH_DIR"): self_patch.PATCH_DIR,
+		(self_patch, "SKIPPED_LOG"): self_patch.SKIPPED_LOG,
+		(patch_journal, "JOURNAL_PATH"): patch_journal.JOURNAL_PATH,
+		(rewards, "LOG_PATH"): rewards.LOG_PATH,
+		(model_cascade, "_stats"): model_cascade._stats,
+		(llm, "REWARDS_LOG_PATH"): llm.REWARDS_LOG_PATH,
+		(chat_memory, "CHAT_LOG"): chat_memory.CHAT_LOG,
+		(chat_summary, "SUMMARY_PATH"): chat_summary.SUMMARY_PATH,
+		(vector_memory, "CHAT_LOG"): vector_memory.CHAT_LOG,
+		(vector_memory, "INDEX_PATH"): vector_memory.INDEX_PATH,
+		(vector_memory, "_index"): vector_memory._index,
+	}
+	memory = workdir / "memory"
+	(memory / "patch_notes").mkdir(parents=True, exist_ok=True)
+	self_patch.ROOT_DIR = workdir
+	self_patch.PATCH_DIR = memory / "patch_notes"
+	self_patch.SKIPPED_LOG = self_patch.PATCH_DIR / "skipped_patches.log"
+	patch_journal.JOURNAL_PATH = memory / "self_patch_journal.jsonl"
+	rewards.LOG_PATH = memory / "rewards_log.jsonl"
+	model_cascade._stats = model_cascade.CascadeStats(memory / "cascade_stats.json")
+	llm.REWARDS_LOG_PATH = memory / "rewards_log.json"
+	chat_memory.CHAT_LOG = vector_memory.CHAT_LOG = memory / "chat_log.jsonl"
+	chat_summary.SUMMARY_PATH = memory / "chat_summary.json"
+	vector_memory.INDEX_PATH = memory / "vector_index.npz"
+	vector_memory._index = None  # rebuilt on first use from the redirected paths
+	cwd = os.getcwd()
+	os.chdir(workdir)
+	try:
+		yield workdir
+	finally:
+		store.flush()  # deferred writes (e.g. log_patch_score) land in workdir, not after it is gone
+		os.chdir(cwd)
+		from agent.tools import sandbox_pool
+		if sandbox_pool._pool is not None:
+			# Workers forked during the run start in (a directory under) workdir: stop them before it is removed
+			sandbox_pool._pool.close()
+			sandbox_pool._pool = None
+		for (module, attr), value in saved.items():
+			setattr(module, attr, value)
+
+
+# --- stages ---
+def stage_route() -> Callable[[], None]:
+	from agent.tools.intent_router import route
+	prompts = iter(ROUTE_PROMPTS * 1000)
+	return lambda: route(next(prompts))
+
+
+def stage_chunk_refactor(workdir: Path) -> Callable[[], None]:
+	from agent.tools.code_chunker import chunk_and_refactor_file
+	target = workdir / "chunk_target.py"
+	shutil.copy(FIXTURES_DIR / "sample_module.py", target)
+	return lambda: chunk_and_refactor_file(str(target))
+
+
+def stage_self_patch(workdir: Path) -> Callable[[], None]:
+	from agent.tools.self_patch import run_self_patch
+	project = workdir / "project"
+	project.mkdir(exist_ok=True)
+	shutil.copy(FIXTURES_DIR / "sample_module.py", project / "sample_module.py")
+
+	def run():
+		# Fresh patch dir each time: pending patches would make later runs skip the file
+		from agent.tools import self_patch
+		shutil.rmtree(self_patch.PATCH_DIR, ignore_errors=True)
+		self_patch.PATCH_DIR.mkdir(parents=True, exist_ok=True)
+		cwd = os.getcwd()
+		os.chdir(project)
+		try:
+			run_self_patch()
+		finally:
+			os.chdir(cwd)
+	return run
+
+
+STAGES = ("route", "chunk_refactor", "self_patch")
+
+
+def run_stage(name: str, fn: Callable[[], None], iterations: int, warmup: int, server) -> StageResult:
+	for _ in range(warmup):
+		fn()
+	result = StageResult(name)
+	before_requests, before_tokens = server.stats.requests, server.stats.output_tokens
+	for _ in range(iterations):
+		start = time.perf_counter()
+		try:
+			fn()
+		except Exception as e:
+			result.errors += 1
+			print(f"[WARN] {name} iteration failed: {e}")
+		result.samples.append(time.perf_counter() - start)
+	result.llm_requests = server.stats.requests - before_requests
+	result.output_tokens = server.stats.output_tokens - before_tokens
+	return result
+
+
+def run_suite(server, stages=STAGES, iterations: int = 5, warmup: int = 1) -> Dict[str, Dict[str, Any]]:
+	"""Run the selected stages against `server` (already started); returns {stage: summary}."""
+	from agent.tools.llm import configure_scheduler
+	from agent.tools.llm_endpoints import configure_endpoints
+
+	configure_endpoints([server.url])
+	configure_scheduler()
+	results: Dict[str, Dict[str, Any]] = {}
+	with tempfile.TemporaryDirectory(prefix="saias-bench-") as tmp, isolated_state(Path(tmp)) as workdir:
+		builders = {
+			"route": lambda: stage_route(),
+			"chunk_refactor": lambda: stage_chunk_refactor(workdir),
+			"self_patch": lambda: stage_self_patch(workdir),
+		}
+		for name in stages:
+			fn = builders[name]()
+			results[name] = run_stage(name, fn, iterations, warmup, server).summary()
+	configure_endpoints(None)
+	configure_scheduler()
+	return results
+
+
+# --- baseline ---
+def load_baseline(path: Path = BASELINE_PATH) -> Dict[str, Dict[str, Any]]:
+	try:
+		with open(path, "r", encoding="utf-8") as f:
+			return json.load(f).get("stages", {})
+	except (OSError, ValueError):
+		return {}
+
+
+def save_baseline(results: Dict[str, Dict[str, Any]], path: Path = BASELINE_PATH, settings: Optional[Dict] = None) -> None:
+	with open(path, "w", encoding="utf-8") as f:
+		json.dump({"settings": settings or {}, "stages": results}, f, indent=2)
+		f.write("\n")
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+		tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+	"""Regression messages (empty when every stage is within tolerance of the baseline)."""
+	problems = []
+	for stage, current in results.items():
+		base = baseline.get(stage)
+		if not base:
+			continue
+		for metric in ("p50", "p90"):
+			old, new = float(base.get(metric, 0)), float(current.get(metric, 0))
+			if new > old * (1 + tolerance) and new - old > MIN_REGRESSION_SECONDS:
+				problems.append(f"{stage}.{metric}: {new * 1000:.1f} ms vs baseline {old * 1000:.1f} ms (+{(new / old - 1) * 100 if old else 100:.0f}%)")
+		if current.get("errors", 0) > base.get("errors", 0):
+			problems.append(f"{stage}: {current['errors']} failed iterations (baseline {base.get('errors', 0)})")
+	return problems
+
+
+def format_results(results: Dict[str, Dict[str, Any]]) -> str:
+	lines = [f"{'stage':<16}{'iters':>6}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'ops/s':>9}{'llm req':>9}{'tok/s':>9}"]
+	for stage, r in results.items():
+		lines.append(
+			f"{stage:<16}{r['iterations']:>6}{r['p50'] * 1000:>10.1f}{r['p90'] * 1000:>10.1f}{r['p99'] * 1000:>10.1f}"
+			f"{r['throughput_per_s']:>9.2f}{r['llm_requests']:>9}{r['tokens_per_s']:>9.0f}"
+		)
+	return "\n".join(lines)
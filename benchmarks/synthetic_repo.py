@@ -0,0 +1,155 @@
+# benchmarks/synthetic_repo.py
+"""
+Deterministic generator for synthetic Python repositories, used to measure how
+the static-analysis entry points scale past this tree's ~20 files:
+
+	python -m benchmarks.synthetic_repo /tmp/synth-10k --files 10000
+
+Modules live in packages of PACKAGE_SIZE files. Each imports and calls a handful
+of earlier modules (skewed towards a small "core" so some files have many
+dependents, like utils modules in real projects), defines a few functions and a
+class, and a few giant modules carry thousands of functions.
+"""
+import argparse
+import random
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List
+
+PACKAGE_SIZE = 100  # modules per package directory
+CORE_MODULES = 50  # first N modules form the heavily-imported core
+SHARED_NAMES = ("load", "save", "run", "validate", "helper")  # names defined in many modules
+
+
+@dataclass
+class RepoSpec:
+	files: int = 1000
+	seed: int = 0
+	fan_out: int = 6  # average imports per module
+	functions: int = 8  # average functions per module
+	giant_modules: int = 3
+	giant_functions: int = 3000  # functions per giant module
+
+	@property
+	def label(self) -> str:
+		return f"{self.files // 1000}k" if self.files >= 1000 and self.files % 1000 == 0 else str(self.files)
+
+
+def module_name(index: int) -> str:
+	return f"pkg_{index // PACKAGE_SIZE:04d}.mod_{index:06d}"
+
+
+def module_path(index: int) -> Path:
+	return Path(f"pkg_{index // PACKAGE_SIZE:04d}") / f"mod_{index:06d}.py"
+
+
+def function_name(index: int, n: int) -> str:
+	return f"fn_{index}_{n}"
+
+
+def _pick_imports(rng: random.Random, index: int, fan_out: int) -> List[int]:
+	if index == 0:
+		return []
+	count = min(index, max(1, int(rng.expovariate(1 / fan_out))))
+	picks = set()
+	while len(picks) < count:
+		if rng.random() < 0.4:
+			picks.add(rng.randrange(min(index, CORE_MODULES)))  # popular core modules
+		else:
+			picks.add(rng.randrange(index))
+	return sorted(picks)
+
+
+def _function_source(rng: random.Random, name: str, callees: List[str], shared: bool = False) -> List[str]:
+	lines = [f"def {name}(data, limit=10):"]
+	if rng.random() < 0.3:
+		lines.append(f'\t"""Process data for {name}."""')
+	lines.append("\tresult = []")
+	lines.append("\tfor i, item in enumerate(data):")
+	lines.append("\t\tif i >= limit:")
+	lines.append("\t\t\tbreak")
+	for callee in callees:
+		lines.append(f"\t\titem = {callee}([item], limit)")
+	lines.append("\t\tresult.append(item)")
+	if shared:
+		lines.append("\tlogger.debug('%s: %d items', __name__, len(result))")
+	lines.append("\treturn result")
+	return lines
+
+
+def render_module(spec: RepoSpec, rng: random.Random, index: int, giant: bool) -> str:
+	imports = _pick_imports(rng, index, spec.fan_out)
+	callees = [function_name(i, 0) for i in imports]
+	lines = ["import logging", "import os"]
+	lines += [f"from {module_name(i)} import {function_name(i, 0)}" for i in imports]
+	lines += ["", "logger = logging.getLogger(__name__)", f"LIMIT = {rng.randint(5, 500)}", ""]
+
+	count = spec.giant_functions if giant else max(1, int(rng.gauss(spec.functions, spec.functions / 3)))
+	for n in range(count):
+		calls = rng.sample(callees, min(len(callees), rng.randint(0, 2)))
+		if n:
+			calls.append(function_name(index, rng.randrange(n)))  # intra-module call
+		lines += ["", ""] + _function_source(rng, function_name(index, n), calls)
+
+	shared = rng.choice(SHARED_NAMES)
+	lines += ["", ""] + _function_source(rng, shared, callees[:1], shared=True)
+	lines += [
+		"", "",
+		f"class Model{index}:",
+		"\tdef __init__(self, root):",
+		"\t\tself.root = root",
+		"\t\tself.cache = {}",
+		"",
+		"\tdef path_for(self, name):",
+		"\t\treturn os.path.join(self.root, name)",
+		"",
+		"\tdef get(self, name):",
+		"\t\tif name not in self.cache:",
+		f"\t\t\tself.cache[name] = {function_name(index, 0)}([name], LIMIT)",
+		"\t\treturn self.cache[name]",
+		"",
+	]
+	return "\n".join(lines)
+
+
+def giant_indexes(spec: RepoSpec) -> List[int]:
+	"""Module indexes rendered as giant modules (spread across the tree)."""
+	if spec.giant_modules <= 0:
+		return []
+	step = max(1, spec.files // spec.giant_modules)
+	return [min(spec.files - 1, step * i + step // 2) for i in range(spec.giant_modules)]
+
+
+def generate_repo(dest: Path, spec: RepoSpec) -> List[Path]:
+	"""Write the synthetic repo under `dest` (same spec -> same bytes); returns the giant module paths."""
+	dest = Path(dest)
+	rng = random.Random(spec.seed)
+	giants = set(giant_indexes(spec))
+	for index in range(spec.files):
+		path = dest / module_path(index)
+		if index % PACKAGE_SIZE == 0:
+			path.parent.mkdir(parents=True, exist_ok=True)
+			(path.parent / "__init__.py").write_text("", encoding="utf-8")
+		path.write_text(render_module(spec, rng, index, index in giants), encoding="utf-8")
+	return [dest / module_path(i) for i in sorted(giants)]
+
+
+def main(argv=None) -> int:
+	parser = argparse.ArgumentParser(prog="python -m benchmarks.synthetic_repo", description="Generate a synthetic Python repo")
+	parser.add_argument("dest")
+	parser.add_argument("--files", type=int, default=1000)
+	parser.add_argument("--seed", type=int, default=0)
+	parser.add_argument("--fan-out", type=int, default=6)
+	parser.add_argument("--giant-modules", type=int, default=3)
+	parser.add_argument("--giant-functions", type=int, default=3000)
+	args = parser.parse_args(argv)
+	spec = RepoSpec(files=args.files, seed=args.seed, fan_out=args.fan_out,
+		giant_modules=args.giant_modules, giant_functions=args.giant_functions)
+	giants = generate_repo(Path(args.dest), spec)
+	print(f"[OK] Wrote {spec.files} modules to {args.dest} (giant: {', '.join(str(g) for g in giants) or 'none'})")
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main(sys.argv[1:]))
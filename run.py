@@ -1,7 +1,60 @@
-import logging
-from agent.gui import launch
+import argparse
+import sys
+
+
+def parse_args(argv=None):
+	parser = argparse.ArgumentParser(description="SAIAS local assistant")
+	parser.add_argument(
+		"--profile-startup",
+		action="store_true",
+		help="Report per-phase and per-import startup timings (cold start → first paint), then exit",
+	)
+	parser.add_argument(
+		"--serve",
+		action="store_true",
+		help="Run headless: serve route/chat/patch/self-patch requests to local clients (see agent/tools/daemon.py)",
+	)
+	parser.add_argument("--host", help="--serve: TCP host (default daemon.host, 127.0.0.1)")
+	parser.add_argument("--port", type=int, help="--serve: TCP port (default daemon.port, 8765)")
+	parser.add_argument("--socket", help="--serve: listen on this Unix socket instead of TCP")
+	parser.add_argument(
+		"--batch",
+		metavar="FILE",
+		help="Route every request in a JSONL file, appending results to --out; rerun to resume (see agent/tools/batch.py)",
+	)
+	parser.add_argument("--out", help="--batch: results JSONL (default <FILE>.results.jsonl)")
+	parser.add_argument("--concurrency", type=int, help="--batch: requests in flight (default batch.concurrency)")
+	parser.add_argument(
+		"--trace",
+		metavar="FILE",
+		help="Record spans (routing, LLM calls, chunking, sandbox tests, ...) and write a Chrome trace to FILE on exit",
+	)
+	return parser.parse_args(argv)
+
+
+def main(argv=None):
+	args = parse_args(argv)
+	from agent.tools.log_setup import setup_logging
+	setup_logging("run")
+	from agent.tools.startup_profile import PROFILER
+	if args.profile_startup:
+		PROFILER.enable()
+	if args.trace:
+		from agent.tools.tracing import TRACER
+		TRACER.enable(args.trace)
+
+	if args.serve:
+		from agent.tools.daemon import serve
+		serve(args.host, args.port, args.socket)
+		return
+	if args.batch:
+		from agent.tools.batch import process_file
+		sys.exit(process_file(args.batch, args.out, args.concurrency))
+
+	with PROFILER.phase("import agent.gui"):
+		from agent.gui import launch
+	launch()
 
-logging.basicConfig(filename='saiasrun_log.log', level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
 if __name__ == "__main__":
-	launch()
\ No newline at end of file
+	main(sys.argv[1:])
@@ -0,0 +1,23 @@
+from agent.tools.capability_index import INFRASTRUCTURE_MODULES, MATCH_THRESHOLD, CapabilityIndex
+
+
+def _index(tmp_path):
+	# The real tool modules, without the user's capability registry
+	return CapabilityIndex(capabilities_path=tmp_path / "capabilities.json")
+
+
+def test_private_helpers_are_not_capabilities(tmp_path):
+	names = [d.name for d in _index(tmp_path).documents()]
+	assert names
+	assert not [n for n in names if n.split(":")[-1].startswith("_")]
+
+
+def test_infrastructure_modules_are_not_discovered(tmp_path):
+	modules = {d.name.split(":")[0].split(".", 1)[1] for d in _index(tmp_path).documents()}
+	assert not modules & INFRASTRUCTURE_MODULES
+	assert "self_patch" in modules
+
+
+def test_serving_clients_is_not_a_capability(tmp_path):
+	matches = _index(tmp_path).search("can you serve clients over a socket", limit=1)
+	assert not matches or matches[0].score < MATCH_THRESHOLD
@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+from agent.tools.daemon import SaiasDaemon
+
+
+@pytest.fixture
+def daemon():
+	d = SaiasDaemon()
+	yield d
+	d.executor.shutdown(wait=False)
+
+
+def _dispatch(daemon, request):
+	replies = []
+
+	async def send(message):
+		replies.append(message)
+
+	asyncio.run(daemon._dispatch(request, send))
+	return replies
+
+
+def test_params_not_matching_signature_are_bad_params(daemon):
+	replies = _dispatch(daemon, {"id": 1, "method": "route", "params": {"txt": "hi"}})
+	assert replies == [{"id": 1, "error": replies[0]["error"]}]
+	assert replies[0]["error"].startswith("Bad params for 'route'")
+
+
+def test_type_error_inside_method_is_reported_as_failure(daemon, caplog):
+	async def route(text):
+		return len(text) + "!"  # a bug in the method, not in the request
+
+	daemon.methods["route"] = route
+	replies = _dispatch(daemon, {"id": 2, "method": "route", "params": {"text": "hi"}})
+	assert replies[0]["error"].startswith("TypeError: ")
+	assert "Daemon method 'route' failed" in caplog.text
+
+
+def test_unknown_or_invalid_method(daemon):
+	assert _dispatch(daemon, {"id": 3, "method": "nope"})[0]["error"] == "Unknown method 'nope'"
+	assert _dispatch(daemon, {"id": 4, "method": ["ping"]})[0]["error"].startswith("Unknown method")
+
+
+def test_ping(daemon):
+	reply = _dispatch(daemon, {"id": 5, "method": "ping"})[0]
+	assert reply["id"] == 5 and "pid" in reply["result"]
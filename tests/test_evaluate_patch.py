@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+from agent.tools import evaluate_patch
+
+
+class _NoDependents:
+	def get_dependents(self, target_file):
+		return set()
+
+
+@pytest.fixture
+def patch_dir(tmp_path, monkeypatch):
+	"""A private patch_notes dir; tests, rewards and the post-apply refresh are stubbed out."""
+	notes = tmp_path / "patch_notes"
+	notes.mkdir()
+	monkeypatch.setattr(evaluate_patch, "PATCH_DIR", notes)
+	monkeypatch.setattr(evaluate_patch, "run_patch_tests", lambda: True)
+	monkeypatch.setattr(evaluate_patch, "log_reward", lambda *args, **kwargs: None)
+	monkeypatch.setattr(evaluate_patch, "refresh_project_state", lambda: None)
+	return notes
+
+
+def _write_patch(patch_dir, target):
+	# Same ID shape as self_patch: PATCH_<timestamp>_<file stem>, the stem keeps its case
+	patch_id = f"PATCH_2026-10-19_06-00-00_{target.stem}"
+	target.write_text("def f():\n\treturn 1\n", encoding="utf-8")
+	(patch_dir / f"{patch_id}.json").write_text(json.dumps({
+		"patch_id": patch_id,
+		"target_file": str(target),
+		"description": "Refactored",
+		"refactor_score": 8,
+		"original_code": target.read_text(encoding="utf-8"),
+		"refactored_code": "def f():\n\t\"\"\"One.\"\"\"\n\treturn 1\n",
+		"applied": False,
+	}), encoding="utf-8")
+	return patch_id
+
+
+def test_apply_id_from_pending_summaries(patch_dir, tmp_path):
+	target = tmp_path / "llm_helpers.py"
+	_write_patch(patch_dir, target)
+	summaries = evaluate_patch.get_pending_patch_summaries(graph=_NoDependents())
+	assert len(summaries) == 1
+	ids = evaluate_patch.parse_patch_ids([summaries[0].patch_id])
+	assert ids == [summaries[0].patch_id]
+	results = evaluate_patch.apply_patches(ids)
+	assert [r.applied for r in results] == [True]
+	assert '"""One."""' in target.read_text(encoding="utf-8")
+	assert evaluate_patch.get_pending_patch_summaries(graph=_NoDependents()) == []
+
+
+def test_typed_id_matches_case_insensitively(patch_dir, tmp_path):
+	patch_id = _write_patch(patch_dir, tmp_path / "helpers.py")
+	results = evaluate_patch.apply_patches(evaluate_patch.parse_patch_ids([patch_id.upper()]))
+	assert results[0].applied and results[0].patch_id == patch_id
+
+
+def test_unknown_id_not_found(patch_dir):
+	results = evaluate_patch.apply_patches(["PATCH_missing"])
+	assert results[0].reason == "not_found"
@@ -0,0 +1,101 @@
+import threading
+import time
+
+from agent.tools import job_scheduler
+from agent.tools.job_scheduler import Governor, Job, JobScheduler
+
+
+class _PausableJob:
+	"""Preemptible stub: the first run blocks until stopped, later runs finish at once."""
+
+	def __init__(self):
+		self.calls = 0
+		self.started = threading.Event()
+
+	def __call__(self, stop: threading.Event):
+		self.calls += 1
+		self.started.set()
+		if self.calls == 1:
+			stop.wait(5)
+			return None
+		return "resumed"
+
+
+def _wait_idle(scheduler: JobScheduler, timeout: float = 5.0) -> None:
+	deadline = time.monotonic() + timeout
+	while scheduler.running is not None and time.monotonic() < deadline:
+		time.sleep(0.01)
+	assert scheduler.running is None
+
+
+def _scheduler(tmp_path, jobs):
+	# No idle wait, load or memory limits: only user activity and interactive calls gate jobs
+	scheduler = JobScheduler(jobs, Governor(idle_s=0, max_load_per_cpu=0, min_free_memory_mb=0), path=tmp_path / "jobs.json")
+	with scheduler._lock:
+		scheduler._load()  # what start() does, without the polling thread: the test drives _tick()
+	return scheduler
+
+
+def test_user_activity_pauses_and_requeues_at_head(tmp_path):
+	long_job = _PausableJob()
+	short_runs = []
+	scheduler = _scheduler(tmp_path, [
+		Job("long", long_job, preemptible=True),
+		Job("short", lambda stop: short_runs.append(1)),
+	])
+	scheduler.trigger("long")
+	scheduler.trigger("short")
+
+	scheduler._tick()
+	assert long_job.started.wait(5)
+	assert scheduler.running == "long"
+
+	time.sleep(0.01)
+	job_scheduler.note_user_activity()
+	scheduler._tick()
+	_wait_idle(scheduler)
+	history = scheduler.status()["history"]["long"]
+	assert history["status"] == "paused"
+	assert history.get("runs", 0) == 0
+	assert [e["name"] for e in scheduler.queue] == ["long", "short"]
+	assert scheduler.queue[0]["reason"] == "resuming after pause (user activity)"
+	assert short_runs == []
+
+	# The paused job goes first once the governor allows it, then the rest of the queue
+	scheduler._tick()
+	_wait_idle(scheduler)
+	history = scheduler.status()["history"]["long"]
+	assert history["status"] == "ok" and history["result"] == "resumed" and history["runs"] == 1
+	assert [e["name"] for e in scheduler.queue] == ["short"]
+
+	scheduler._tick()
+	_wait_idle(scheduler)
+	assert short_runs == [1]
+	assert scheduler.queue == []
+
+
+def test_non_preemptible_job_is_not_paused(tmp_path):
+	release = threading.Event()
+	started = threading.Event()
+
+	def blocking(stop):
+		started.set()
+		release.wait(5)
+		return "done"
+
+	scheduler = _scheduler(tmp_path, [Job("tests", blocking)])
+	scheduler.trigger("tests")
+	scheduler._tick()
+	assert started.wait(5)
+	time.sleep(0.01)
+	job_scheduler.note_user_activity()
+	scheduler._tick()
+	release.set()
+	_wait_idle(scheduler)
+	assert scheduler.status()["history"]["tests"]["status"] == "ok"
+	assert scheduler.queue == []
+
+
+def test_self_patch_is_trigger_only_by_default():
+	scheduler = JobScheduler.from_config({})
+	assert scheduler.jobs["self_patch"].interval_s == 0
@@ -0,0 +1,66 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from agent.tools.llm_endpoints import configure_endpoints
+from benchmarks.fake_llm_server import FakeLLMServer
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+
+@pytest.fixture
+def servers():
+	a = FakeLLMServer(latency=0.05).start()
+	b = FakeLLMServer(latency=0.05).start()
+	yield a, b
+	a.stop()
+	try:
+		b.stop()
+	except OSError:
+		pass  # already stopped by the test
+	configure_endpoints([])  # drop the test pool (and its health thread) without reading config.json
+
+
+def _chat(pool):
+	return pool.request("fake", lambda ep: ep.backend.chat(ep.url, "fake", MESSAGES, {}, 5))
+
+
+def test_requests_spread_over_endpoints(servers):
+	a, b = servers
+	pool = configure_endpoints([a.url, b.url], health_check_s=0)
+	with ThreadPoolExecutor(max_workers=4) as executor:
+		results = list(executor.map(lambda _: _chat(pool), range(8)))
+	assert all(r.content for r in results)
+	assert a.stats.requests + b.stats.requests == 8
+	assert a.stats.requests >= 2 and b.stats.requests >= 2
+	assert all(e["outstanding"] == 0 for e in pool.status())
+
+
+def test_failover_after_endpoint_stops(servers):
+	a, b = servers
+	pool = configure_endpoints([a.url, b.url], health_check_s=0)
+	assert pool.check_all() == {a.url: True, b.url: True}
+	b.stop()
+	before = a.stats.requests
+	for _ in range(4):
+		assert _chat(pool).content
+	assert a.stats.requests == before + 4
+	status = {e["url"]: e for e in pool.status()}
+	assert status[b.url]["healthy"] is False
+	assert status[a.url]["healthy"] is True
+
+
+def test_background_health_check_marks_stopped_endpoint_down(servers):
+	a, b = servers
+	pool = configure_endpoints([a.url, b.url], health_check_s=0.05)
+	b.stop()
+	deadline = time.monotonic() + 5
+	while time.monotonic() < deadline:
+		if not {e["url"]: e for e in pool.status()}[b.url]["healthy"]:
+			break
+		time.sleep(0.02)
+	status = {e["url"]: e for e in pool.status()}
+	assert status[b.url]["healthy"] is False
+	assert status[a.url]["healthy"] is True
+	assert b.stats.requests == 0  # found without sending it traffic
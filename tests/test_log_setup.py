@@ -0,0 +1,18 @@
+from agent.tools.log_setup import PayloadRing
+
+
+def test_dump_keeps_only_newest_files(tmp_path):
+	ring = PayloadRing(size=4)
+	ring.record("chat_request", model="fake", messages=[{"role": "user", "content": "hi"}])
+	paths = [ring.dump(f"error {i}", directory=tmp_path, keep=3) for i in range(6)]
+	remaining = sorted(tmp_path.glob("payloads-*.jsonl"))
+	assert remaining == sorted(paths[-3:])
+	assert '"reason": "error 5"' in remaining[-1].read_text(encoding="utf-8").splitlines()[0]
+
+
+def test_dump_is_rate_limited(tmp_path):
+	ring = PayloadRing()
+	ring.record("raw_output", text="x")
+	assert ring.dump("first", directory=tmp_path, min_interval=60) is not None
+	assert ring.dump("burst", directory=tmp_path, min_interval=60) is None
+	assert len(list(tmp_path.glob("payloads-*.jsonl"))) == 1
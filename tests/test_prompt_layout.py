@@ -0,0 +1,56 @@
+import pytest
+
+from agent.tools import chat_summary, llm, vector_memory
+from agent.tools.prompt_layout import PrefixMonitor, fingerprint, render_messages
+
+CONFIG = {
+	"llm": {"chat_model": "fake"},
+	"chat": {"system_prompt": "You are SAIAS, a local coding assistant."},
+}
+
+
+@pytest.fixture
+def chat_request(monkeypatch):
+	"""build_chat_request with a private PrefixMonitor and a controllable injected context."""
+	monitor = PrefixMonitor()
+	context = {"text": "Project context: version 1"}
+	monkeypatch.setattr(llm, "PREFIX_MONITOR", monitor)
+	monkeypatch.setattr(llm, "get_saias_context", lambda include_notes=True: context["text"])
+	monkeypatch.setattr(vector_memory, "retrieval_available", lambda: False)
+	monkeypatch.setattr(chat_summary, "chat_history", lambda: ("", []))
+
+	def build(prompt: str):
+		messages, _ = llm.build_chat_request(prompt, CONFIG)
+		return messages
+
+	return build, monitor, context
+
+
+def test_consecutive_requests_share_stable_prefix(chat_request):
+	build, monitor, _ = chat_request
+	first = build("hello")
+	fp_first = monitor.stats()["chat"]["fingerprint"]
+	second = build("what changed?")
+	stats = monitor.stats()["chat"]
+	assert stats["fingerprint"] == fp_first
+	assert stats["calls"] == 2
+	assert stats["prefix_changes"] == 0 and stats["layout_violations"] == 0
+	# Only the user turn differs: the whole system message is reusable
+	assert first[0] == second[0]
+	assert stats["shared_chars"] >= len(render_messages(first[:1]))
+
+
+def test_context_change_only_alters_later_segment(chat_request):
+	build, monitor, context = chat_request
+	first = build("hello")
+	context["text"] = "Project context: version 2"
+	second = build("hello")
+	stats = monitor.stats()["chat"]
+	assert stats["prefix_changes"] == 0 and stats["layout_violations"] == 0
+	assert first[0]["content"] != second[0]["content"]
+	# The stable prefix (and its fingerprint) is untouched; the prompts diverge after it
+	stable = first[0]["content"].split("\n\nProject context:")[0]
+	assert stats["fingerprint"] == fingerprint(stable)
+	assert second[0]["content"].startswith(stable)
+	assert stats["shared_chars"] >= len(f"<system>\n{stable}")
+	assert first[1:] == second[1:]
@@ -0,0 +1,60 @@
+import multiprocessing
+
+import pytest
+
+from agent.tools import self_patch
+from agent.tools.sandbox_pool import SandboxPool
+
+pytestmark = pytest.mark.skipif(
+	"forkserver" not in multiprocessing.get_all_start_methods(), reason="sandbox pool needs the forkserver start method"
+)
+
+CANDIDATES = {
+	"pass": "VALUE = 1\n",
+	"raise": "raise ValueError('broken candidate')\n",
+	"timeout": "import time\ntime.sleep(30)\n",
+}
+
+
+@pytest.fixture(scope="module")
+def pool():
+	pool = SandboxPool(workers=1, timeout_s=2, preload=())
+	pool.warm()
+	yield pool
+	pool.close()
+
+
+def _candidate(tmp_path, kind):
+	# Self-patch candidates are checked as <file>.temp
+	path = tmp_path / f"candidate_{kind}.py.temp"
+	path.write_text(CANDIDATES[kind], encoding="utf-8")
+	return str(path)
+
+
+@pytest.mark.parametrize("mode", ["run", "import"])
+def test_passing_candidate(pool, tmp_path, mode):
+	result = pool.run(_candidate(tmp_path, "pass"), mode=mode)
+	assert result.ok and result.error == ""
+
+
+@pytest.mark.parametrize("mode", ["run", "import"])
+def test_raising_candidate(pool, tmp_path, mode):
+	result = pool.run(_candidate(tmp_path, "raise"), mode=mode)
+	assert not result.ok
+	assert "ValueError: broken candidate" in result.error
+
+
+@pytest.mark.parametrize("mode", ["run", "import"])
+def test_hanging_candidate_times_out(pool, tmp_path, mode):
+	timeouts = pool.counts["timeouts"]
+	result = pool.run(_candidate(tmp_path, "timeout"), mode=mode)
+	assert not result.ok and "timed out" in result.error
+	assert pool.counts["timeouts"] == timeouts + 1
+	assert result.elapsed < 10
+
+
+def test_import_check_without_pool(tmp_path, monkeypatch):
+	# Windows / sandbox.pool: false take the in-process path, which must load .temp files too
+	monkeypatch.setattr(self_patch, "get_sandbox_pool", lambda: None)
+	assert self_patch.safe_import_test(_candidate(tmp_path, "pass")) is True
+	assert self_patch.safe_import_test(_candidate(tmp_path, "raise")) is False
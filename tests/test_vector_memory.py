@@ -0,0 +1,64 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from agent.tools import vector_memory
+from agent.tools.vector_memory import HashedEmbedder, Snippet, VectorIndex
+
+TEXTS = {
+	"a": "the dependency graph tracks imports between project files",
+	"b": "chat summaries fold older messages into a running summary",
+	"c": "sandbox workers check refactored candidates under resource limits",
+}
+
+
+class _Capabilities:
+	version = 0
+
+	def refresh(self):
+		pass
+
+
+class _SavedEmbedder(HashedEmbedder):
+	persist = True  # stands in for a model-backed embedder
+
+
+@pytest.fixture
+def make_index(tmp_path, monkeypatch):
+	monkeypatch.setattr(vector_memory, "get_capability_index", lambda: _Capabilities())
+	order = {"ids": ["a", "b", "c"]}
+
+	def collect(self):
+		return [Snippet(i, "context", TEXTS[i]) for i in order["ids"]]
+
+	monkeypatch.setattr(VectorIndex, "_collect", collect)
+
+	def make(embedder):
+		return VectorIndex(tmp_path / "vector_index.npz", embedder=embedder)
+
+	return make, order
+
+
+def _refresh(index):
+	index._sources_key = None  # as if a source file changed
+	return index.refresh()
+
+
+def test_reordered_rows_keep_weights_aligned(make_index):
+	make, order = make_index
+	index = make(HashedEmbedder(256))
+	assert _refresh(index) == 3
+	order["ids"] = ["c", "a", "b"]
+	assert _refresh(index) == 0  # same snippets: nothing re-embedded
+	best = index.search(TEXTS["c"], top_k=1, min_score=0.0)
+	assert [s.id for s in best] == ["c"]
+
+
+def test_only_model_backed_embeddings_are_saved(make_index, tmp_path):
+	make, order = make_index
+	_refresh(make(HashedEmbedder(256)))
+	assert not (tmp_path / "vector_index.npz").exists()
+	_refresh(make(_SavedEmbedder(256)))
+	assert (tmp_path / "vector_index.npz").exists()
+	reloaded = make(_SavedEmbedder(256))
+	assert [s.id for s in reloaded.snippets] == order["ids"]